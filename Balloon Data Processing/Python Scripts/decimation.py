@@ -0,0 +1,280 @@
+"""
+decimation.py
+
+Min/max decimation of measurement columns, so that long flights can be
+plotted quickly. A pyramid is built over each column: level 1 holds the
+position of the smallest and largest value in every bucket of
+PYRAMID_FACTOR samples, level 2 in every bucket of PYRAMID_FACTOR**2
+samples, and so on. A plot only needs about two points per pixel, so it
+draws the coarsest level which still has a bucket per pixel for the
+visible time range, and switches levels as the plot is zoomed. Keeping
+the minimum and maximum of each bucket (rather than every nth sample)
+means spikes are never hidden by the decimation.
+
+The pyramids of a processed data file are cached next to it.
+
+Paths (such as the flight track exported to KML) are instead simplified
+with the Douglas-Peucker algorithm, which keeps the shape of the path to
+within a given distance.
+"""
+
+import os
+import numpy as np
+
+# Meters in a degree of latitude, and of longitude at the equator. Keep
+# these the same as in the ground station's Conversions.py
+METERS_PER_DEGREE_LATITUDE = 110574.0
+METERS_PER_DEGREE_LONGITUDE = 111320.0
+
+PYRAMID_FACTOR = 4
+
+# Levels stop once they would have fewer buckets than this
+MIN_BUCKETS = 256
+
+CACHE_EXTENSION = '.pyramid.npz'
+CACHE_MTIME = '__mtime__'
+CACHE_SIZE = '__size__'
+
+
+def buildPyramid(values, factor=PYRAMID_FACTOR, minBuckets=MIN_BUCKETS):
+    """
+    Builds the min/max pyramid of a column.
+
+    :param values: (numpy array) Values of the column
+    :param factor: (int) Number of buckets of a level in each bucket of the next
+    :param minBuckets: (int) Fewest buckets in a level
+
+    :return: (list) Levels of the pyramid, from level 1 up. Each is an
+                    integer array with two rows: the index of the smallest
+                    and the index of the largest value of each bucket.
+    """
+    levels = []
+    minIndices = np.arange(len(values))
+    maxIndices = minIndices
+
+    while len(minIndices) > minBuckets * factor:
+
+        # Repeat the last index so the final, partial bucket is complete
+        padding = (-len(minIndices)) % factor
+        minIndices = np.pad(minIndices, (0, padding), 'edge').reshape(-1, factor)
+        maxIndices = np.pad(maxIndices, (0, padding), 'edge').reshape(-1, factor)
+
+        buckets = np.arange(len(minIndices))
+        minIndices = minIndices[buckets, np.argmin(values[minIndices], axis=1)]
+        maxIndices = maxIndices[buckets, np.argmax(values[maxIndices], axis=1)]
+
+        levels.append(np.vstack((minIndices, maxIndices)))
+
+    return levels
+
+
+def selectIndices(levels, start, end, numPoints, factor=PYRAMID_FACTOR):
+    """
+    Chooses which samples to draw for a range of a column: every sample
+    if there are few enough, and otherwise the smallest and largest
+    value of each bucket of the coarsest level with at least numPoints
+    buckets in the range.
+
+    :param levels: (list) Levels of the column's pyramid (see buildPyramid)
+    :param start: (int) Index of the first sample in the range
+    :param end: (int) Index after the last sample in the range
+    :param numPoints: (int) Fewest buckets to draw (for example, the plot's width in pixels)
+    :param factor: (int) Factor the pyramid was built with
+
+    :return: (numpy array) Indices of the samples to draw, in order
+    """
+    level = 0
+    while (level < len(levels)) and ((end - start) // factor**(level + 1) >= numPoints):
+        level += 1
+
+    if level == 0:
+        return np.arange(start, end)
+
+    bucketSize = factor**level
+    bucketIndices = levels[level - 1][:, start // bucketSize:-(-end // bucketSize)]
+
+    # Draw each bucket's minimum and maximum in the order they occurred
+    firstIndices = np.minimum(bucketIndices[0], bucketIndices[1])
+    secondIndices = np.maximum(bucketIndices[0], bucketIndices[1])
+    return np.column_stack((firstIndices, secondIndices)).ravel()
+
+
+def simplifyPath(latitude, longitude, altitude, tolerance):
+    """
+    Simplifies a path with the Douglas-Peucker algorithm: points are
+    dropped as long as the path stays within tolerance meters of every
+    original point. The positions are projected onto a flat plane around
+    the first point, which is accurate over the distances a balloon
+    travels. Each step measures the distance of every point in a segment
+    at once, so only the number of points kept is looped over in Python.
+
+    :param latitude: (numpy array) Latitudes of the points (degrees)
+    :param longitude: (numpy array) Longitudes of the points (degrees)
+    :param altitude: (numpy array) Altitudes of the points (meters)
+    :param tolerance: (float) Largest distance from the simplified path, in meters
+
+    :return: (numpy array) Indices of the points to keep, in order
+    """
+    numPoints = len(latitude)
+    if numPoints <= 2:
+        return np.arange(numPoints)
+
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    longitudeScale = METERS_PER_DEGREE_LONGITUDE * np.cos(np.radians(latitude[0]))
+    points = np.column_stack(((longitude - longitude[0]) * longitudeScale,
+                              (latitude - latitude[0]) * METERS_PER_DEGREE_LATITUDE,
+                              np.asarray(altitude, dtype=np.float64)))
+
+    keep = np.zeros(numPoints, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    segments = [(0, numPoints - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+
+        # Distance of each point between first and last from the segment joining them
+        direction = points[last] - points[first]
+        offsets = points[first + 1:last] - points[first]
+        length = np.dot(direction, direction)
+        if length > 0:
+            fractions = np.clip(np.dot(offsets, direction) / length, 0.0, 1.0)
+            offsets = offsets - fractions[:, np.newaxis] * direction
+        distances = np.sqrt(np.einsum('ij,ij->i', offsets, offsets))
+
+        farthest = np.argmax(distances)
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            segments.append((first, middle))
+            segments.append((middle, last))
+
+    return np.nonzero(keep)[0]
+
+
+class PyramidCache(object):
+
+    def __init__(self, dataFilename):
+        """
+        Creates a new PyramidCache object, which holds the pyramids of the
+        columns of a processed data file. Pyramids cached on disk are used
+        as long as the data file has not changed since they were built.
+
+        :param dataFilename: (string) Path of the processed data file
+
+        :return: (PyramidCache) New pyramid cache
+        """
+        self.cachePath = dataFilename + CACHE_EXTENSION
+        self._fileStat = os.stat(dataFilename)
+        self._arrays = {}
+        self._changed = False
+
+        try:
+            with np.load(self.cachePath) as cache:
+                if (cache[CACHE_MTIME] == self._fileStat.st_mtime) and (cache[CACHE_SIZE] == self._fileStat.st_size):
+                    self._arrays = dict((key, cache[key]) for key in cache.files)
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+
+    def getPyramid(self, column, values):
+        """
+        Gets the pyramid of a column, building it if it is not cached.
+
+        :param column: (int) Index of the column in the data file
+        :param values: (numpy array) Values of the column
+
+        :return: (list) Levels of the pyramid (see buildPyramid)
+        """
+        countKey = '%d_count' % column
+        if not countKey in self._arrays:
+            levels = buildPyramid(values)
+            self._arrays[countKey] = np.array(len(levels))
+            for level, indices in enumerate(levels):
+                self._arrays['%d_%d' % (column, level)] = indices
+            self._changed = True
+
+        return [self._arrays['%d_%d' % (column, level)] for level in range(int(self._arrays[countKey]))]
+
+
+    def save(self):
+        """
+        Saves the pyramids to disk, if any were built. Failing to write the
+        cache (for example, in a read-only directory) is not an error.
+
+        :return: (None)
+        """
+        if not self._changed:
+            return
+
+        self._arrays[CACHE_MTIME] = np.float64(self._fileStat.st_mtime)
+        self._arrays[CACHE_SIZE] = np.int64(self._fileStat.st_size)
+        try:
+            with open(self.cachePath, 'wb') as cacheFile:
+                np.savez(cacheFile, **self._arrays)
+            self._changed = False
+        except (IOError, OSError):
+            pass
+
+
+class DecimatedLine(object):
+
+    def __init__(self, axes, x, y, levels, **plotArguments):
+        """
+        Creates a new DecimatedLine object, which plots a column on a set
+        of matplotlib axes and redraws it at the right level of detail
+        whenever the x limits of the axes change.
+
+        :param axes: (matplotlib.axes.Axes) Axes to plot on
+        :param x: (numpy array) Times of the samples, in increasing order
+        :param y: (numpy array) Values of the samples
+        :param levels: (list) Levels of y's pyramid (see buildPyramid)
+        :param plotArguments: Passed on to axes.plot (label, color, ...)
+
+        :return: (DecimatedLine) New decimated line
+        """
+        self.axes = axes
+        self.x = x
+        self.y = y
+        self.levels = levels
+
+        indices = self._visibleIndices(None, None)
+        self.line, = axes.plot(x[indices], y[indices], **plotArguments)
+        axes.callbacks.connect('xlim_changed', self.update)
+
+
+    def update(self, axes):
+        """
+        Redraws the line for the current x limits of the axes.
+
+        :param axes: (matplotlib.axes.Axes) Axes whose limits changed
+
+        :return: (None)
+        """
+        xMin, xMax = axes.get_xlim()
+        indices = self._visibleIndices(xMin, xMax)
+        self.line.set_data(self.x[indices], self.y[indices])
+        axes.figure.canvas.draw_idle()
+
+
+    def _visibleIndices(self, xMin, xMax):
+        """
+        Chooses the samples to draw between two times, keeping one sample
+        beyond each edge so the line runs off the sides of the plot.
+
+        :param xMin: (float) Earliest time shown (None: start of the data)
+        :param xMax: (float) Latest time shown (None: end of the data)
+
+        :return: (numpy array) Indices of the samples to draw
+        """
+        start = 0
+        end = len(self.x)
+        if not xMin is None:
+            start = max(np.searchsorted(self.x, xMin, side='left') - 1, 0)
+        if not xMax is None:
+            end = min(np.searchsorted(self.x, xMax, side='right') + 1, len(self.x))
+
+        numPixels = max(int(self.axes.bbox.width), 1)
+        return selectIndices(self.levels, start, end, numPixels)
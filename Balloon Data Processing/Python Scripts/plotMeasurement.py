@@ -13,33 +13,35 @@ import argparse
 import numpy as np 
 from matplotlib import pyplot as plt
 
+from sparkySchema import *
+from decimation import *
+
 
 KML_FILE_LOCATION = "C:\Users\Andrew\Documents\Balloon\KML Logs"
 POSITION = "position"
 INTERIOR_TEMP = "interiorTemp"
-MEASUREMENTS = {
-    "interiorTemp" : ("Interior Temperature", "Degrees C", 1),
-    "heaterTemp" : ("Heater Temperature", "Degrees C", 5),
-    "exteriorTemp" : ("Exterior Temperature", "Degrees C", 7),
-    "pressure" : ("Atmospheric Pressure", "PSI", 9),
-    "humidity" : ("Relative Humidity", "%", 11),
-    "altitude" : ("Altitude", "m", 13),
-    "pitch" : ("Pitch", "Degrees", 15),
-    "roll" : ("Roll", "Degrees", 17),
-    "yaw" : ("Yaw", "Degrees", 19),
-    "latitude" : ("Latitude", "Degrees", 27),
-    "longitude" : ("Longitude", "Degrees", 29)
-}
-
-
-def main(filename, measurement):
+KML_TEMPLATE_PATH = 'KML Template.txt'
+NAME_TAG = "<name>"
+POINT_TAG = "<Point>"
+LINE_STRING_TAG = "<LineString>"
+COORDINATES_TAG = "<coordinates>"
+COORDINATE_FORMAT = "%.7f,%.7f,%.2f"
+MEASUREMENTS = dict((column.key, (column.title, column.unit, column.index)) for column in COLUMNS)
+
+
+def main(filename, measurement, tolerance=None):
     """
 
     For the "position" argument, the program generates a KML file which 
     can be viewed in Google Earth.
 
+    Long measurements are decimated to about two points per pixel, and
+    redrawn in more detail as the plot is zoomed in (see decimation.py).
+
     :param filename: (string) Path of the file to be used for plotting
     :param measurement: (string) Key of the measurement to be plotted
+    :param tolerance: (float) If given, the exported path is simplified
+                              to within this many meters
 
     :return: (None)
     """
@@ -56,13 +58,19 @@ def main(filename, measurement):
         altitude = data[:, altitudeIndex]
 
         name = raw_input("Please type a name for the new KML file: ")
-        generateKML(latitude, longitude, altitude, name)
+        generateKML(latitude, longitude, altitude, name, tolerance)
     else:
 
         if not (MEASUREMENTS.has_key(measurement)):
             print "Invalid measurement!", measurement
             return
 
+        # The lines must stay referenced while the plot is shown, since
+        # matplotlib only keeps weak references to their zoom callbacks
+        pyramids = PyramidCache(filename)
+        figure, axes = plt.subplots()
+        lines = []
+
         if measurement == INTERIOR_TEMP:
 
             measurementTitle = MEASUREMENTS[measurement][0]
@@ -75,8 +83,10 @@ def main(filename, measurement):
             x2 = data[:, measurementIndex + 1]
             y2 = data[:, measurementIndex + 2]
 
-            plt.plot(x1, y1, label="Interior Temperature 1")
-            plt.plot(x2, y2, label="Interior Temperature 2")
+            lines.append(DecimatedLine(axes, x1, y1, pyramids.getPyramid(measurementIndex, y1),
+                                       label="Interior Temperature 1"))
+            lines.append(DecimatedLine(axes, x2, y2, pyramids.getPyramid(measurementIndex + 2, y2),
+                                       label="Interior Temperature 2"))
             plt.legend()
 
         else:
@@ -86,51 +96,56 @@ def main(filename, measurement):
 
             x = data[:, measurementIndex - 1]
             y = data[:, measurementIndex]
-            plt.plot(x, y)
+            lines.append(DecimatedLine(axes, x, y, pyramids.getPyramid(measurementIndex, y)))
 
         plt.xlabel("Time (s)")
         plt.ylabel(measurementUnit)
         plt.title(measurementTitle)
+        pyramids.save()
         plt.show()
 
 
-def generateKML(latitude, longitude, altitude, name):
+def generateKML(latitude, longitude, altitude, name, tolerance=None):
     """
     Generates and saves a KML file based on the given latitude, 
-    longitude, and altitude vectors. 
+    longitude, and altitude vectors. The coordinates are written between
+    the sections of the template, which are found by their tags.
 
     :param latitude: (numpy array) Array of latitudes for the points
     :param longitude: (numpy array) Array of longitudes for the points
     :param altitude: (numpy array) Array of altitudes for the points
     :param name: (string) Name of the KML File
+    :param tolerance: (float) If given, the path is simplified to within
+                              this many meters (see decimation.simplifyPath)
 
     :return: (None)
     """
 
     assert(len(latitude) == len(longitude))
-    assert(len(latitude) == len(longitude))
-    numPoints = len(latitude)
+    assert(len(latitude) == len(altitude))
 
-    # Build up the string of points for the KML file
-    pointsString = ""
-    for i in xrange(numPoints):
-        pointsString += (latitude[i] + ',')
-        pointsString += (longitude[i] + ',')
-        pointsString += (altitude[i] + ' ')
+    # KML coordinates are longitude, latitude, altitude
+    coordinates = np.column_stack((longitude, latitude, altitude))
+    if not tolerance is None:
+        coordinates = coordinates[simplifyPath(latitude, longitude, altitude, tolerance)]
 
-    lastPointString = latitude[-1] + ',' + longitude[-1] + ',' + altitude[-1]
-
-    templateFile = open('KML Template.txt', 'rb')
+    templateFile = open(KML_TEMPLATE_PATH, 'r')
     kmlTemplate = templateFile.read()
     templateFile.close()
 
-    # Put the points into a previously formatted KML file
-    kmlTemplate = kmlTemplate[0:1239] + pointsString + kmlTemplate[1239:]
-    kmlTemplate = kmlTemplate[0:1015] + lastPointString + kmlTemplate[1015:]
-    kmlTemplate = kmlTemplate[0:234] + name + kmlTemplate[234:]
-
-    kmlFile = open(os.path.join(KML_FILE_LOCATION, name + ".kml"), 'wb')
-    kmlFile.write(kmlTemplate)
+    # The name, the current position (last point), and the path
+    namePosition = kmlTemplate.index(NAME_TAG) + len(NAME_TAG)
+    pointPosition = kmlTemplate.index(COORDINATES_TAG, kmlTemplate.index(POINT_TAG)) + len(COORDINATES_TAG)
+    linePosition = kmlTemplate.index(COORDINATES_TAG, kmlTemplate.index(LINE_STRING_TAG)) + len(COORDINATES_TAG)
+
+    kmlFile = open(os.path.join(KML_FILE_LOCATION, name + ".kml"), 'w')
+    kmlFile.write(kmlTemplate[0:namePosition])
+    kmlFile.write(name)
+    kmlFile.write(kmlTemplate[namePosition:pointPosition])
+    np.savetxt(kmlFile, coordinates[-1:], fmt=COORDINATE_FORMAT, newline='')
+    kmlFile.write(kmlTemplate[pointPosition:linePosition])
+    np.savetxt(kmlFile, coordinates, fmt=COORDINATE_FORMAT, newline=' ')
+    kmlFile.write(kmlTemplate[linePosition:])
     kmlFile.close()
 
 
@@ -140,7 +155,8 @@ if __name__ == '__main__':
                         help='Filename for the file to plot')
     parser.add_argument('measurement', type=str, nargs=1,
                          help='Name of the measurement to plot')
+    parser.add_argument('-t', '--tolerance', type=float, default=None,
+                        help='Simplify the exported path to within this many meters')
 
     args = parser.parse_args()
-    main(args.filename[0], args.measurement[0])
-    main()
+    main(args.filename[0], args.measurement[0], args.tolerance)
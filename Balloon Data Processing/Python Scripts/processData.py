@@ -3,95 +3,101 @@ Written by Andrew Donelick
 adonelick@hmc.edu
 
 Usage:
-    python processData.py filename
+    python processData.py directory [-p processes]
 
-    filename: (string) Path for the file to process
+    directory: (string) Path for the files to process
+    processes: (int) Number of worker processes (default: one per CPU)
 
 """
 
 import os
 import argparse
+import multiprocessing
+import warnings
 import numpy as np 
 
-NUM_ENTRIES = 15
+from sparkySchema import *
 
-def main(directory):
+PROCESSED_FILENAME = "ProcessedData.csv"
+
+def convertFile(filepath):
     """
-    Converts the data saved by the SPARKY flight computer into a form
-    which can be read and plotted.
+    Converts one data file saved by the SPARKY flight computer, as
+    described by sparkySchema.COLUMNS. Times are left relative to the
+    start of the file; main adds each file's offset once the files
+    before it are known. A file with no data rows (such as one created
+    just before the flight computer was switched off) is skipped. This
+    runs in a worker process, so it must stay a module level function.
 
-    :param directory: (string) Path for the files to process
+    :param filepath: (string) Path for the file to convert
 
-    :return: (None)
+    :return: (numpy array) Converted data, in double precision (no rows if skipped)
     """
 
-    combinedData = None
-    files = os.listdir(directory)
-    files.sort()
-    lastTime = 0
+    with warnings.catch_warnings():
+        # numpy warns about a file with only a header
+        warnings.simplefilter("ignore", UserWarning)
+        rawData = np.loadtxt(filepath, delimiter=',', skiprows=1, ndmin=2)
 
-    for filename in files:
+    if rawData.shape[0] == 0:
+        print("Skipping " + filepath + ": no data rows")
+        return np.zeros((0, 2*NUM_ENTRIES))
 
-        # Skip any non CSV files
-        if not filename.endswith(".csv"):
-            continue
+    return convertData(rawData)
 
-        rawData = np.loadtxt(filename, delimiter=',', skiprows=1)
-        data = np.zeros(rawData.shape, np.float32)
 
-        # Convert the time entries from milliseconds to seconds
-        # Add on the last recorded time from the last data file
-        for i in xrange(NUM_ENTRIES):
-            data[:,2*i] = (rawData[:,2*i] / 1000.0) + lastTime
+def main(directory, processes=None):
+    """
+    Converts the data saved by the SPARKY flight computer into a form
+    which can be read and plotted. The files are converted in parallel,
+    then placed one after another in a single array, with each file's
+    times continuing from the last time of the file before it. Each
+    file's rows are written out as soon as they are in place.
 
-        # Convert the temperature readings to degrees C
-        data[:,1] = (rawData[:,1]).astype(np.int16) / 100.0
-        data[:,3] = (rawData[:,3]).astype(np.int16) / 100.0
-        data[:,5] = (rawData[:,5]).astype(np.int16) / 100.0
-        data[:,7] = (rawData[:,7]).astype(np.int16) / 100.0
+    :param directory: (string) Path for the files to process
+    :param processes: (int) Number of worker processes (default: one per CPU)
 
-        # Convert the pressure reading to PSI
-        data[:,9] = (rawData[:,9]).astype(np.int16) / 1000.0
+    :return: (numpy array) Combined data
+    """
 
-        # Convert humidity readings to %
-        data[:,11] = (rawData[:,11]).astype(np.int16) / 100.0
+    files = sorted(filename for filename in os.listdir(directory) if filename.endswith(".csv"))
+    filepaths = [os.path.join(directory, filename) for filename in files]
 
-        # Convert altitude readings to meters
-        data[:,13] = (rawData[:,13]).astype(np.int32) / 100.0
+    pool = multiprocessing.Pool(processes)
+    try:
+        fileData = pool.map(convertFile, filepaths)
+    finally:
+        pool.close()
+        pool.join()
 
-        # Convert pitch, roll, yaw maeasurements to degrees
-        data[:,15] = (rawData[:,15]).astype(np.int16) / 100.0
-        data[:,17] = (rawData[:,17]).astype(np.int16) / 100.0
-        data[:,19] = (rawData[:,19]).astype(np.int16) / 100.0
+    numRows = sum(data.shape[0] for data in fileData)
+    combinedData = np.zeros((numRows, 2*NUM_ENTRIES), np.float32)
+    lastTime = 0
+    row = 0
 
-        # No conversion necessary for heater status or relay states
-        data[:,21] = rawData[:,21]
-        data[:,23] = rawData[:,23]
+    with open(PROCESSED_FILENAME, 'w') as processedFile:
+        for data in fileData:
 
-        # Convert the GPS time to seconds
-        data[:,25] = ((rawData[:,25]).astype(np.uint32) / 1000000) * 3600
-        data[:,25] += ((rawData[:,25]).astype(np.uint32) / 10000) * 60
-        data[:,25] += ((rawData[:,25]).astype(np.uint32) / 100)
-        data[:,25] += (rawData[:,25]).astype(np.uint32) / 100.0
+            # Add on the last recorded time from the last data file
+            data[:,0:2*NUM_ENTRIES:2] += lastTime
 
-        # No conversion necessary for latitude and longitude
-        data[:,27] = rawData[:,27]
-        data[:,29] = rawData[:,29]
+            fileRows = combinedData[row:row + data.shape[0]]
+            fileRows[:] = data
+            row += data.shape[0]
 
-        if combinedData == None:
-            combinedData = data
-        else:
-            combinedData = np.append(combinedData, data, axis=0)
+            if row > 0:
+                lastTime = combinedData[row - 1, 2*(NUM_ENTRIES - 1)]
 
-        lastTime = combinedData[-1, 2*(NUM_ENTRIES - 1)]
+            np.savetxt(processedFile, fileRows, delimiter=',')
 
-    newFilename = "ProcessedData.csv"
-    np.savetxt(newFilename, combinedData, delimiter=',')
+    return combinedData
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Process balloon data file')
     parser.add_argument('directory', type=str, nargs=1,
                         help='Directory of the files to process')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='Number of worker processes (default: one per CPU)')
 
     args = parser.parse_args()
-    main(args.filename[0])
+    main(args.directory[0], args.processes)
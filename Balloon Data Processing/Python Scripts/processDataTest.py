@@ -0,0 +1,74 @@
+"""
+processDataTest.py
+
+Checks that processData combines a directory of SPARKY data files, and
+skips files with no data rows. Run directly, or with pytest.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+
+import processData
+from sparkySchema import *
+
+
+def writeDataFile(directory, filename, numRows):
+    """
+    Writes a SPARKY data file whose times count up from 1000 ms.
+
+    :param directory: (string) Directory to write the file to
+    :param filename: (string) Name of the file
+    :param numRows: (int) Number of data rows
+
+    :return: (None)
+    """
+    header = ','.join(column.key + '_time,' + column.key for column in COLUMNS)
+    rawData = np.zeros((numRows, 2*NUM_ENTRIES))
+    rawData[:, TIME_INDICES] = 1000.0 * np.arange(1, numRows + 1)[:, np.newaxis]
+
+    with open(os.path.join(directory, filename), 'w') as dataFile:
+        dataFile.write(header + '\n')
+        for row in rawData:
+            dataFile.write(','.join(str(value) for value in row) + '\n')
+
+
+def test_header_only_file_skipped():
+    directory = tempfile.mkdtemp()
+    try:
+        writeDataFile(directory, 'DATA000.csv', 0)
+        assert processData.convertFile(os.path.join(directory, 'DATA000.csv')).shape == (0, 2*NUM_ENTRIES)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_files_combined():
+    directory = tempfile.mkdtemp()
+    workingDirectory = os.getcwd()
+    try:
+        writeDataFile(directory, 'DATA000.csv', 3)
+        writeDataFile(directory, 'DATA001.csv', 0)
+        writeDataFile(directory, 'DATA002.csv', 2)
+
+        # The processed file is written to the working directory
+        os.chdir(directory)
+        combinedData = processData.main(directory, processes=2)
+
+        # The times of each file carry on from the file before it
+        assert combinedData.shape == (5, 2*NUM_ENTRIES)
+        assert np.allclose(combinedData[:, 0], [1.0, 2.0, 3.0, 4.0, 5.0])
+        assert np.loadtxt(processData.PROCESSED_FILENAME, delimiter=',', ndmin=2).shape == (5, 2*NUM_ENTRIES)
+    finally:
+        os.chdir(workingDirectory)
+        shutil.rmtree(directory)
+
+
+def main():
+    test_header_only_file_skipped()
+    test_files_combined()
+    print("All processData tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+sparkySchema.py
+
+Layout of the data files saved by the SPARKY flight computer. Each file
+holds NUM_ENTRIES measurements, each as a pair of columns: the time of
+the reading (ms since reset) followed by its raw value. COLUMNS describes
+every measurement once (its raw type, scale and unit), and convertData
+uses that description to convert a whole file at once, so that the
+processing and plotting scripts always agree on the column indices.
+"""
+
+from collections import namedtuple
+import numpy as np
+
+NUM_ENTRIES = 15
+TIME_SCALE = 1000.0
+
+# GPS times are logged as a single integer, HHMMSScc
+HHMMSSCC = "hhmmsscc"
+
+# key: (string) Name used to refer to the measurement
+# title: (string) Title of the measurement, for plots
+# unit: (string) Unit of the converted value
+# index: (int) Column of the value (the time of the reading is index - 1)
+# rawType: (numpy.dtype) Type the raw value was logged as (None: no conversion)
+# scale: (float) Number of raw units in one converted unit
+Column = namedtuple('Column', ['key', 'title', 'unit', 'index', 'rawType', 'scale'])
+
+COLUMNS = [
+    Column("interiorTemp", "Interior Temperature", "Degrees C", 1, np.int16, 100.0),
+    Column("interiorTemp2", "Interior Temperature 2", "Degrees C", 3, np.int16, 100.0),
+    Column("heaterTemp", "Heater Temperature", "Degrees C", 5, np.int16, 100.0),
+    Column("exteriorTemp", "Exterior Temperature", "Degrees C", 7, np.int16, 100.0),
+    Column("pressure", "Atmospheric Pressure", "PSI", 9, np.int16, 1000.0),
+    Column("humidity", "Relative Humidity", "%", 11, np.int16, 100.0),
+    Column("altitude", "Altitude", "m", 13, np.int32, 100.0),
+    Column("pitch", "Pitch", "Degrees", 15, np.int16, 100.0),
+    Column("roll", "Roll", "Degrees", 17, np.int16, 100.0),
+    Column("yaw", "Yaw", "Degrees", 19, np.int16, 100.0),
+    Column("heaterStatus", "Heater Status", "", 21, None, 1.0),
+    Column("relayStates", "Relay States", "", 23, None, 1.0),
+    Column("gpsTime", "GPS Time", "s", 25, HHMMSSCC, 100.0),
+    Column("latitude", "Latitude", "Degrees", 27, None, 1.0),
+    Column("longitude", "Longitude", "Degrees", 29, None, 1.0)
+]
+
+COLUMNS_BY_KEY = dict((column.key, column) for column in COLUMNS)
+
+TIME_INDICES = np.array([column.index - 1 for column in COLUMNS])
+VALUE_INDICES = np.array([column.index for column in COLUMNS])
+SCALES = np.array([column.scale for column in COLUMNS])
+
+
+def getRawTypePositions():
+    """
+    Groups the measurements which need converting by their raw type.
+
+    :return: (dict) Positions within VALUE_INDICES, keyed by raw type
+    """
+    rawTypePositions = {}
+    for position, column in enumerate(COLUMNS):
+        if column.rawType is not None:
+            rawTypePositions.setdefault(column.rawType, []).append(position)
+    return rawTypePositions
+
+
+def getColumn(key):
+    """
+    Gets the description of a measurement.
+
+    :param key: (string) Key of the measurement
+
+    :return: (Column) Description of the measurement
+    """
+    return COLUMNS_BY_KEY[key]
+
+
+def decodeHHMMSScc(rawTimes):
+    """
+    Converts GPS times logged as HHMMSScc into hundredths of a second
+    since midnight.
+
+    :param rawTimes: (numpy array) Raw GPS times
+
+    :return: (numpy array) Hundredths of a second since midnight
+    """
+    rawTimes = rawTimes.astype(np.uint32)
+    hours = rawTimes // 1000000
+    minutes = (rawTimes // 10000) % 100
+    seconds = (rawTimes // 100) % 100
+    hundredths = rawTimes % 100
+    return ((hours * 3600 + minutes * 60 + seconds) * 100 + hundredths).astype(np.float64)
+
+
+RAW_TYPE_POSITIONS = getRawTypePositions()
+
+
+def convertData(rawData):
+    """
+    Converts the raw columns of a SPARKY data file. Times become seconds,
+    and each value is reinterpreted as its raw type and divided by its
+    scale. Columns sharing a raw type are converted together, so the
+    number of NumPy operations does not grow with the number of columns.
+
+    :param rawData: (numpy array) Raw data, one row per line of the file
+
+    :return: (numpy array) Converted data, in double precision
+    """
+    data = np.zeros(rawData.shape, np.float64)
+    data[:, TIME_INDICES] = rawData[:, TIME_INDICES] / TIME_SCALE
+
+    values = rawData[:, VALUE_INDICES]
+    for rawType, positions in RAW_TYPE_POSITIONS.items():
+        if rawType == HHMMSSCC:
+            values[:, positions] = decodeHHMMSScc(values[:, positions])
+        else:
+            # Through int64 first, so that values too large for the raw
+            # type wrap around instead of overflowing the float cast
+            values[:, positions] = values[:, positions].astype(np.int64).astype(rawType)
+
+    data[:, VALUE_INDICES] = values / SCALES
+    return data
@@ -0,0 +1,67 @@
+"""
+sparkySchemaTest.py
+
+Checks the conversion of SPARKY data files against values worked out by
+hand. Run directly, or with pytest.
+"""
+
+import numpy as np
+
+from sparkySchema import *
+
+
+def makeRawRow(values):
+    """
+    Builds one raw line of a SPARKY data file.
+
+    :param values: (dict) Raw value of each measurement, by key (others are 0)
+
+    :return: (numpy array) Raw data with one row
+    """
+    rawData = np.zeros((1, 2 * NUM_ENTRIES), np.float64)
+    for key, value in values.items():
+        rawData[0, getColumn(key).index] = value
+    return rawData
+
+
+def test_decode_gps_time():
+    # 12:34:56.78 is 45296.78 seconds after midnight
+    rawTimes = np.array([12345678, 0, 23595999])
+    expected = np.array([4529678, 0, 8639999])
+    assert np.array_equal(decodeHHMMSScc(rawTimes), expected)
+
+
+def test_convert_gps_time():
+    # Each field is taken on its own: hh*3600 + mm*60 + ss + cc/100 seconds
+    data = convertData(makeRawRow({"gpsTime" : 12345678}))
+    assert np.isclose(data[0, getColumn("gpsTime").index], 45296.78)
+
+
+def test_convert_signed_values():
+    # Values are logged unsigned, and reinterpreted as their raw type
+    data = convertData(makeRawRow({"interiorTemp" : 65535, "pressure" : 14696, "altitude" : 2**32 - 100}))
+    assert np.isclose(data[0, getColumn("interiorTemp").index], -0.01)
+    assert np.isclose(data[0, getColumn("pressure").index], 14.696)
+    assert np.isclose(data[0, getColumn("altitude").index], -1.0)
+
+
+def test_convert_times_and_unscaled_values():
+    rawData = makeRawRow({"latitude" : 47.1234567, "relayStates" : 5})
+    rawData[0, TIME_INDICES] = 1500
+    data = convertData(rawData)
+
+    assert np.allclose(data[0, TIME_INDICES], 1.5)
+    assert data[0, getColumn("latitude").index] == 47.1234567
+    assert data[0, getColumn("relayStates").index] == 5
+
+
+def main():
+    test_decode_gps_time()
+    test_convert_gps_time()
+    test_convert_signed_values()
+    test_convert_times_and_unscaled_values()
+    print("All schema tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,8 +6,15 @@ balloon module from the ground station software.
 
 """
 
+import socket
 from datetime import datetime
 
+# Python 2 reads a line from the user with raw_input
+try:
+    input = raw_input
+except NameError:
+    pass
+
 NOTHING = ''
 RADIO_TEST = "RADIO_TEST"
 CHANGE_TRANSMISSION_RATE = "CHANGE_TRANSMISSION_RATE"
@@ -38,11 +45,61 @@ OFF = "OFF"
 
 COMMAND_LOG_PATH = "balloon_commands.txt"
 
+# Address of the CommandServer run by the program operating the radio
+COMMAND_HOST = "127.0.0.1"
+COMMAND_PORT = 52000
+
+# Seconds before the first retransmission of an unacknowledged command,
+# and the most between any two (see CommandScheduler)
+INITIAL_TIMEOUT = 5.0
+MAX_TIMEOUT = 60.0
+BACKOFF_FACTOR = 2.0
+
+# Transmissions of a command before giving up on its ACK
+MAX_ATTEMPTS = 6
+
+# Seconds without data packets before commands are sent without waiting
+# for the payload's listening window
+SILENCE_TIMEOUT = 30.0
+
+# Whether each command carries a sequence number in its first padding
+# word, for the payload to echo in its ACK. Payloads which do not echo
+# sequence numbers expect the padding value there, so this is off by
+# default, and ACKs are matched to commands by their command and value.
+SEQUENCE_NUMBERS = False
+
+
+def getMaxCommandTime(initialTimeout=INITIAL_TIMEOUT, maxTimeout=MAX_TIMEOUT, backoffFactor=BACKOFF_FACTOR,
+                      maxAttempts=MAX_ATTEMPTS, silenceTimeout=SILENCE_TIMEOUT):
+    """
+    Gets the longest time the CommandScheduler takes to resolve a command
+    sent on its own. Before each transmission, the command may wait for
+    almost silenceTimeout seconds for a listening window (when data
+    packets arrive just less often than that), and after each one it
+    waits for the ACK.
+
+    :param initialTimeout: (float) Seconds to wait for an ACK after the first transmission
+    :param maxTimeout: (float) Most seconds to wait for an ACK after any transmission
+    :param backoffFactor: (float) Factor the wait grows by after each transmission
+    :param maxAttempts: (int) Transmissions of a command before giving up
+    :param silenceTimeout: (float) Seconds without data packets before ignoring the windows
+
+    :return: (float) Seconds from submitting the command until it is given up on
+    """
+    ackWaits = sum(min(initialTimeout * backoffFactor**attempt, maxTimeout) for attempt in range(maxAttempts))
+    return maxAttempts * silenceTimeout + ackWaits
+
+
+# Seconds to wait for the reply to a command: long enough for the
+# scheduler to give up on it, with a margin for the server
+COMMAND_TIMEOUT = getMaxCommandTime() + 10.0
+
 def getCommands():
     """
     Get the command we wish to send to the balloon payload from the user.
-    Once a command is received, it is logged into a file for retrieval
-    by the program operating the radio.
+    Once a command is confirmed, it is submitted to the program operating
+    the radio (see submitCommand), and logged into the command file as a
+    record of the session.
 
     :return: (None)
     """
@@ -56,7 +113,7 @@ def getCommands():
 
     while True:
 
-        command = raw_input(">>> ")
+        command = input(">>> ")
         commandParts = command.split()
 
         # Check if we want to quit the program
@@ -77,14 +134,63 @@ def getCommands():
             continue
 
         # Save the command to the command log file, if really desired
-        sendCommand = raw_input("Send Command \"" + command + "\"? ")
+        sendCommand = input("Send Command \"" + command + "\"? ")
         if sendCommand == YES:
+            try:
+                print(submitCommand(command))
+            except socket.timeout:
+                print("No reply from the radio in time; the command may still have been sent")
+            except socket.error as error:
+                print("Could not reach the radio: " + str(error))
+                continue
+
             fileHandle = open(COMMAND_LOG_PATH, 'a')
             fileHandle.write(command)
             fileHandle.write('\n')
             fileHandle.close()
 
 
+def submitCommand(command, host=COMMAND_HOST, port=COMMAND_PORT, timeout=COMMAND_TIMEOUT):
+    """
+    Submits a command to the CommandServer of the program operating the
+    radio, and waits for it to be sent (or acknowledged by the payload).
+
+    :param command: (string) Command, as typed by the user (e.g. "SWITCH_RELAYS 3")
+    :param host: (string) Address of the command server
+    :param port: (int) Port of the command server
+    :param timeout: (float) Longest time to wait for the reply, in seconds
+
+    :return: (string) Reply from the server (see CommandServer)
+    """
+    connection = socket.create_connection((host, port), timeout)
+    try:
+        connection.sendall((command + '\n').encode('ascii'))
+        reply = connection.makefile('rb').readline()
+    finally:
+        connection.close()
+
+    return reply.decode('ascii').strip()
+
+
+def getCommandArguments(command):
+    """
+    Splits a command string into the arguments of a CommandPacket.
+
+    :param command: (string) Valid command (see parseCommand)
+
+    :return: (2-tuple) Command string and command value
+    """
+    tokens = command.split()
+    commandString = tokens[0]
+
+    if len(tokens) == 2:
+        commandValue = int(tokens[1])
+    else:
+        commandValue = 0
+
+    return commandString, commandValue
+
+
 def parseCommand(command):
     """
     Determines if a command string is a valid command. This function
@@ -0,0 +1,121 @@
+"""
+BufferedLog.py
+
+Base class of the ground station's log files (see TelemetryLogger and
+FlightLog). Entries are written to a buffered file, which is flushed
+once enough entries are waiting, or once they have waited long enough,
+even if no more entries arrive. Subclasses only turn what they log into
+the text or bytes of an entry.
+"""
+
+import os
+import threading
+import time
+
+# Default policy for flushing entries to the file
+FLUSH_ENTRIES = 20
+FLUSH_INTERVAL = 2.0
+
+
+class BufferedLogWriter(object):
+
+    def __init__(self, filename, mode, flushEntries=FLUSH_ENTRIES, flushInterval=FLUSH_INTERVAL, fsync=False):
+        """
+        Creates a new BufferedLogWriter object, and opens the log file.
+        Entries are flushed to the file once flushEntries entries are
+        waiting, or at most flushInterval seconds after the first of them
+        was written.
+
+        :param filename: (string) Name of the log file
+        :param mode: (string) Mode to open the file in ('a' or 'ab')
+        :param flushEntries: (int) Entries to buffer before flushing
+        :param flushInterval: (float) Longest time to keep entries buffered, in seconds
+        :param fsync: (boolean) Whether to also fsync the file on each flush
+
+        :return: (BufferedLogWriter) New buffered log writer
+        """
+        self.filename = filename
+        self.flushEntries = flushEntries
+        self.flushInterval = flushInterval
+        self.fsync = fsync
+
+        self._fileHandle = open(filename, mode)
+        self._pendingEntries = 0
+        self._lastFlush = time.time()
+
+        # Flushes the buffered entries once flushInterval has passed
+        self._lock = threading.Lock()
+        self._timer = None
+
+
+    def writeEntry(self, entry):
+        """
+        Adds an entry to the log file.
+
+        :param entry: (string or bytes) Entry, as it is written to the file
+
+        :return: (None)
+        """
+        with self._lock:
+            self._fileHandle.write(entry)
+            self._pendingEntries += 1
+
+            if (self._pendingEntries >= self.flushEntries) or (time.time() - self._lastFlush >= self.flushInterval):
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flushInterval, self._flushOnTimer)
+                self._timer.daemon = True
+                self._timer.start()
+
+
+    def flush(self):
+        """
+        Writes any buffered entries to the file.
+
+        :return: (None)
+        """
+        with self._lock:
+            self._flush()
+
+
+    def close(self):
+        """
+        Flushes any buffered entries and closes the file.
+
+        :return: (None)
+        """
+        with self._lock:
+            if not self._fileHandle.closed:
+                self._flush()
+                self._fileHandle.close()
+
+
+    def _flush(self):
+        """
+        Writes any buffered entries to the file (with the lock held).
+
+        :return: (None)
+        """
+        if not self._timer is None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._fileHandle.flush()
+        if self.fsync:
+            os.fsync(self._fileHandle.fileno())
+
+        self._pendingEntries = 0
+        self._lastFlush = time.time()
+
+
+    def _flushOnTimer(self):
+        """
+        Flushes the buffered entries once flushInterval has passed without
+        a flush, for when no more entries arrive to trigger one.
+
+        :return: (None)
+        """
+        with self._lock:
+            self._timer = None
+            if (self._pendingEntries > 0) and not self._fileHandle.closed:
+                self._flush()
@@ -0,0 +1,84 @@
+"""
+Checksum.py
+
+16-bit checksum of the data values in a packet, as computed by the
+flight firmware. The data is summed as little-endian 16-bit words,
+modulo 2^16, and the checksum is 0xFFFF minus the sum. A trailing odd
+byte is padded with a zero byte in front of it, so it ends up in the
+high byte of its word.
+"""
+
+import struct
+import numpy as np
+
+
+def checksum16(data):
+    """
+    Computes the checksum of a byte buffer in one vectorized pass. The
+    buffer is read in place, so a slice of a received frame can be
+    checked without copying or re-encoding it.
+
+    :param data: (bytes-like) Buffer holding the data values
+
+    :return: (int) Checksum of the data values
+    """
+    view = memoryview(data).cast('B')
+    numBytes = len(view)
+    numWords = numBytes // 2
+
+    valueSum = 0
+    if numWords:
+        words = np.frombuffer(view, dtype='<u2', count=numWords)
+        valueSum = int(words.sum(dtype=np.uint64))
+
+    if numBytes % 2:
+        valueSum += view[-1] << 8
+
+    return 0xFFFF - (valueSum & 0xFFFF)
+
+
+def checksum16Rows(rows):
+    """
+    Computes the checksum of many equal-length buffers at once. Each row
+    of the array holds the data values of one packet.
+
+    :param rows: (numpy array) 2D array of bytes, one packet per row
+
+    :return: (numpy array) Checksum of each row, as uint16
+    """
+    rows = np.asarray(rows, dtype=np.uint8)
+    numBytes = rows.shape[1]
+    evenEnd = numBytes - (numBytes % 2)
+
+    lowSum = rows[:, 0:evenEnd:2].sum(axis=1, dtype=np.uint64)
+    highSum = rows[:, 1::2].sum(axis=1, dtype=np.uint64)
+    if numBytes % 2:
+        highSum += rows[:, -1]
+
+    valueSum = (lowSum + (highSum << np.uint64(8))) & np.uint64(0xFFFF)
+    return (np.uint64(0xFFFF) - valueSum).astype(np.uint16)
+
+
+def legacyChecksum16(data):
+    """
+    Computes the checksum one word at a time, exactly as the original
+    ground station code (and the flight firmware) does. Kept as the
+    reference for checksum16.
+
+    :param data: (bytes-like) Buffer holding the data values
+
+    :return: (int) Checksum of the data values
+    """
+    dataBytes = bytes(data)
+    numBytes = len(dataBytes)
+
+    valueSum = 0
+    for i in range(0, numBytes, 2):
+
+        if i == numBytes - 1:
+            chunk = struct.unpack('<H', b'\x00' + dataBytes[i:])[0]
+        else:
+            chunk = struct.unpack('<H', dataBytes[i:i+2])[0]
+        valueSum = (valueSum + chunk) & 0xFFFF
+
+    return 0xFFFF - valueSum
@@ -2,17 +2,27 @@
 CommandPacket.py 
 
 Class that defines the command packet to be sent to the balloon payload.
+The payload acknowledges a command with an ACK packet of the same layout.
+The first of the padding words may carry the command's sequence number,
+so that each ACK can be matched with the command it acknowledges (see
+SEQUENCE_NUMBERS in BalloonCommands). By default it holds padding.
 """
 
 from Packet import *
 from BalloonCommands import COMMAND_INDICES
 
+PADDING = 0x12345678
+
 class CommandPacket(Packet):
 
-    def __init__(self, commandString='', commandValue=0):
+    def __init__(self, commandString='', commandValue=0, sequenceNumber=PADDING):
         """
         Creates a new command packet. Overrides the Packet constructor.
 
+        :param commandString: (string) Command to send (see BalloonCommands)
+        :param commandValue: (int) Value given with the command
+        :param sequenceNumber: (int) Sequence number of the command
+
         :return: (CommandPacket) New command packet
         """
 
@@ -22,5 +32,26 @@ class CommandPacket(Packet):
 
         commandIndex = COMMAND_INDICES[commandString]
         self.values = [COMMAND, commandIndex, commandValue,
-                       0x12345678, 0x12345678, 0x12345678,
-                       0x12345678, 0x12345678]
\ No newline at end of file
+                       sequenceNumber, PADDING, PADDING,
+                       PADDING, PADDING]
+
+
+    def isAck(self):
+        """
+        Checks whether the packet is an ACK from the payload.
+
+        :return: (boolean) Whether the packet is an ACK
+        """
+        return self.values[0] == ACK
+
+
+    def getCommandIndex(self):
+        return self.values[1]
+
+
+    def getCommandValue(self):
+        return self.values[2]
+
+
+    def getSequenceNumber(self):
+        return self.values[3]
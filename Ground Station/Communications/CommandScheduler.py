@@ -0,0 +1,329 @@
+"""
+CommandScheduler.py
+
+Class that sends commands to the balloon payload until they are
+acknowledged. ACKs are matched to commands by their command and value,
+or, when SEQUENCE_NUMBERS is on (see BalloonCommands), by a sequence
+number given to each command. Unacknowledged commands are retransmitted with
+exponential backoff, and only while the payload is listening: the radio
+link is half duplex, and the payload listens for commands for a short
+window after it sends each data packet. All of the commands due in a
+window are sent together in one write, as long as they fit in the window
+at the link's speed. If no data packets have been heard for a while (so
+the windows are unknown), commands are sent as soon as they are due.
+
+The scheduler runs on the station I/O loop (see StationIO.py); its
+public methods may be called from any thread.
+"""
+
+import concurrent.futures
+import itertools
+import struct
+
+from BalloonCommands import *
+from CommandPacket import *
+from StationIO import RADIO
+
+# Seconds the payload listens for commands after sending a data packet
+LISTENING_WINDOW = 2.0
+
+# Bytes the radio sends each second (1200 baud, 10 bits per byte)
+BYTES_PER_SECOND = 120.0
+
+
+class PendingCommand(object):
+
+    __slots__ = ('commandPacket', 'frame', 'attempts', 'nextSendTime', 'future')
+
+    def __init__(self, commandPacket, future):
+        """
+        Creates a new PendingCommand object.
+
+        :param commandPacket: (CommandPacket) Command to send
+        :param future: (concurrent.futures.Future) Resolved once the command
+                                                   is acknowledged or given up on
+
+        :return: (PendingCommand) New pending command, due immediately
+        """
+        self.commandPacket = commandPacket
+        self.frame = commandPacket.getKISS()
+        self.attempts = 0
+        self.nextSendTime = 0.0
+        self.future = future
+
+
+class CommandScheduler(object):
+
+    def __init__(self, stationIO, portName=RADIO,
+                 initialTimeout=INITIAL_TIMEOUT, maxTimeout=MAX_TIMEOUT, backoffFactor=BACKOFF_FACTOR,
+                 maxAttempts=MAX_ATTEMPTS, listeningWindow=LISTENING_WINDOW,
+                 silenceTimeout=SILENCE_TIMEOUT, bytesPerSecond=BYTES_PER_SECOND,
+                 sequenceNumbers=SEQUENCE_NUMBERS):
+        """
+        Creates a new CommandScheduler object.
+
+        :param stationIO: (StationIO) Station I/O core which owns the radio
+        :param portName: (string) Name of the radio's port
+        :param initialTimeout: (float) Seconds to wait for an ACK after the first transmission
+        :param maxTimeout: (float) Most seconds to wait for an ACK after any transmission
+        :param backoffFactor: (float) Factor the wait grows by after each transmission
+        :param maxAttempts: (int) Transmissions of a command before giving up
+        :param listeningWindow: (float) Seconds the payload listens after each data packet
+        :param silenceTimeout: (float) Seconds without data packets before ignoring the windows
+        :param bytesPerSecond: (float) Speed of the radio link
+        :param sequenceNumbers: (boolean) Whether commands carry their sequence numbers
+
+        :return: (CommandScheduler) New command scheduler
+        """
+        self.stationIO = stationIO
+        self.portName = portName
+        self.initialTimeout = initialTimeout
+        self.maxTimeout = maxTimeout
+        self.backoffFactor = backoffFactor
+        self.maxAttempts = maxAttempts
+        self.listeningWindow = listeningWindow
+        self.silenceTimeout = silenceTimeout
+        self.bytesPerSecond = bytesPerSecond
+        self.sequenceNumbers = sequenceNumbers
+
+        # Pending commands are kept by sequence number even when it is not
+        # sent. It never uses the padding value, which is what an ACK from
+        # a payload that does not echo sequence numbers carries
+        self._sequenceNumbers = (n & 0xFFFFFFFF for n in itertools.count(1) if (n & 0xFFFFFFFF) != PADDING)
+        self._pending = {}
+        self._windowEnd = None
+        self._lastDataTime = None
+        self._sendEnd = 0.0
+        self._timer = None
+
+
+    def submit(self, commandString, commandValue=0):
+        """
+        Queues a command to send to the payload.
+
+        :param commandString: (string) Command to send (see BalloonCommands)
+        :param commandValue: (int) Value given with the command
+
+        :return: (concurrent.futures.Future) Resolves to True once the command
+                                             is acknowledged, or False if it
+                                             never is. It holds the error
+                                             instead if the command could not
+                                             be built.
+        """
+        future = concurrent.futures.Future()
+        self.stationIO.loop.call_soon_threadsafe(self._submit, commandString, commandValue, future)
+        return future
+
+
+    def onDataPacket(self):
+        """
+        Notes that a data packet was just received, which opens a
+        listening window.
+
+        :return: (None)
+        """
+        self.stationIO.loop.call_soon_threadsafe(self._openWindow)
+
+
+    def onAckPacket(self, ackPacket):
+        """
+        Matches a received ACK with the command it acknowledges.
+
+        :param ackPacket: (CommandPacket) Decoded ACK packet
+
+        :return: (None)
+        """
+        self.stationIO.loop.call_soon_threadsafe(self._acknowledge, ackPacket)
+
+
+    def getNumPending(self):
+        """
+        Gets the number of commands which have not been acknowledged yet.
+
+        :return: (int) Number of pending commands
+        """
+        return len(self._pending)
+
+
+    def _submit(self, commandString, commandValue, future):
+        """
+        Queues a command (on the loop's thread).
+
+        :param commandString: (string) Command to send
+        :param commandValue: (int) Value given with the command
+        :param future: (concurrent.futures.Future) Future of the command
+
+        :return: (None)
+        """
+        sequenceNumber = next(self._sequenceNumbers)
+        try:
+            if self.sequenceNumbers:
+                commandPacket = CommandPacket(commandString, commandValue, sequenceNumber)
+            else:
+                commandPacket = CommandPacket(commandString, commandValue)
+            pending = PendingCommand(commandPacket, future)
+        except (KeyError, ValueError, struct.error) as error:
+            # An unknown command or a value which does not fit its field
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+            return
+
+        self._pending[sequenceNumber] = pending
+        self._service()
+
+
+    def _openWindow(self):
+        """
+        Opens a listening window (on the loop's thread).
+
+        :return: (None)
+        """
+        now = self.stationIO.loop.time()
+        self._lastDataTime = now
+        self._windowEnd = now + self.listeningWindow
+        self._service()
+
+
+    def _acknowledge(self, ackPacket):
+        """
+        Resolves the command acknowledged by an ACK (on the loop's thread).
+        Without sequence numbers, or if the ACK carries only padding, it
+        acknowledges the oldest pending command with the same command and
+        value.
+
+        :param ackPacket: (CommandPacket) Decoded ACK packet
+
+        :return: (None)
+        """
+        sequenceNumber = ackPacket.getSequenceNumber()
+        if (not self.sequenceNumbers) or (sequenceNumber == PADDING):
+            for pendingNumber in sorted(self._pending):
+                commandPacket = self._pending[pendingNumber].commandPacket
+                if (commandPacket.getCommandIndex() == ackPacket.getCommandIndex()) and \
+                   (commandPacket.getCommandValue() == ackPacket.getCommandValue()):
+                    sequenceNumber = pendingNumber
+                    break
+
+        pending = self._pending.pop(sequenceNumber, None)
+        if not pending is None:
+            self._resolve(pending, True)
+            self._service()
+
+
+    def _resolve(self, pending, acknowledged):
+        """
+        Resolves the future of a command, unless its submitter cancelled it.
+
+        :param pending: (PendingCommand) Command which is no longer pending
+        :param acknowledged: (boolean) Whether the command was acknowledged
+
+        :return: (None)
+        """
+        if pending.future.set_running_or_notify_cancel():
+            pending.future.set_result(acknowledged)
+
+
+    def _isListening(self, now):
+        """
+        Checks whether commands may be sent now.
+
+        :param now: (float) Current loop time
+
+        :return: (boolean) Whether the payload is listening (or its windows are unknown)
+        """
+        return self._isSilent(now) or (now < self._windowEnd)
+
+
+    def _isSilent(self, now):
+        """
+        Checks whether the payload's listening windows are unknown, because
+        no data packet has been received for silenceTimeout seconds.
+
+        :param now: (float) Current loop time
+
+        :return: (boolean) Whether commands are sent without waiting for a window
+        """
+        return (self._lastDataTime is None) or (now - self._lastDataTime >= self.silenceTimeout)
+
+
+    def _service(self):
+        """
+        Gives up on commands which have run out of attempts, sends every
+        command which is due (if the payload is listening), and sets a
+        timer for when the next command is due.
+
+        :return: (None)
+        """
+        loop = self.stationIO.loop
+        now = loop.time()
+
+        if not self._timer is None:
+            self._timer.cancel()
+            self._timer = None
+
+        for sequenceNumber, pending in list(self._pending.items()):
+            if (pending.attempts >= self.maxAttempts) and (pending.nextSendTime <= now):
+                del self._pending[sequenceNumber]
+                self._resolve(pending, False)
+
+        if self._isListening(now):
+            # Bytes the radio can still send before the window closes,
+            # after those it has already been given
+            sendStart = max(now, self._sendEnd)
+            if self._isSilent(now):
+                budget = None
+            else:
+                budget = (self._windowEnd - sendStart) * self.bytesPerSecond
+
+            frames = []
+            numBytes = 0
+            for sequenceNumber in sorted(self._pending):
+                pending = self._pending[sequenceNumber]
+                if pending.nextSendTime > now:
+                    continue
+
+                # An idle radio always sends at least one command in a window
+                if (not budget is None) and (numBytes + len(pending.frame) > budget):
+                    if frames or (sendStart > now):
+                        break
+
+                frames.append(pending.frame)
+                numBytes += len(pending.frame)
+                pending.nextSendTime = now + min(self.initialTimeout * self.backoffFactor**pending.attempts, self.maxTimeout)
+                pending.attempts += 1
+
+            if frames:
+                self.stationIO.send(self.portName, b''.join(frames))
+                self._sendEnd = sendStart + numBytes / self.bytesPerSecond
+
+        if self._pending:
+            wakeTime = min(self._getWakeTime(pending, now) for pending in self._pending.values())
+            self._timer = loop.call_at(wakeTime, self._service)
+
+
+    def _getWakeTime(self, pending, now):
+        """
+        Gets the next time a pending command needs the scheduler, after
+        the commands due now have been sent. A command which could not be
+        sent now (the payload is not listening, or the window is full)
+        waits for the next data packet, which services the scheduler
+        itself, or for the silence timeout if no more data packets arrive.
+
+        :param pending: (PendingCommand) Pending command
+        :param now: (float) Current loop time
+
+        :return: (float) Loop time to service the scheduler at (always after now)
+        """
+        # The command is given up on once its last wait is over
+        if pending.attempts >= self.maxAttempts:
+            return pending.nextSendTime
+
+        # The windows are unknown, so every due command has been sent
+        if self._isSilent(now):
+            return pending.nextSendTime
+
+        # The command is due later in the current window
+        if now < pending.nextSendTime < self._windowEnd:
+            return pending.nextSendTime
+
+        return max(pending.nextSendTime, self._lastDataTime + self.silenceTimeout)
@@ -0,0 +1,129 @@
+"""
+CommandServer.py
+
+Local server which receives the commands to send to the balloon payload.
+Clients (such as BalloonCommands.getCommands) connect over TCP on the
+local machine and send one command per line, in the form typed by the
+user (for example "SWITCH_RELAYS 3"). Each command is handed to the
+program operating the radio as soon as it arrives, and the client is
+told once it has been sent, or, when the program tracks ACKs (see
+CommandScheduler), whether the payload acknowledged it.
+"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import struct
+
+from BalloonCommands import *
+
+# Replies sent to the client for each command
+REPLY_SENT = "SENT"
+REPLY_ACKNOWLEDGED = "ACKNOWLEDGED"
+REPLY_UNACKNOWLEDGED = "UNACKNOWLEDGED"
+REPLY_INVALID = "INVALID"
+REPLY_FAILED = "FAILED"
+
+
+class CommandServer(object):
+
+    def __init__(self, onCommand, host=COMMAND_HOST, port=COMMAND_PORT):
+        """
+        Creates a new CommandServer object. The server does not listen
+        until start is run on an event loop.
+
+        :param onCommand: (function) Called with each valid command string.
+                                     It may return a future or awaitable,
+                                     which the server waits on before
+                                     replying to the client. A result of
+                                     True or False tells whether the
+                                     command was acknowledged.
+        :param host: (string) Address to listen on (the local machine only)
+        :param port: (int) Port to listen on
+
+        :return: (CommandServer) New command server
+        """
+        self.onCommand = onCommand
+        self.host = host
+        self.port = port
+        self._server = None
+
+
+    async def start(self):
+        """
+        Starts listening for clients.
+
+        :return: (None)
+        """
+        self._server = await asyncio.start_server(self._handleClient, self.host, self.port)
+
+
+    def close(self):
+        """
+        Stops listening for clients.
+
+        :return: (None)
+        """
+        if not self._server is None:
+            self._server.close()
+            self._server = None
+
+
+    async def _handleClient(self, reader, writer):
+        """
+        Receives commands from a client until it disconnects, replying to
+        each one with one of the REPLY_ values.
+
+        :param reader: (asyncio.StreamReader) Stream from the client
+        :param writer: (asyncio.StreamWriter) Stream to the client
+
+        :return: (None)
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                command = line.decode('ascii', 'replace').strip()
+                if not command:
+                    continue
+
+                reply = await self._sendCommand(command)
+                writer.write((reply + '\n').encode('ascii'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    async def _sendCommand(self, command):
+        """
+        Checks a command and hands it to onCommand.
+
+        :param command: (string) Command from the client
+
+        :return: (string) Reply for the client
+        """
+        if not (command.split()[0] in ALL_COMMANDS) or not parseCommand(command):
+            return REPLY_INVALID
+
+        try:
+            result = self.onCommand(command)
+            if isinstance(result, concurrent.futures.Future):
+                result = await asyncio.wrap_future(result)
+            elif inspect.isawaitable(result):
+                result = await result
+        except (KeyError, ValueError, struct.error) as error:
+            print("Invalid command \"" + command + "\": " + str(error))
+            return REPLY_INVALID
+        except Exception as error:
+            print("Failed to send command \"" + command + "\": " + str(error))
+            return REPLY_FAILED
+
+        if result is True:
+            return REPLY_ACKNOWLEDGED
+        elif result is False:
+            return REPLY_UNACKNOWLEDGED
+        return REPLY_SENT
@@ -0,0 +1,179 @@
+"""
+Conversions.py
+
+Conversions of the raw values sent by the balloon payload into
+engineering units. The scalar functions are used by DataPacket for a
+single packet; the column functions apply the same rules to whole NumPy
+arrays of raw values (for example, the columns returned by
+DataPacket.decodeMany), without any Python-level loops.
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+
+PSI_PER_PASCAL = 0.000145038
+FEET_PER_CENTIMETER = 0.0328084
+MILES_PER_METER = 0.000621371
+DEGREE_SCALE = 10000000.0
+MILLISECONDS_PER_SECOND = 1000.0
+
+# Approximate length of a degree of latitude and of longitude at the
+# equator (also defined in the analysis scripts' decimation.py)
+METERS_PER_DEGREE_LATITUDE = 110574.0
+METERS_PER_DEGREE_LONGITUDE = 111320.0
+
+GPS_CENTURY = 2000
+TIMEZONE_DIFFERENCE = 7
+
+
+def gpsTime(year, month, day, hour, minute, second):
+    """
+    Builds the local (Pacific) time from the raw GPS date and time. Months
+    and days out of range are clamped to 1, as the GPS reports zeros
+    before it has a fix.
+
+    :param year: (int) Year since 2000
+    :param month: (int) Month, 1-12
+    :param day: (int) Day of the month, 1-31
+    :param hour: (int) Hour (UTC)
+    :param minute: (int) Minute
+    :param second: (int) Second
+
+    :return: (datetime) Local time of the GPS reading
+    """
+    if month <= 0: month = 1
+    if month > 12: month = 1
+
+    if day <= 0: day = 1
+    if day > 31: day = 1
+
+    utcTime = datetime(year=GPS_CENTURY + year, month=month, day=day, hour=hour, minute=minute, second=second)
+    return utcTime + timedelta(hours=-TIMEZONE_DIFFERENCE)
+
+
+def pressureColumn(rawPressure):
+    """
+    Converts raw pressure readings (Pa) to PSI.
+
+    :param rawPressure: (numpy array) Raw pressure readings
+
+    :return: (numpy array) Pressure, in PSI
+    """
+    return PSI_PER_PASCAL * np.asarray(rawPressure, dtype=np.float64)
+
+
+def altitudeColumn(rawAltitude):
+    """
+    Converts raw GPS altitudes (cm) to feet.
+
+    :param rawAltitude: (numpy array) Raw altitudes
+
+    :return: (numpy array) Altitude, in feet
+    """
+    return FEET_PER_CENTIMETER * np.asarray(rawAltitude, dtype=np.float64)
+
+
+def degreesColumn(rawDegrees):
+    """
+    Converts raw GPS latitudes or longitudes (1e-7 degrees) to degrees.
+
+    :param rawDegrees: (numpy array) Raw latitudes or longitudes
+
+    :return: (numpy array) Latitude or longitude, in degrees
+    """
+    return np.asarray(rawDegrees, dtype=np.float64) / DEGREE_SCALE
+
+
+def speedColumn(rawSpeed):
+    """
+    Converts raw GPS speeds to miles per hour.
+
+    :param rawSpeed: (numpy array) Raw speeds
+
+    :return: (numpy array) Speed, in MPH
+    """
+    return MILES_PER_METER * np.asarray(rawSpeed, dtype=np.float64)
+
+
+def secondsColumn(rawMilliseconds):
+    """
+    Converts raw times (ms) to seconds.
+
+    :param rawMilliseconds: (numpy array) Raw times
+
+    :return: (numpy array) Time, in seconds
+    """
+    return np.asarray(rawMilliseconds, dtype=np.float64) / MILLISECONDS_PER_SECOND
+
+
+def relayStatesColumn(rawRelayStates):
+    """
+    Splits raw relay state bit fields into the states of the four relays.
+
+    :param rawRelayStates: (numpy array) Raw relay state bit fields
+
+    :return: (numpy array) Boolean array with one column per relay
+    """
+    rawRelayStates = np.asarray(rawRelayStates, dtype=np.uint32)
+    return (rawRelayStates[:, np.newaxis] & np.array([0b0001, 0b0010, 0b0100, 0b1000], dtype=np.uint32)) != 0
+
+
+def gpsTimeColumn(year, month, day, hour, minute, second):
+    """
+    Builds the local (Pacific) times from columns of raw GPS dates and
+    times, with the same clamping as gpsTime. Unlike datetime, invalid
+    dates such as February 30 roll over into the next month rather than
+    raising an error.
+
+    :param year: (numpy array) Years since 2000
+    :param month: (numpy array) Months, 1-12
+    :param day: (numpy array) Days of the month, 1-31
+    :param hour: (numpy array) Hours (UTC)
+    :param minute: (numpy array) Minutes
+    :param second: (numpy array) Seconds
+
+    :return: (numpy array) Local times, as datetime64[s]
+    """
+    month = np.asarray(month, dtype=np.int64)
+    day = np.asarray(day, dtype=np.int64)
+    month = np.where((month <= 0) | (month > 12), 1, month)
+    day = np.where((day <= 0) | (day > 31), 1, day)
+
+    years = np.asarray(year, dtype=np.int64) + (GPS_CENTURY - 1970)
+    months = years.astype('datetime64[Y]').astype('datetime64[M]') + (month - 1)
+    days = months.astype('datetime64[D]') + (day - 1)
+
+    seconds = (np.asarray(hour, dtype=np.int64) - TIMEZONE_DIFFERENCE) * 3600
+    seconds += np.asarray(minute, dtype=np.int64) * 60
+    seconds += np.asarray(second, dtype=np.int64)
+
+    return days.astype('datetime64[s]') + seconds
+
+
+def convertColumns(records):
+    """
+    Converts the columns of decoded data packets into engineering units.
+    The keys match those of DataPacket.getConvertedValues for the values
+    which need converting.
+
+    :param records: (numpy array) Structured array from DataPacket.decodeMany
+
+    :return: (dict) Converted columns, as NumPy arrays
+    """
+    return {
+        "pressure" : pressureColumn(records["barometric_pressure"]),
+        "gps_time_1" : gpsTimeColumn(records["year_1"], records["month_1"], records["date_1"],
+                                     records["hour_1"], records["minute_1"], records["second_1"]),
+        "latitude_1" : degreesColumn(records["latitude_1"]),
+        "longitude_1" : degreesColumn(records["longitude_1"]),
+        "altitude_1" : altitudeColumn(records["altitude_1"]),
+        "speed_1" : speedColumn(records["speed_1"]),
+        "gps_time_2" : gpsTimeColumn(records["year_2"], records["month_2"], records["date_2"],
+                                     records["hour_2"], records["minute_2"], records["second_2"]),
+        "latitude_2" : degreesColumn(records["latitude_2"]),
+        "longitude_2" : degreesColumn(records["longitude_2"]),
+        "altitude_2" : altitudeColumn(records["altitude_2"]),
+        "reset_time" : secondsColumn(records["reset_time"]),
+        "data_age" : secondsColumn(records["data_age"]),
+        "relay_states" : relayStatesColumn(records["relay_states"])
+    }
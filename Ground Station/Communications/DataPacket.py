@@ -4,7 +4,10 @@ DataPacket.py
 Class that defines the data packet received from the balloon payload.
 """
 
+import functools
+
 from Packet import *
+from Conversions import *
 
 PACKET_TYPE = 0
 BATTERY_VOLTAGE = 1
@@ -63,9 +66,93 @@ LATITUDE_2 = 43
 LONGITUDE_2 = 44
 ALTITUDE_2 = 45
 
+FIELD_NAMES = [
+    "packet_type", "battery_voltage",
+    "interior_temperature_1", "interior_temperature_2",
+    "interior_temperature_3", "exterior_temperature",
+    "barometric_pressure", "humidity",
+    "year_1", "month_1", "date_1",
+    "hour_1", "minute_1", "second_1",
+    "latitude_1", "longitude_1", "altitude_1",
+    "speed_1", "heading_1", "num_satellites_1",
+    "ax", "ay", "az",
+    "gx", "gy", "gz",
+    "mx", "my", "mz",
+    "pitch", "roll", "yaw",
+    "reset_time",
+    "data_logging", "filename_index",
+    "data_age",
+    "relay_states",
+    "year_2", "month_2", "date_2",
+    "hour_2", "minute_2", "second_2",
+    "latitude_2", "longitude_2", "altitude_2"
+]
+
+CHECKSUM_VALID = "checksum_valid"
+
+# Keys of the values returned by DataPacket.getConvertedValues
+CONVERTED_FIELDS = [
+    "battery_voltage",
+    "interior_temperature_1", "interior_temperature_2",
+    "interior_temperature_3", "exterior_temperature",
+    "pressure", "humidity",
+    "gps_time_1", "latitude_1", "longitude_1", "altitude_1",
+    "num_satellites_1", "speed_1",
+    "gps_time_2", "latitude_2", "longitude_2", "altitude_2",
+    "acceleration", "rates", "magnetic_reading", "attitude",
+    "reset_time", "data_logging", "filename", "data_age",
+    "relay_states"
+]
+
+# Types of the data packet's values, shared by every data packet
+TYPES = [BYTE,                         # Packet type
+         FLOAT,                        # Battery voltage
+         FLOAT, FLOAT, FLOAT, FLOAT,   # Temperature readings
+         FLOAT, FLOAT,                 # Pressure and humidity readings
+         BYTE, BYTE, BYTE,             # GPS Year, month, date (sensor computer)
+         BYTE, BYTE, BYTE,             # GPS Hour, minute, second (sensor computer)
+         LONG, LONG, LONG,             # GPS latitude, longitude, altitude (sensor computer)
+         ULONG, UINT, BYTE,            # GPS speed, heading, num satellites (sensor computer)
+         FLOAT, FLOAT, FLOAT,          # IMU data (accelerometer)
+         FLOAT, FLOAT, FLOAT,          # IMU data (gyroscope)
+         FLOAT, FLOAT, FLOAT,          # IMU data (magnetometer)
+         FLOAT, FLOAT, FLOAT,          # Attitude data
+         ULONG,                        # Time since reset
+         BOOL, UINT,                   # Data logging
+         ULONG,                        # Time since last data arrival
+         ULONG,                        # Relay states
+         BYTE, BYTE, BYTE,             # GPS Year, month, date (comm computer)
+         BYTE, BYTE, BYTE,             # GPS Hour, minute, second (comm computer)
+         LONG, LONG, LONG              # GPS latitude, longitude, altitude (comm computer)
+        ]
+
+
+def cachedConversion(getter):
+    """
+    Decorates a DataPacket getter which converts raw values into
+    engineering units, so that the conversion is only computed the first
+    time it is asked for after the packet is decoded.
+
+    :param getter: (function) Getter computing the converted value
+
+    :return: (function) Getter returning the cached value
+    """
+    name = getter.__name__
+
+    @functools.wraps(getter)
+    def cachedGetter(self):
+        converted = self._converted
+        if name not in converted:
+            converted[name] = getter(self)
+        return converted[name]
+
+    return cachedGetter
+
 
 class DataPacket(Packet):
 
+    __slots__ = ('_converted',)
+
     def __init__(self):
         """
         Creates a new data packet. Overrides the Packet constructor.
@@ -74,29 +161,95 @@ class DataPacket(Packet):
         """
         
         self.packetType = DATA
-        self.types = [BYTE,                         # Packet type
-                      FLOAT,                        # Battery voltage
-                      FLOAT, FLOAT, FLOAT, FLOAT,   # Temperature readings
-                      FLOAT, FLOAT,                 # Pressure and humidity readings
-                      BYTE, BYTE, BYTE,             # GPS Year, month, date (sensor computer)
-                      BYTE, BYTE, BYTE,             # GPS Hour, minute, second (sensor computer)
-                      LONG, LONG, LONG,             # GPS latitude, longitude, altitude (sensor computer)
-                      ULONG, UINT, BYTE,            # GPS speed, heading, num satellites (sensor computer)
-                      FLOAT, FLOAT, FLOAT,          # IMU data (accelerometer)
-                      FLOAT, FLOAT, FLOAT,          # IMU data (gyroscope)
-                      FLOAT, FLOAT, FLOAT,          # IMU data (magnetometer)
-                      FLOAT, FLOAT, FLOAT,          # Attitude data
-                      ULONG,                        # Time since reset
-                      BOOL, UINT,                   # Data logging
-                      ULONG,                        # Time since last data arrival
-                      ULONG,                        # Relay states
-                      BYTE, BYTE, BYTE,             # GPS Year, month, date (comm computer)
-                      BYTE, BYTE, BYTE,             # GPS Hour, minute, second (comm computer)
-                      LONG, LONG, LONG              # GPS latitude, longitude, altitude (comm computer)
-                     ] 
+        self.types = TYPES
 
         self.values = [0]*len(self.types)
         self.values[0] = DATA
+        self._converted = {}
+
+
+    def decode(self, dataString):
+        """
+        Gets the current values within a byte string. Overrides the Packet
+        method to drop any converted values cached for the old values.
+        Code which changes self.values directly should call clearCache.
+
+        :param dataString: (bytes-like) KISS frame received from the radio
+
+        :return: (boolean) Whether or not we were able to decode the packet
+        """
+        self._converted = {}
+        return Packet.decode(self, dataString)
+
+
+    def clearCache(self):
+        """
+        Drops the converted values cached from the packet's values.
+
+        :return: (None)
+        """
+        self._converted = {}
+
+
+    def getFieldNames(self):
+        """
+        Returns the names of the data packet's values. Overrides the
+        Packet method.
+
+        :return: (list) Name of each value
+        """
+        return FIELD_NAMES
+
+
+    @classmethod
+    def decodeMany(cls, frames):
+        """
+        Decodes many received KISS frames at once into a NumPy structured
+        array, with one row per frame. The fields are named by FIELD_NAMES
+        and typed from the packet's types, plus a boolean CHECKSUM_VALID
+        field. Frames which are malformed or the wrong length decode as a
+        row of zeros with CHECKSUM_VALID set to False.
+
+        :param frames: (iterable) KISS frames (bytes-like), as given to decode
+
+        :return: (numpy array) Structured array of the decoded values
+        """
+        packet = cls()
+        codec = packet.getCodec()
+        recordSize = codec.size + 2
+        emptyRecord = bytes(recordSize)
+
+        # Gather the unescaped values and checksum of every frame
+        records = []
+        framed = []
+        for frame in frames:
+            frame = bytes(frame)
+            dataBytes = None
+            if (len(frame) >= 3) and (frame[0] == ord(FEND)) and (frame[-1] == ord(FEND)):
+                dataBytes = descapeValues(frame[2:-1])
+
+            if (dataBytes is None) or (len(dataBytes) != recordSize):
+                records.append(emptyRecord)
+                framed.append(False)
+            else:
+                records.append(dataBytes)
+                framed.append(True)
+
+        buffer = b''.join(records)
+        valuesDtype = packet.getDtype()
+        recordDtype = np.dtype(valuesDtype.descr + [("checksum", NUMPY_TYPES[UINT])])
+        rawRecords = np.frombuffer(buffer, dtype=recordDtype)
+
+        # Check every checksum in one pass over the values
+        rawBytes = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, recordSize)
+        checksums = checksum16Rows(rawBytes[:, :codec.size])
+
+        decoded = np.empty(len(rawRecords), dtype=valuesDtype.descr + [(CHECKSUM_VALID, '?')])
+        for name in valuesDtype.names:
+            decoded[name] = rawRecords[name]
+        decoded[CHECKSUM_VALID] = np.array(framed, dtype=bool) & (checksums == rawRecords["checksum"])
+
+        return decoded
 
 
     def getBatteryVoltage(self):
@@ -124,87 +277,65 @@ class DataPacket(Packet):
         return self.values[EXTERIOR_TEMPERATURE]
 
 
+    @cachedConversion
     def getPressure(self):
-        return 0.000145038*self.values[BAROMETRIC_PRESSURE]
+        return PSI_PER_PASCAL*self.values[BAROMETRIC_PRESSURE]
 
 
     def getHumidity(self):
         return self.values[HUMIDITY]
 
 
+    @cachedConversion
     def getGpsTime1(self):
-        year = 2000 + self.values[YEAR_1]
-        month = self.values[MONTH_1]
-        day = self.values[DATE_1]
-        hour = self.values[HOUR_1]
-        minute = self.values[MINUTE_1]
-        second = self.values[SECOND_1]
-
-        if month <= 0: month = 1
-        if month > 12: month = 1
-
-        if day <= 0: day = 1
-        if day > 31: day = 1
-
-        timezoneDifference = 7
-        pacificTime = datetime(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
-        pacificTime = pacificTime + timedelta(hours=-timezoneDifference)
-
-        return pacificTime
+        return gpsTime(self.values[YEAR_1], self.values[MONTH_1], self.values[DATE_1],
+                       self.values[HOUR_1], self.values[MINUTE_1], self.values[SECOND_1])
 
 
+    @cachedConversion
     def getAltitude1(self):
         rawAltitude = self.values[ALTITUDE_1]
-        return 0.0328084 * rawAltitude
+        return FEET_PER_CENTIMETER * rawAltitude
 
 
+    @cachedConversion
     def getLongitude1(self):
-        return self.values[LONGITUDE_1] / 10000000.0
+        return self.values[LONGITUDE_1] / DEGREE_SCALE
 
 
+    @cachedConversion
     def getLatitude1(self):
-        return self.values[LATITUDE_1] / 10000000.0
+        return self.values[LATITUDE_1] / DEGREE_SCALE
 
 
     def getNumSatellites1(self):
         return self.values[NUM_SATELLITES_1]
 
 
+    @cachedConversion
     def getSpeed(self):
-        return 0.000621371 * self.values[SPEED_1]
+        return MILES_PER_METER * self.values[SPEED_1]
 
 
+    @cachedConversion
     def getGpsTime2(self):
-        year = 2000 + self.values[YEAR_2]
-        month = self.values[MONTH_2]
-        day = self.values[DATE_2]
-        hour = self.values[HOUR_2]
-        minute = self.values[MINUTE_2]
-        second = self.values[SECOND_2]
-
-        if month <= 0: month = 1
-        if month > 12: month = 1
-
-        if day <= 0: day = 1
-        if day > 31: day = 1
-
-        timezoneDifference = 7
-        pacificTime = datetime(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
-        pacificTime = pacificTime + timedelta(hours=-timezoneDifference)
-
-        return pacificTime
+        return gpsTime(self.values[YEAR_2], self.values[MONTH_2], self.values[DATE_2],
+                       self.values[HOUR_2], self.values[MINUTE_2], self.values[SECOND_2])
 
+    @cachedConversion
     def getAltitude2(self):
         rawAltitude = self.values[ALTITUDE_2]
-        return 0.0328084 * rawAltitude
+        return FEET_PER_CENTIMETER * rawAltitude
 
 
+    @cachedConversion
     def getLongitude2(self):
-        return self.values[LONGITUDE_2] / 10000000.0
+        return self.values[LONGITUDE_2] / DEGREE_SCALE
 
 
+    @cachedConversion
     def getLatitude2(self):
-        return self.values[LATITUDE_2] / 10000000.0
+        return self.values[LATITUDE_2] / DEGREE_SCALE
 
 
     def getAcceleration(self):
@@ -239,23 +370,27 @@ class DataPacket(Packet):
         return pitch, roll, yaw
 
 
+    @cachedConversion
     def getResetTime(self):
-        return self.values[RESET_TIME] / 1000.0
+        return self.values[RESET_TIME] / MILLISECONDS_PER_SECOND
 
 
     def getDataLoggingStatus(self):
         return self.values[DATA_LOGGING]
 
 
+    @cachedConversion
     def getFilename(self):
         filenameIndex = self.values[FILENAME_INDEX]
         return "DATA" + str(filenameIndex).zfill(3) + '.CSV'
 
 
+    @cachedConversion
     def getDataAge(self):
-        return self.values[DATA_AGE] / 1000.0
+        return self.values[DATA_AGE] / MILLISECONDS_PER_SECOND
 
 
+    @cachedConversion
     def getRelayStates(self):
         """
         Gets the current states of all four relays.
@@ -272,6 +407,45 @@ class DataPacket(Packet):
         return relay1, relay2, relay3, relay4
 
 
+    @cachedConversion
+    def getConvertedValues(self):
+        """
+        Gets all of the packet's values in engineering units at once, keyed
+        by the names in CONVERTED_FIELDS (in that order). The dictionary is
+        cached and shared by every caller, so it should not be modified.
+
+        :return: (dict) Converted values of the packet
+        """
+        return {
+            "battery_voltage" : self.getBatteryVoltage(),
+            "interior_temperature_1" : self.getInteriorTemperature1(),
+            "interior_temperature_2" : self.getInteriorTemperature2(),
+            "interior_temperature_3" : self.getInteriorTemperature3(),
+            "exterior_temperature" : self.getExteriorTemperature(),
+            "pressure" : self.getPressure(),
+            "humidity" : self.getHumidity(),
+            "gps_time_1" : self.getGpsTime1(),
+            "latitude_1" : self.getLatitude1(),
+            "longitude_1" : self.getLongitude1(),
+            "altitude_1" : self.getAltitude1(),
+            "num_satellites_1" : self.getNumSatellites1(),
+            "speed_1" : self.getSpeed(),
+            "gps_time_2" : self.getGpsTime2(),
+            "latitude_2" : self.getLatitude2(),
+            "longitude_2" : self.getLongitude2(),
+            "altitude_2" : self.getAltitude2(),
+            "acceleration" : self.getAcceleration(),
+            "rates" : self.getRates(),
+            "magnetic_reading" : self.getMagneticReading(),
+            "attitude" : self.getAttitude(),
+            "reset_time" : self.getResetTime(),
+            "data_logging" : self.getDataLoggingStatus(),
+            "filename" : self.getFilename(),
+            "data_age" : self.getDataAge(),
+            "relay_states" : self.getRelayStates()
+        }
+
+
     def __str__(self):
         """
         Gets the string representation of the object.
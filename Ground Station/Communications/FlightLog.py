@@ -0,0 +1,318 @@
+"""
+FlightLog.py
+
+Binary log of the data packets received from the balloon payload, kept
+alongside the CSV file. The file starts with a short header, followed by
+fixed-width records: the time the packet was received (seconds since the
+epoch, as a little-endian double) and then the packet's values, encoded
+exactly as they were sent (DataPacket.types, without the KISS framing or
+checksum). Because every record has the same width, the reader maps the
+file into memory and exposes each value as a NumPy column without any
+parsing.
+"""
+
+import glob
+import os
+import struct
+import time
+import numpy as np
+
+from BufferedLog import *
+from DataPacket import *
+
+FLIGHT_LOG_EXTENSION = '.bin'
+
+MAGIC = b'BALLOG01'
+HEADER_CODEC = struct.Struct('<8sII')
+HEADER_SIZE = HEADER_CODEC.size
+
+RECEIVE_TIME = "receive_time"
+RECEIVE_TIME_CODEC = struct.Struct('<d')
+
+def getRecordDtype():
+    """
+    Gets the NumPy dtype of one record of the flight log.
+
+    :return: (numpy.dtype) Packed structured dtype of a record
+    """
+    return np.dtype([(RECEIVE_TIME, '<f8')] + DataPacket().getDtype().descr)
+
+
+def getFlightLogPath(dataFilepath):
+    """
+    Gets the path of the flight log kept alongside a CSV data file.
+
+    :param dataFilepath: (string) Path of the CSV data file
+
+    :return: (string) Path of the flight log
+    """
+    return os.path.splitext(dataFilepath)[0] + FLIGHT_LOG_EXTENSION
+
+
+def findFlightLogs(directory):
+    """
+    Finds all of the flight logs in a directory, in the order they were
+    recorded.
+
+    :param directory: (string) Directory holding the flight logs
+
+    :return: (list) Paths of the flight logs
+    """
+    return sorted(glob.glob(os.path.join(directory, 'balloon_data_*' + FLIGHT_LOG_EXTENSION)))
+
+
+def readHeader(header, recordSize):
+    """
+    Checks the header of a flight log.
+
+    :param header: (bytes) First HEADER_SIZE bytes of the file
+    :param recordSize: (int) Expected size of each record
+
+    :return: (None)
+    """
+    if len(header) != HEADER_SIZE:
+        raise ValueError("Flight log header is incomplete")
+
+    magic, fileRecordSize, payloadSize = HEADER_CODEC.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Not a flight log")
+    if fileRecordSize != recordSize:
+        raise ValueError("Flight log records are " + str(fileRecordSize) +
+                         " bytes, expected " + str(recordSize))
+
+
+class FlightLogWriter(BufferedLogWriter):
+
+    def __init__(self, filename, flushRecords=FLUSH_ENTRIES, flushInterval=FLUSH_INTERVAL):
+        """
+        Creates a new FlightLogWriter object, and opens the flight log. The
+        header is written if the file is empty; otherwise the records are
+        appended after checking that the existing header matches. Records
+        are flushed once flushRecords are waiting, or at most flushInterval
+        seconds after the first of them was logged, even if no more
+        packets arrive (see BufferedLogWriter).
+
+        :param filename: (string) Name of the flight log
+        :param flushRecords: (int) Records to buffer before flushing
+        :param flushInterval: (float) Longest time to keep records buffered, in seconds
+
+        :return: (FlightLogWriter) New flight log writer
+        """
+        BufferedLogWriter.__init__(self, filename, 'ab', flushRecords, flushInterval)
+
+        self._payloadSize = DataPacket().getCodec().size
+        self._recordSize = RECEIVE_TIME_CODEC.size + self._payloadSize
+
+        if self._fileHandle.tell() == 0:
+            self._fileHandle.write(HEADER_CODEC.pack(MAGIC, self._recordSize, self._payloadSize))
+            self._fileHandle.flush()
+        else:
+            with open(filename, 'rb') as existingFile:
+                try:
+                    readHeader(existingFile.read(HEADER_SIZE), self._recordSize)
+                except ValueError:
+                    self._fileHandle.close()
+                    raise
+
+
+    def logPacket(self, packet, receiveTime=None):
+        """
+        Adds a decoded data packet to the flight log.
+
+        :param packet: (DataPacket) Packet to save to the file
+        :param receiveTime: (float) Time the packet was received (default: now)
+
+        :return: (None)
+        """
+        if receiveTime is None:
+            receiveTime = time.time()
+
+        self.writeEntry(RECEIVE_TIME_CODEC.pack(receiveTime) + packet.getBytes())
+
+
+class FlightLogReader(object):
+
+    def __init__(self, filename):
+        """
+        Creates a new FlightLogReader object, which maps a flight log into
+        memory. Nothing is read beyond the header until a column is used,
+        and columns are strided views of the mapped file rather than copies.
+        A partial record at the end of the file (from a log still being
+        written) is ignored.
+
+        :param filename: (string) Name of the flight log
+
+        :return: (FlightLogReader) New flight log reader
+        """
+        self.filename = filename
+        self.dtype = getRecordDtype()
+
+        with open(filename, 'rb') as fileHandle:
+            readHeader(fileHandle.read(HEADER_SIZE), self.dtype.itemsize)
+
+        numRecords = (os.path.getsize(filename) - HEADER_SIZE) // self.dtype.itemsize
+        if numRecords > 0:
+            self.records = np.memmap(filename, dtype=self.dtype, mode='r',
+                                     offset=HEADER_SIZE, shape=(numRecords,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+
+    def __len__(self):
+        return len(self.records)
+
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+
+    def getColumnNames(self):
+        """
+        Gets the names of the columns in the flight log.
+
+        :return: (tuple) Column names (RECEIVE_TIME, then FIELD_NAMES)
+        """
+        return self.dtype.names
+
+
+    def column(self, name):
+        """
+        Gets one column of the flight log, as a view of the mapped file.
+
+        :param name: (string) Column name
+
+        :return: (numpy array) Raw values of the column
+        """
+        return self.records[name]
+
+
+    def getTimeSpan(self):
+        """
+        Gets the receive times of the first and last records. Only the
+        pages holding those two records are read.
+
+        :return: (2-tuple) First and last receive times (None if empty)
+        """
+        if len(self.records) == 0:
+            return None, None
+
+        receiveTimes = self.records[RECEIVE_TIME]
+        return float(receiveTimes[0]), float(receiveTimes[-1])
+
+
+    def timeRange(self, startTime=None, endTime=None):
+        """
+        Gets the records received between two times, as a view of the
+        mapped file. Records are in the order they were received, so the
+        range is found with a binary search that touches only a few pages.
+
+        :param startTime: (float) Earliest receive time to include (default: start of log)
+        :param endTime: (float) Latest receive time to include (default: end of log)
+
+        :return: (numpy array) Records in the time range
+        """
+        receiveTimes = self.records[RECEIVE_TIME]
+        start = 0 if startTime is None else np.searchsorted(receiveTimes, startTime, side='left')
+        end = len(receiveTimes) if endTime is None else np.searchsorted(receiveTimes, endTime, side='right')
+        return self.records[start:end]
+
+
+    def convertedColumns(self):
+        """
+        Gets the columns which need converting, in engineering units.
+
+        :return: (dict) Converted columns, keyed as in Conversions.convertColumns
+        """
+        return convertColumns(self.records)
+
+
+class FlightLogSet(object):
+
+    def __init__(self, filenames):
+        """
+        Creates a new FlightLogSet object, which treats the flight logs of a
+        multi-file flight as one log. Every file is mapped into memory when
+        the set is created, but no records are read until they are used,
+        so opening even a long flight is instant.
+
+        :param filenames: (list) Paths of the flight logs
+
+        :return: (FlightLogSet) New flight log set
+        """
+        readers = [FlightLogReader(filename) for filename in filenames]
+        readers = [reader for reader in readers if len(reader) > 0]
+        readers.sort(key=lambda reader: reader.getTimeSpan()[0])
+
+        self.readers = readers
+        self._timeSpans = [reader.getTimeSpan() for reader in readers]
+
+
+    def __len__(self):
+        return sum(len(reader) for reader in self.readers)
+
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+
+    def column(self, name, startTime=None, endTime=None):
+        """
+        Gets one column of the flight, optionally limited to a time range.
+        Only the files which overlap the time range are read, and only the
+        column itself is copied out of each one.
+
+        :param name: (string) Column name
+        :param startTime: (float) Earliest receive time to include (default: start of flight)
+        :param endTime: (float) Latest receive time to include (default: end of flight)
+
+        :return: (numpy array) Raw values of the column
+        """
+        selected = [records[name] for records in self._selectRecords(startTime, endTime)]
+
+        if len(selected) == 1:
+            return selected[0]
+        if not selected:
+            return np.zeros(0, dtype=getRecordDtype()[name])
+
+        return np.concatenate(selected)
+
+
+    def timeRange(self, startTime=None, endTime=None):
+        """
+        Gets the records of the flight received between two times. Files
+        entirely outside of the range are skipped without being read.
+
+        :param startTime: (float) Earliest receive time to include (default: start of flight)
+        :param endTime: (float) Latest receive time to include (default: end of flight)
+
+        :return: (numpy array) Records in the time range
+        """
+        selected = self._selectRecords(startTime, endTime)
+
+        if len(selected) == 1:
+            return selected[0]
+        if not selected:
+            return np.zeros(0, dtype=getRecordDtype())
+
+        return np.concatenate(selected)
+
+
+    def _selectRecords(self, startTime, endTime):
+        """
+        Gets the records of each file received between two times, as views
+        of the mapped files. Files entirely outside of the range are skipped.
+
+        :param startTime: (float) Earliest receive time to include (None for no limit)
+        :param endTime: (float) Latest receive time to include (None for no limit)
+
+        :return: (list) Records in the time range from each overlapping file
+        """
+        selected = []
+        for reader, (firstTime, lastTime) in zip(self.readers, self._timeSpans):
+            if (startTime is not None) and (lastTime < startTime):
+                continue
+            if (endTime is not None) and (firstTime > endTime):
+                continue
+            selected.append(reader.timeRange(startTime, endTime))
+
+        return selected
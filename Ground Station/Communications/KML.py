@@ -3,9 +3,12 @@ NAME_START = "<name>"
 NAME_END = "</name>"
 ALTITUDE_MODE_START = "<altitudeMode>"
 ALTITUDE_MODE_END = "</altitudeMode>"
+POINT_START = "<Point>"
 COORDINATE_START = "<coordinates>"
 POINT_COORDINATE_END = "</coordinates>\n            </Point>"
 LINE_COORDINATE_END = "</coordinates>\n            </LineString>"
+POINT_END = "</Point>"
+LINE_STRING_END = "</LineString>"
 
 
 ABSOLUTE = "absolute"
@@ -32,6 +35,19 @@ def updateKMLFile(kmlPath, latitude, longitude, altitude):
         kmlFile.write(kml)
 
 
+def formatCoordinate(latitude, longitude, altitude):
+    """
+    Formats a location as a KML coordinate (longitude first).
+
+    :param latitude: (float) Latitude
+    :param longitude: (float) Longitude
+    :param altitude: (float) Altitude (MSL, in meters)
+
+    :return: (string) KML coordinate string
+    """
+    return str(longitude) + ',' + str(latitude) + ',' + str(altitude)
+
+
 def addName(kml, name):
     """
     Adds a name to the KML file data.
@@ -84,12 +100,11 @@ def addCoordinate(kml, latitude, longitude, altitude):
     """
 
     # Build the coordinate string to add to the file
-    coordinateString = str(longitude)
-    coordinateString += ',' + str(latitude)
-    coordinateString += ',' + str(altitude)
+    coordinateString = formatCoordinate(latitude, longitude, altitude)
 
     # Add the coordinate as the last known point
-    lastCoordinateStart = kml.find(COORDINATE_START) + len(COORDINATE_START)
+    pointStart = kml.find(POINT_START)
+    lastCoordinateStart = kml.find(COORDINATE_START, pointStart) + len(COORDINATE_START)
     lastCoordinateEnd = kml.find(POINT_COORDINATE_END)
     kml = kml[0:lastCoordinateStart] + coordinateString + kml[lastCoordinateEnd:]
 
@@ -98,4 +113,145 @@ def addCoordinate(kml, latitude, longitude, altitude):
     kml = kml[0:lineCoordinateEnd] + "    " + coordinateString + '\n' + "                " + kml[lineCoordinateEnd:]
 
     return kml
-    
\ No newline at end of file
+
+
+def addCoordinates(kml, latitudes, longitudes, altitudes):
+    """
+    Adds many coordinates to a balloon tracking KML file at once, giving
+    the same text as calling addCoordinate for each of them in turn. The
+    last coordinate becomes the last known point.
+
+    :param kml: (string) Current kml file text
+    :param latitudes: (sequence) Latitudes of the payload
+    :param longitudes: (sequence) Longitudes of the payload
+    :param altitudes: (sequence) Altitudes of the payload (MSL, in meters)
+
+    :return: (string) New kml file text with the new coordinates added
+    """
+    coordinateStrings = list(map(formatCoordinate, latitudes, longitudes, altitudes))
+    if not coordinateStrings:
+        return kml
+
+    # Add the last coordinate as the last known point
+    pointStart = kml.find(POINT_START)
+    lastCoordinateStart = kml.find(COORDINATE_START, pointStart) + len(COORDINATE_START)
+    lastCoordinateEnd = kml.find(POINT_COORDINATE_END)
+    kml = kml[0:lastCoordinateStart] + coordinateStrings[-1] + kml[lastCoordinateEnd:]
+
+    # Add all of the coordinates to the coordinate history list
+    lineCoordinateEnd = kml.find(LINE_COORDINATE_END)
+    lineCoordinates = ''.join("    " + c + '\n' + "                " for c in coordinateStrings)
+    kml = kml[0:lineCoordinateEnd] + lineCoordinates + kml[lineCoordinateEnd:]
+
+    return kml
+
+
+def moveLastPointToEnd(kml):
+    """
+    Moves the last known point of a balloon tracking KML file from before
+    the coordinate history list (the template's old layout) to after it.
+    Both layouts show the same thing.
+
+    :param kml: (string) Current kml file text, with the point first
+
+    :return: (string) Updated kml file text, with the point last
+    """
+    pointStart = kml.rfind('\n', 0, kml.find(POINT_START)) + 1
+    pointEnd = kml.find('\n', kml.find(POINT_END)) + 1
+    point = kml[pointStart:pointEnd]
+    kml = kml[0:pointStart] + kml[pointEnd:]
+
+    lineStringEnd = kml.find('\n', kml.find(LINE_STRING_END)) + 1
+    return kml[0:lineStringEnd] + point + kml[lineStringEnd:]
+
+
+class KMLTrackWriter(object):
+
+    def __init__(self, kmlPath):
+        """
+        Creates a new KMLTrackWriter object, which keeps a KML file made from
+        the KML template open and adds coordinates to it in constant time.
+        The file is read once here; after that, new coordinates are written
+        over the trailing section of the file (the end of the track, the
+        last known point and the closing tags), giving the same file as
+        updateKMLFile. A file with the last known point before the track
+        (the template's old layout) is rearranged once, here.
+
+        :param kmlPath: (string) Path of the KML file to update
+
+        :return: (KMLTrackWriter) New KML track writer
+        """
+        self.kmlPath = kmlPath
+        self._kmlFile = open(kmlPath, 'rb+')
+        kml = self._kmlFile.read()
+
+        lineEnd = kml.rfind(LINE_COORDINATE_END.encode())
+        pointStart = kml.find(POINT_START.encode())
+        if (lineEnd < 0) or (pointStart < 0):
+            self._kmlFile.close()
+            raise ValueError("KML file is not a balloon tracking file: " + kmlPath)
+
+        if pointStart < lineEnd:
+            kml = moveLastPointToEnd(kml.decode()).encode()
+            self._kmlFile.seek(0)
+            self._kmlFile.write(kml)
+            self._kmlFile.truncate()
+            self._kmlFile.flush()
+
+        # Everything after the track's coordinates is rewritten with each
+        # update, with the last known point in the middle of it
+        self._lineEnd = kml.rfind(LINE_COORDINATE_END.encode())
+        pointStart = kml.find(POINT_START.encode(), self._lineEnd)
+        lastCoordinateStart = kml.find(COORDINATE_START.encode(), pointStart) + len(COORDINATE_START)
+        lastCoordinateEnd = kml.find(POINT_COORDINATE_END.encode(), lastCoordinateStart)
+        self._tailStart = kml[self._lineEnd:lastCoordinateStart]
+        self._tailEnd = kml[lastCoordinateEnd:]
+
+
+    def addCoordinate(self, latitude, longitude, altitude):
+        """
+        Adds a coordinate to the track, and makes it the last known point.
+
+        :param latitude: (float) Current latitude of the payload
+        :param longitude: (float) Current longitude of the payload
+        :param altitude: (float) Current altitude of the payload (MSL, in meters)
+
+        :return: (None)
+        """
+        self.addCoordinates([latitude], [longitude], [altitude])
+
+
+    def addCoordinates(self, latitudes, longitudes, altitudes):
+        """
+        Adds many coordinates to the track in one write, and makes the last
+        of them the last known point. Only the new coordinates and the
+        trailing section are written, however long the track already is.
+
+        :param latitudes: (sequence) Latitudes of the payload
+        :param longitudes: (sequence) Longitudes of the payload
+        :param altitudes: (sequence) Altitudes of the payload (MSL, in meters)
+
+        :return: (None)
+        """
+        coordinates = [formatCoordinate(latitude, longitude, altitude).encode()
+                       for latitude, longitude, altitude in zip(latitudes, longitudes, altitudes)]
+        if not coordinates:
+            return
+
+        lineCoordinates = b''.join(b"    " + coordinate + b'\n' + b"                " for coordinate in coordinates)
+
+        self._kmlFile.seek(self._lineEnd)
+        self._kmlFile.write(lineCoordinates + self._tailStart + coordinates[-1] + self._tailEnd)
+        self._kmlFile.truncate()
+        self._kmlFile.flush()
+
+        self._lineEnd += len(lineCoordinates)
+
+
+    def close(self):
+        """
+        Closes the KML file.
+
+        :return: (None)
+        """
+        self._kmlFile.close()
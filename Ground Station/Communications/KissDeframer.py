@@ -0,0 +1,100 @@
+"""
+KissDeframer.py
+
+Class that splits a stream of bytes received from the radio into
+complete KISS frames.
+"""
+
+from Packet import *
+
+# Longest frame kept while waiting for its closing FEND. A data packet
+# with every byte escaped is well under this.
+MAX_FRAME_LENGTH = 1024
+
+
+class KissDeframer(object):
+
+    def __init__(self, maxFrameLength=MAX_FRAME_LENGTH):
+        """
+        Creates a new KissDeframer object. Chunks of any size read from the
+        radio are fed in, and complete frames come out. A partial frame is
+        kept until the rest of it arrives with a later read.
+
+        :param maxFrameLength: (int) Largest frame to buffer, in bytes
+
+        :return: (KissDeframer) New deframer object
+        """
+        self.maxFrameLength = maxFrameLength
+        self.droppedBytes = 0
+
+        self._buffer = bytearray()
+        self._inFrame = False
+
+
+    def feed(self, chunk):
+        """
+        Adds the next chunk of received bytes, and returns the frames it
+        completes. Each frame includes its opening and closing FEND, so it
+        can be passed straight to Packet.decode. A frame which lies wholly
+        within the chunk is returned as a memoryview of the chunk rather
+        than a copy. Bytes received before the first FEND, and frames
+        longer than the maximum length, are dropped.
+
+        :param chunk: (bytes) Next bytes read from the radio
+
+        :return: (list) Complete frames (bytes-like), in the order they were received
+        """
+        frames = []
+        data = bytes(chunk)
+        view = memoryview(data)
+        start = 0
+
+        end = data.find(FEND, start)
+        while end >= 0:
+
+            if self._inFrame:
+                frameLength = len(self._buffer) + end - start
+                if frameLength > self.maxFrameLength:
+                    # Oversize garbage, whether or not it started in this chunk
+                    self.droppedBytes += frameLength
+                    del self._buffer[:]
+                elif self._buffer:
+                    # The frame started in an earlier chunk
+                    self._buffer += view[start:end]
+                    frames.append(FEND + bytes(self._buffer) + FEND)
+                    del self._buffer[:]
+                elif (end > start) and (start > 0):
+                    # The whole frame is in this chunk, so hand out a view of it
+                    frames.append(view[start - 1:end + 1])
+                elif end > start:
+                    frames.append(FEND + data[start:end] + FEND)
+            else:
+                self.droppedBytes += end - start
+
+            # Every FEND may also open the next frame
+            self._inFrame = True
+            start = end + 1
+            end = data.find(FEND, start)
+
+        if self._inFrame:
+            self._buffer += data[start:]
+
+            # Drop oversize garbage, and wait for the next FEND to resync
+            if len(self._buffer) > self.maxFrameLength:
+                self.droppedBytes += len(self._buffer)
+                del self._buffer[:]
+                self._inFrame = False
+        else:
+            self.droppedBytes += len(data) - start
+
+        return frames
+
+
+    def reset(self):
+        """
+        Discards any partial frame, for example after reopening the port.
+
+        :return: (None)
+        """
+        del self._buffer[:]
+        self._inFrame = False
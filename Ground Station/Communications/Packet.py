@@ -10,6 +10,7 @@ import binascii
 import numpy as np
 from datetime import datetime, timedelta
 from ColorEscapeCodes import *
+from Checksum import *
 
 
 UNKNOWN = -1
@@ -40,9 +41,25 @@ WIDTHS = {
     FLOAT : 4
 }
 
+NUMPY_TYPES = {
+    BOOL : '?',
+    BYTE : 'u1',
+    INT : '<i2',
+    UINT : '<u2',
+    LONG : '<i4',
+    ULONG : '<u4',
+    FLOAT : '<f4'
+}
+
+# Compiled struct formats, shared by every packet with the same type list
+_CODECS = {}
+CHECKSUM_CODEC = struct.Struct(UINT)
+
 
 class Packet(object):
 
+    __slots__ = ('packetType', 'values', 'types')
+
     def __init__(self):
         """
         Create a new Packet object.
@@ -70,6 +87,46 @@ class Packet(object):
         return numBytes
 
 
+    def getCodec(self):
+        """
+        Returns the compiled struct used to encode and decode all of the
+        packet's values in a single call. The format is built from the
+        packet's types the first time it is needed, and then shared by
+        every packet with the same list of types.
+
+        :return: (struct.Struct) Compiled codec for the packet's values
+        """
+        key = tuple(self.types)
+        codec = _CODECS.get(key)
+        if codec is None:
+            codec = struct.Struct('<' + ''.join(t[1:] for t in self.types))
+            _CODECS[key] = codec
+
+        return codec
+
+
+    def getFieldNames(self):
+        """
+        Returns the names of the packet's values, used for the fields of
+        the packet's NumPy dtype. Subclasses with named values override this.
+
+        :return: (list) Name of each value
+        """
+        return ['value' + str(i) for i in range(len(self.types))]
+
+
+    def getDtype(self):
+        """
+        Returns the NumPy structured dtype matching the packet's values, with
+        the same field widths and byte order as the encoded packet. An array
+        of this dtype can be read straight from a buffer of packet values.
+
+        :return: (numpy.dtype) Packed structured dtype of the packet's values
+        """
+        fieldTypes = [NUMPY_TYPES[t] for t in self.types]
+        return np.dtype(list(zip(self.getFieldNames(), fieldTypes)))
+
+
     def getBytes(self):
         """
         Returns the byte string associated with the values of a packet. 
@@ -79,14 +136,7 @@ class Packet(object):
         :return: (string) Byte string of the packet's values
         """
         assert(len(self.values) == len(self.types))
-        bytes = b''
-
-        # Add the values 
-        for i, value in enumerate(self.values):
-            valueType = self.types[i]
-            bytes += struct.pack(valueType, value)
-
-        return bytes
+        return self.getCodec().pack(*self.values)
 
 
     def getHexString(self):
@@ -110,7 +160,7 @@ class Packet(object):
         """
         checksum = self.computeChecksum()
 
-        kissPacket =  FEND + '\x00'
+        kissPacket =  FEND + b'\x00'
         kissPacket += escapeValues(self.getBytes())
         kissPacket += escapeValues(struct.pack(UINT, checksum))
         kissPacket += FEND
@@ -126,59 +176,43 @@ class Packet(object):
 
         :return: (int) checksum of data values 
         """
-
-        dataBytes = self.getBytes()
-        numBytes = len(dataBytes)
-
-        valueSum = np.uint16(0)
-        for i in range(0, numBytes, 2):
-
-            if i == numBytes - 1:
-                chunk = struct.unpack(UINT, b'\x00' + dataBytes[i:])
-            else:
-                chunk = struct.unpack(UINT, dataBytes[i:i+2])
-            valueSum = np.uint16(valueSum + chunk)
-
-        checksum = np.uint16(-1) - valueSum
-        return checksum
+        return checksum16(self.getBytes())
 
         
     def decode(self, dataString):
         """
-        Gets the current values within a byte string.
+        Gets the current values within a byte string. Any buffer can be
+        given (bytes, bytearray, memoryview, a slice of an mmap). When the
+        frame holds no escaped bytes, the values and checksum are unpacked
+        from the buffer in place, without copying it.
+
+        :param dataString: (bytes-like) KISS frame received from the radio
 
         :return: (boolean) Whether or not we were able to decode the packet
         """
 
-        if (dataString[0] != ord(FEND)) or (dataString[-1] != ord(FEND)):
+        frame = memoryview(dataString).cast('B')
+        if (len(frame) < 3) or (frame[0] != ord(FEND)) or (frame[-1] != ord(FEND)):
             return False
 
-        # Chop off the KISS packet parts of the data string,
-        # descape the FESC and FEND characters
-        dataString = dataString[2:-1]
-        dataBytes = descapeValues(dataString)
-
+        # Chop off the KISS packet parts of the data string, and
+        # descape the FESC and FEND characters only if there are any
+        dataBytes = frame[2:-1]
+        if ord(FESC) in dataBytes:
+            dataBytes = memoryview(descapeValues(dataBytes))
 
         # Check if we have the same number of bytes as we should have
-        if len(dataBytes) != (self.getNumBytes() + 2):
-            log.error("Error with number of bytes: " + str((len(dataBytes), self.getNumBytes() + 2)))
+        codec = self.getCodec()
+        if len(dataBytes) != (codec.size + 2):
+            log.error("Error with number of bytes: " + str((len(dataBytes), codec.size + 2)))
             return False
 
-        # Decode each of the values from the raw bytes
-        byteIndex = 0
-        self.values = []
-        for t in self.types:
-
-            valueBytes = dataBytes[byteIndex:byteIndex + WIDTHS[t]]
-            value = struct.unpack(t, valueBytes)[0]
-            self.values.append(value)
+        # Decode all of the values from the raw bytes at once
+        self.values = list(codec.unpack_from(dataBytes))
 
-            byteIndex += WIDTHS[t]
-
-        # Check the checksum of the bytes to see if we decoded correctly
-        checksumBytes = dataBytes[-2:]
-        packetChecksum = np.uint16(struct.unpack(UINT, checksumBytes))[0]
-        computedChecksum = self.computeChecksum()
+        # Check the checksum of the received bytes to see if we decoded correctly
+        packetChecksum = CHECKSUM_CODEC.unpack_from(dataBytes, codec.size)[0]
+        computedChecksum = checksum16(dataBytes[:codec.size])
 
         if packetChecksum != computedChecksum:
             log.error("Checksum error")
@@ -190,55 +224,76 @@ class Packet(object):
 def escapeValues(data):
     """
     Escpaes the FEND and FESC values within a packet according
-    to the KISS protocol. 
+    to the KISS protocol. FESC bytes are escaped first, so that the
+    FESC bytes introduced by escaping FEND are left alone.
 
     :param bytes: (string) Original byte string 
 
     :return: (string) packet string with escpaed values
     """
 
-    newBytes = bytes()
-    for b in data:
-        if b == ord(FEND):
-            newBytes += (FESC + TFEND)
-        elif b == ord(FESC):
-            newBytes += (FESC + TFESC)
-        else:
-            newBytes += bytes([b])
-
-    return newBytes
+    data = bytes(data)
+    return data.replace(FESC, FESC + TFESC).replace(FEND, FESC + TFEND)
 
 
 def descapeValues(data):
     """
     De-escpaes the FEND and FESC values within a packet according
-    to the KISS protocol. 
+    to the KISS protocol. A FESC byte which is not followed by TFEND
+    or TFESC (including a lone FESC at the end of the data) is kept
+    as is. Since an escape sequence never ends with FESC, the two
+    sequences cannot overlap and can be replaced one after the other.
 
     :param bytes: (string) Byte string with escaped values
 
     :return: (string) packet string with de-escpaed values
     """
 
-    numBytes = len(data)
-    newBytes = bytes()
-    i = 0
-    while (i < numBytes):
+    data = bytes(data)
+    if FESC not in data:
+        return data
+
+    return data.replace(FESC + TFEND, FEND).replace(FESC + TFESC, FESC)
+
+
+class KissDescaper(object):
 
-        b = data[i]
-        if (b == ord(FESC)) and (i != numBytes - 1):
-            if data[i+1] == ord(TFEND):
-                newBytes += FEND
-                i += 1
+    def __init__(self):
+        """
+        Creates a new KissDescaper object, which de-escapes a stream of
+        KISS data delivered in arbitrary chunks. An escape sequence split
+        across two chunks is held back until the rest of it arrives.
+
+        :return: (KissDescaper) New descaper object
+        """
+        self._pending = b''
+
+
+    def feed(self, chunk):
+        """
+        De-escapes the next chunk of the stream.
 
-            elif data[i+1] == ord(TFESC):
-                newBytes += FESC
-                i += 1
+        :param chunk: (bytes) Next chunk of escaped data
 
-            else:
-                newBytes += bytes([b])
+        :return: (bytes) De-escaped data available so far
+        """
+        data = self._pending + bytes(chunk)
+        if data.endswith(FESC):
+            self._pending = FESC
+            data = data[:-1]
         else:
-            newBytes += bytes([b])
+            self._pending = b''
+
+        return descapeValues(data)
 
-        i += 1
 
-    return newBytes
+    def flush(self):
+        """
+        Ends the stream. A trailing lone FESC is returned unchanged,
+        matching descapeValues.
+
+        :return: (bytes) Any data still held back
+        """
+        data = self._pending
+        self._pending = b''
+        return data
@@ -0,0 +1,267 @@
+"""
+Pipeline.py
+
+Stages which process the telemetry received from the balloon payload,
+each in its own thread, connected by bounded queues. A stage passes the
+result of its handler on to the stages after it, so a slow stage (such
+as one writing to a slow disk) only delays itself: its queue fills up,
+and items are then dropped or held back according to the queue's
+policy, instead of holding up reception.
+
+Each stage counts the items it has processed and dropped, along with
+how long items waited in its queue and how long its handler took.
+"""
+
+import queue
+import threading
+import time
+import traceback
+
+# Policies for a full queue
+DROP_NEWEST = "drop_newest"     # The new item is dropped
+DROP_OLDEST = "drop_oldest"     # The oldest waiting item is dropped to make room
+BLOCK = "block"                 # The producer waits up to blockTimeout (None: forever), then drops the new item
+
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_BLOCK_TIMEOUT = 1.0
+
+# Placed on a stage's queue to stop it
+_STOP = object()
+
+
+class Stage(object):
+
+    def __init__(self, name, handler, maxSize=DEFAULT_QUEUE_SIZE, policy=DROP_NEWEST,
+                 blockTimeout=DEFAULT_BLOCK_TIMEOUT):
+        """
+        Creates a new Stage object.
+
+        :param name: (string) Name of the stage, for its statistics
+        :param handler: (function) Called with each item; anything it returns
+                                   other than None goes on to the next stages
+        :param maxSize: (int) Most items waiting in the stage's queue
+        :param policy: (string) What to do when the queue is full (DROP_NEWEST, DROP_OLDEST, BLOCK)
+        :param blockTimeout: (float) Longest wait for room in the queue with BLOCK, in seconds
+                                     (None: wait until there is room, so nothing is dropped)
+
+        :return: (Stage) New stage
+        """
+        self.name = name
+        self.handler = handler
+        self.policy = policy
+        self.blockTimeout = blockTimeout
+        self.outputs = []
+
+        self.processed = 0
+        self.dropped = 0
+        self.totalWait = 0.0
+        self.maxWait = 0.0
+        self.totalService = 0.0
+        self.maxService = 0.0
+
+        self._queue = queue.Queue(maxSize)
+        self._dropLock = threading.Lock()
+        self._thread = None
+
+
+    def connect(self, stage):
+        """
+        Passes the results of this stage on to another stage.
+
+        :param stage: (Stage) Next stage
+
+        :return: (Stage) The next stage, so that connections can be chained
+        """
+        self.outputs.append(stage)
+        return stage
+
+
+    def put(self, item):
+        """
+        Adds an item to the stage's queue, following the stage's policy if
+        the queue is full. Only BLOCK ever waits.
+
+        :param item: (object) Item to process
+
+        :return: (boolean) Whether the item was queued
+        """
+        entry = (time.perf_counter(), item)
+
+        if self.policy == BLOCK:
+            try:
+                self._queue.put(entry, timeout=self.blockTimeout)
+                return True
+            except queue.Full:
+                self._countDrop()
+                return False
+
+        while True:
+            try:
+                self._queue.put_nowait(entry)
+                return True
+            except queue.Full:
+                if self.policy != DROP_OLDEST:
+                    self._countDrop()
+                    return False
+
+            try:
+                self._queue.get_nowait()
+                self._countDrop()
+            except queue.Empty:
+                pass
+
+
+    def start(self):
+        """
+        Starts the stage's thread.
+
+        :return: (None)
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def stop(self):
+        """
+        Stops the stage once it has processed the items already queued.
+
+        :return: (None)
+        """
+        if not self._thread is None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+
+    def getStats(self):
+        """
+        Gets the statistics of the stage.
+
+        :return: (dict) Items processed and dropped, items waiting, and the
+                        average and largest queue wait and handler time (in seconds)
+        """
+        processed = max(self.processed, 1)
+        return {
+            "processed" : self.processed,
+            "dropped" : self.dropped,
+            "waiting" : self._queue.qsize(),
+            "average_wait" : self.totalWait / processed,
+            "max_wait" : self.maxWait,
+            "average_service" : self.totalService / processed,
+            "max_service" : self.maxService
+        }
+
+
+    def _countDrop(self):
+        """
+        Counts a dropped item.
+
+        :return: (None)
+        """
+        with self._dropLock:
+            self.dropped += 1
+
+
+    def _run(self):
+        """
+        Processes the items on the queue until stopped.
+
+        :return: (None)
+        """
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                break
+
+            queuedTime, item = entry
+            startTime = time.perf_counter()
+            try:
+                result = self.handler(item)
+            except Exception:
+                traceback.print_exc()
+                result = None
+            endTime = time.perf_counter()
+
+            wait = startTime - queuedTime
+            service = endTime - startTime
+            self.processed += 1
+            self.totalWait += wait
+            self.maxWait = max(self.maxWait, wait)
+            self.totalService += service
+            self.maxService = max(self.maxService, service)
+
+            if not result is None:
+                for stage in self.outputs:
+                    stage.put(result)
+
+
+class Pipeline(object):
+
+    def __init__(self):
+        """
+        Creates a new, empty Pipeline object.
+
+        :return: (Pipeline) New pipeline
+        """
+        self.stages = []
+
+
+    def addStage(self, name, handler, maxSize=DEFAULT_QUEUE_SIZE, policy=DROP_NEWEST,
+                 blockTimeout=DEFAULT_BLOCK_TIMEOUT):
+        """
+        Adds a stage to the pipeline. Add the stages in the order data
+        flows through them, so that stop drains them in turn.
+
+        :param name: (string) Name of the stage, for its statistics
+        :param handler: (function) Called with each item; anything it returns
+                                   other than None goes on to the next stages
+        :param maxSize: (int) Most items waiting in the stage's queue
+        :param policy: (string) What to do when the queue is full (DROP_NEWEST, DROP_OLDEST, BLOCK)
+        :param blockTimeout: (float) Longest wait for room in the queue with BLOCK, in seconds
+                                     (None: wait until there is room, so nothing is dropped)
+
+        :return: (Stage) New stage
+        """
+        stage = Stage(name, handler, maxSize, policy, blockTimeout)
+        self.stages.append(stage)
+        return stage
+
+
+    def start(self):
+        """
+        Starts every stage.
+
+        :return: (None)
+        """
+        for stage in self.stages:
+            stage.start()
+
+
+    def stop(self):
+        """
+        Stops every stage, in the order they were added, once each has
+        processed the items already queued.
+
+        :return: (None)
+        """
+        for stage in self.stages:
+            stage.stop()
+
+
+    def formatStats(self):
+        """
+        Formats the statistics of every stage, one line per stage.
+
+        :return: (string) Statistics of the pipeline
+        """
+        lines = []
+        for stage in self.stages:
+            stats = stage.getStats()
+            lines.append("{}: {} processed, {} dropped, {} waiting, "
+                         "wait {:.1f}/{:.1f} ms, handler {:.1f}/{:.1f} ms (average/max)".format(
+                            stage.name, stats["processed"], stats["dropped"], stats["waiting"],
+                            1000 * stats["average_wait"], 1000 * stats["max_wait"],
+                            1000 * stats["average_service"], 1000 * stats["max_service"]))
+        return '\n'.join(lines)
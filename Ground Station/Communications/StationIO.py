@@ -0,0 +1,505 @@
+"""
+StationIO.py
+
+Event loop which handles all of the ground station's serial ports (the
+radio and the vehicle GPS) and the commands sent to the payload. Each
+port is read through a transport, which wakes the loop only when data
+arrives, and the data is split into frames (KISS frames or NMEA
+sentences) as it is received. Every complete frame is put on the queue
+of each consumer of its port, and the consumers run on the loop as soon
+as the frame's last byte arrives. Nothing polls, so the loop is idle
+between packets.
+
+Kivy owns the main thread, so the loop runs in a background thread;
+consumers which update the user interface must still go through
+Clock.schedule_once.
+"""
+
+import asyncio
+import collections
+import os
+import threading
+import traceback
+
+RADIO = "radio"
+GPS = "GPS"
+
+# Timeout of the blocking reads made by ExecutorTransport, in seconds
+READ_TIMEOUT = 0.1
+
+# Longest NMEA sentence kept while waiting for its line ending
+MAX_SENTENCE_LENGTH = 1024
+
+
+class NMEASplitter(object):
+
+    def __init__(self, maxSentenceLength=MAX_SENTENCE_LENGTH):
+        """
+        Creates a new NMEASplitter object, which splits the bytes received
+        from a GPS into sentences, in the same way KissDeframer splits the
+        radio's bytes into frames.
+
+        :param maxSentenceLength: (int) Longest sentence to keep
+
+        :return: (NMEASplitter) New NMEA splitter
+        """
+        self.maxSentenceLength = maxSentenceLength
+        self._partial = ''
+
+
+    def feed(self, chunk):
+        """
+        Adds bytes received from the GPS, and returns every sentence they
+        complete.
+
+        :param chunk: (bytes) Bytes received from the GPS
+
+        :return: (list) Complete sentences, without their line endings
+        """
+        lines = (self._partial + chunk.decode('ascii', 'replace')).split('\n')
+        self._partial = lines.pop()
+        if len(self._partial) > self.maxSentenceLength:
+            self._partial = ''
+
+        return [line.rstrip('\r') for line in lines if line.strip()]
+
+
+    def reset(self):
+        """
+        Discards any partial sentence.
+
+        :return: (None)
+        """
+        self._partial = ''
+
+
+class ReaderTransport(object):
+
+    def __init__(self, port):
+        """
+        Creates a new ReaderTransport object, which watches a serial port's
+        file descriptor with the event loop (POSIX only). The port is made
+        non-blocking, and is read only when the descriptor is readable.
+        Writes are buffered, and sent whenever the descriptor is writable,
+        so a slow link never blocks the loop.
+
+        :param port: (serial.Serial) Open serial port
+
+        :return: (ReaderTransport) New reader transport
+        """
+        self.port = port
+        self.port.timeout = 0
+        os.set_blocking(self.port.fileno(), False)
+        self._loop = None
+
+        # Bytes waiting to be written, each with the future of its write
+        self._writes = collections.deque()
+
+
+    def start(self, loop, onData):
+        """
+        Starts passing the bytes received by the port to onData.
+
+        :param loop: (asyncio.AbstractEventLoop) Loop to read the port on
+        :param onData: (function) Called with each chunk of received bytes
+
+        :return: (None)
+        """
+        self._loop = loop
+        loop.add_reader(self.port.fileno(), self._read, onData)
+
+
+    def _read(self, onData):
+        """
+        Reads everything the port has received.
+
+        :param onData: (function) Called with the received bytes
+
+        :return: (None)
+        """
+        data = self.port.read(self.port.in_waiting or 1)
+        if data:
+            onData(data)
+
+
+    async def write(self, data):
+        """
+        Writes bytes to the port, in the order the writes were made,
+        without blocking the loop.
+
+        :param data: (bytes) Bytes to write
+
+        :return: (None) Once every byte has been handed to the port
+        """
+        future = self._loop.create_future()
+        if not self._writes:
+            self._loop.add_writer(self.port.fileno(), self._flushWrites)
+        self._writes.append([memoryview(bytes(data)), future])
+
+        await future
+
+
+    def _flushWrites(self):
+        """
+        Writes as much of the buffered bytes as the port will take now,
+        and stops waiting for the port once they have all been written.
+
+        :return: (None)
+        """
+        while self._writes:
+            entry = self._writes[0]
+            data, future = entry
+            try:
+                numBytes = os.write(self.port.fileno(), data)
+            except BlockingIOError:
+                return
+            except OSError as error:
+                self._writes.popleft()
+                if not future.done():
+                    future.set_exception(error)
+                continue
+
+            if numBytes < len(data):
+                entry[0] = data[numBytes:]
+                return
+
+            self._writes.popleft()
+            if not future.done():
+                future.set_result(None)
+
+        self._loop.remove_writer(self.port.fileno())
+
+
+    def stop(self):
+        """
+        Stops watching the port. Writes still buffered are cancelled.
+
+        :return: (None)
+        """
+        if not self._loop is None:
+            self._loop.remove_reader(self.port.fileno())
+            self._loop.remove_writer(self.port.fileno())
+            self._loop = None
+
+        while self._writes:
+            data, future = self._writes.popleft()
+            future.cancel()
+
+
+class ExecutorTransport(object):
+
+    def __init__(self, port):
+        """
+        Creates a new ExecutorTransport object, which reads a serial port
+        with blocking reads in the loop's executor. This works with any
+        port, including Windows COM ports, which the event loop cannot
+        watch directly. Each read returns as soon as any bytes arrive.
+
+        :param port: (serial.Serial) Open serial port
+
+        :return: (ExecutorTransport) New executor transport
+        """
+        self.port = port
+        self.port.timeout = READ_TIMEOUT
+        self._loop = None
+        self._task = None
+        self._stopped = False
+
+
+    def start(self, loop, onData):
+        """
+        Starts passing the bytes received by the port to onData.
+
+        :param loop: (asyncio.AbstractEventLoop) Loop to read the port on
+        :param onData: (function) Called with each chunk of received bytes
+
+        :return: (None)
+        """
+        self._loop = loop
+        self._task = loop.create_task(self._readLoop(onData))
+
+
+    async def _readLoop(self, onData):
+        """
+        Reads the port until stopped.
+
+        :param onData: (function) Called with each chunk of received bytes
+
+        :return: (None)
+        """
+        while not self._stopped:
+            data = await self._loop.run_in_executor(None, self._readBlocking)
+            if data:
+                onData(data)
+
+
+    def _readBlocking(self):
+        """
+        Waits for bytes at the port (up to READ_TIMEOUT), then takes
+        everything that has arrived so far.
+
+        :return: (bytes) Received bytes (empty on timeout)
+        """
+        return self.port.read(self.port.in_waiting or 1)
+
+
+    async def write(self, data):
+        """
+        Writes bytes to the port, without blocking the loop.
+
+        :param data: (bytes) Bytes to write
+
+        :return: (None)
+        """
+        await self._loop.run_in_executor(None, self.port.write, data)
+
+
+    def stop(self):
+        """
+        Stops reading the port. A read in progress ends within READ_TIMEOUT.
+
+        :return: (None)
+        """
+        self._stopped = True
+        if not self._task is None:
+            self._task.cancel()
+            self._task = None
+
+
+def getTransport(port):
+    """
+    Gets the best transport for a serial port on this platform.
+
+    :param port: (serial.Serial) Open serial port
+
+    :return: (ReaderTransport or ExecutorTransport) Transport for the port
+    """
+    if os.name == 'posix':
+        return ReaderTransport(port)
+    return ExecutorTransport(port)
+
+
+class StationIO(object):
+
+    def __init__(self):
+        """
+        Creates a new StationIO object. The event loop does not run until
+        start is called.
+
+        :return: (StationIO) New station I/O core
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+        self._transports = {}
+        self._deframers = {}
+        self._queues = {}
+        self._tasks = []
+        self._servers = []
+
+
+    def start(self):
+        """
+        Starts the event loop in a background thread.
+
+        :return: (None)
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._runLoop)
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def addConsumer(self, name, consumer):
+        """
+        Adds a consumer of the frames received by a port. Each consumer has
+        its own queue, and is called on the loop's thread with each frame
+        in the order they were received. Add the consumers of a port before
+        the port, so that no frames are missed.
+
+        :param name: (string) Name of the port (RADIO, GPS, ...)
+        :param consumer: (function) Called with each frame
+
+        :return: (None)
+        """
+        self.loop.call_soon_threadsafe(self._addConsumer, name, consumer)
+
+
+    def addPort(self, name, port, deframer, transport=None):
+        """
+        Starts receiving from a serial port.
+
+        :param name: (string) Name of the port (RADIO, GPS, ...)
+        :param port: (serial.Serial) Open serial port
+        :param deframer: (object) Splits the received bytes into frames
+                                  (with a feed method, like KissDeframer)
+        :param transport: (object) Transport for the port (default: see getTransport)
+
+        :return: (None)
+        """
+        if transport is None:
+            transport = getTransport(port)
+
+        self.loop.call_soon_threadsafe(self._addPort, name, transport, deframer)
+
+
+    def addServer(self, server):
+        """
+        Starts a server (such as a CommandServer) on the event loop. The
+        server is closed when the loop stops.
+
+        :param server: (object) Server with a start coroutine and a close method
+
+        :return: (concurrent.futures.Future) Completes once the server is listening
+        """
+        self._servers.append(server)
+        return asyncio.run_coroutine_threadsafe(server.start(), self.loop)
+
+
+    def send(self, name, data):
+        """
+        Sends bytes out of a port. This may be called from any thread.
+
+        :param name: (string) Name of the port
+        :param data: (bytes) Bytes to send
+
+        :return: (concurrent.futures.Future) Completes once the bytes are written
+        """
+        return asyncio.run_coroutine_threadsafe(self._send(name, data), self.loop)
+
+
+    def wait(self):
+        """
+        Waits until the event loop stops. The wait is made in short joins
+        so that Ctrl+C still interrupts it on Windows.
+
+        :return: (None)
+        """
+        while (not self._thread is None) and self._thread.is_alive():
+            self._thread.join(1.0)
+
+
+    def stop(self):
+        """
+        Stops receiving from every port and closes every server, then
+        stops the event loop. The ports themselves are left open.
+
+        :return: (None)
+        """
+        if self._thread is None:
+            return
+
+        self.loop.call_soon_threadsafe(self._stopAll)
+        self._thread.join()
+        self._thread = None
+        self.loop.close()
+
+
+    def _runLoop(self):
+        """
+        Runs the event loop until stopped, then lets the cancelled tasks
+        and any reads in the executor finish.
+
+        :return: (None)
+        """
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+        pendingTasks = asyncio.all_tasks(self.loop)
+        if pendingTasks:
+            self.loop.run_until_complete(asyncio.gather(*pendingTasks, return_exceptions=True))
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+
+
+    def _addConsumer(self, name, consumer):
+        """
+        Adds a consumer (on the loop's thread).
+
+        :param name: (string) Name of the port
+        :param consumer: (function) Called with each frame
+
+        :return: (None)
+        """
+        queue = asyncio.Queue()
+        self._queues.setdefault(name, []).append(queue)
+        self._tasks.append(self.loop.create_task(self._consume(queue, consumer)))
+
+
+    def _addPort(self, name, transport, deframer):
+        """
+        Starts receiving from a port (on the loop's thread).
+
+        :param name: (string) Name of the port
+        :param transport: (object) Transport for the port
+        :param deframer: (object) Splits the received bytes into frames
+
+        :return: (None)
+        """
+        self._transports[name] = transport
+        self._deframers[name] = deframer
+        self._queues.setdefault(name, [])
+        transport.start(self.loop, lambda data: self._dispatch(name, data))
+
+
+    def _dispatch(self, name, data):
+        """
+        Splits bytes received by a port into frames, and queues each
+        complete frame for every consumer of the port.
+
+        :param name: (string) Name of the port
+        :param data: (bytes) Received bytes
+
+        :return: (None)
+        """
+        queues = self._queues[name]
+        for frame in self._deframers[name].feed(data):
+            for queue in queues:
+                queue.put_nowait(frame)
+
+
+    async def _consume(self, queue, consumer):
+        """
+        Passes the frames on a queue to a consumer, one at a time. An
+        error in the consumer is printed, and does not stop later frames.
+
+        :param queue: (asyncio.Queue) Queue of frames
+        :param consumer: (function) Called with each frame
+
+        :return: (None)
+        """
+        while True:
+            frame = await queue.get()
+            try:
+                consumer(frame)
+            except Exception:
+                traceback.print_exc()
+
+
+    async def _send(self, name, data):
+        """
+        Sends bytes out of a port (on the loop's thread).
+
+        :param name: (string) Name of the port
+        :param data: (bytes) Bytes to send
+
+        :return: (None)
+        """
+        await self._transports[name].write(data)
+
+
+    def _stopAll(self):
+        """
+        Stops every transport, server and consumer, then the loop itself.
+
+        :return: (None)
+        """
+        for transport in self._transports.values():
+            transport.stop()
+        for server in self._servers:
+            server.close()
+        for task in self._tasks:
+            task.cancel()
+
+        self._transports = {}
+        self._tasks = []
+        self._servers = []
+        self.loop.stop()
@@ -0,0 +1,253 @@
+"""
+TelemetryLoader.py
+
+Loads the balloon_data_*.csv files written by the ground station back
+into typed NumPy columns. Every layout the ground station has used is
+supported (2017, and the two 2019 layouts), since the columns are
+recognized by their titles. The parsed columns are cached next to the
+CSV file, so loading the same file again is instant until it changes.
+"""
+
+import os
+import re
+import numpy as np
+
+from TelemetryLogger import SEPARATOR
+
+CACHE_EXTENSION = '.cache.npz'
+CACHE_MTIME = '__mtime__'
+CACHE_SIZE = '__size__'
+CACHE_COLUMNS = '__columns__'
+
+FLOAT = 'float'
+INTEGER = 'integer'
+TIME = 'time'
+BOOLEAN = 'boolean'
+STATUS = 'status'
+FILENAME = 'filename'
+RELAYS = 'relays'
+
+# Columns which are not plain floating point values, by title
+COLUMN_KINDS = {
+    "GPS Time" : TIME,
+    "GPS Time 1" : TIME,
+    "GPS Time 2" : TIME,
+    "GPS Validity" : BOOLEAN,
+    "GPS Sentences" : INTEGER,
+    "Failed GPS Sentences" : INTEGER,
+    "Number of GPS Satellites" : INTEGER,
+    "Number of GPS Satellites 1" : INTEGER,
+    "Data Logging Status" : STATUS,
+    "Data Filename" : FILENAME,
+    "Relay States" : RELAYS
+}
+
+# Invalid GPS times were logged as a timedelta, such as "-1 day, 17:00:00"
+TIMEDELTA_DAYS = re.compile(r'( days?), ')
+
+
+def getColumnKey(title):
+    """
+    Gets the key of a column from its title in the CSV header, for
+    example "Acceleration (x)" becomes "acceleration_x".
+
+    :param title: (string) Column title
+
+    :return: (string) Column key
+    """
+    return re.sub(r'[^a-z0-9]+', '_', title.lower()).strip('_')
+
+
+def getCachePath(filename):
+    """
+    Gets the path of the cache kept for a CSV file.
+
+    :param filename: (string) Path of the CSV file
+
+    :return: (string) Path of the cache
+    """
+    return filename + CACHE_EXTENSION
+
+
+def loadTelemetryCSV(filename, useCache=True):
+    """
+    Loads a balloon_data_*.csv file into NumPy columns, keyed by column
+    key (see getColumnKey) in the order of the file. Times are datetime64
+    (NaT where the GPS had no fix), filenames become their index, and
+    relay states become the same bit field the payload sends. Rows which
+    are incomplete or cannot be parsed (such as a final line cut short by
+    closing the program) are skipped.
+
+    :param filename: (string) Path of the CSV file
+    :param useCache: (boolean) Whether to read and write the cache
+
+    :return: (dict) Columns of the file, as NumPy arrays
+    """
+    cachePath = getCachePath(filename)
+    fileStat = os.stat(filename)
+
+    if useCache and os.path.exists(cachePath):
+        columns = readCache(cachePath, fileStat)
+        if columns is not None:
+            return columns
+
+    with open(filename, 'r') as fileHandle:
+        header = fileHandle.readline().rstrip('\r\n')
+        text = TIMEDELTA_DAYS.sub(r'\1 ', fileHandle.read())
+
+    titles = header.split(SEPARATOR)
+    numColumns = len(titles)
+
+    # The relay states are always last, so their own separators are kept
+    rows = [line.split(SEPARATOR, numColumns - 1) for line in text.splitlines()]
+    rows = [row for row in rows if len(row) == numColumns]
+    fields = list(zip(*rows)) if rows else [()] * numColumns
+
+    valid = np.ones(len(rows), dtype=bool)
+    parsed = []
+    for title, values in zip(titles, fields):
+        column, columnValid = parseColumn(COLUMN_KINDS.get(title, FLOAT), values)
+        parsed.append(column)
+        valid &= columnValid
+
+    columns = {}
+    for title, column in zip(titles, parsed):
+        columns[getColumnKey(title)] = column[valid]
+
+    if useCache:
+        writeCache(cachePath, fileStat, columns)
+
+    return columns
+
+
+def parseColumn(kind, values):
+    """
+    Parses the text of one column into a NumPy array.
+
+    :param kind: (string) Kind of the column (FLOAT, TIME, ...)
+    :param values: (sequence) Text of each value
+
+    :return: (2-tuple) Parsed column, and which rows parsed correctly
+    """
+    values = np.array(values, dtype=str)
+    valid = np.ones(len(values), dtype=bool)
+
+    if kind == TIME:
+        column = np.empty(len(values), dtype='datetime64[s]')
+        try:
+            column[:] = values
+        except ValueError:
+            for i, value in enumerate(values):
+                try:
+                    column[i] = np.datetime64(value, 's')
+                except ValueError:
+                    column[i] = np.datetime64('NaT')
+
+    elif kind == BOOLEAN:
+        numbers, valid = parseNumbers(replaceBooleans(values), np.int64)
+        column = (numbers != 0)
+
+    elif kind == STATUS:
+        # Logged as True/False, and later as the raw status value
+        column, valid = parseNumbers(replaceBooleans(values), np.int64)
+
+    elif kind == FILENAME:
+        indices = [value[4:-4] if (value.startswith('DATA') and value.endswith('.CSV')) else '' for value in values]
+        column, valid = parseNumbers(np.array(indices, dtype=str), np.int64)
+
+    elif kind == RELAYS:
+        column = np.zeros(len(values), dtype=np.uint8)
+        for i, value in enumerate(values):
+            relayStates = value.strip('()').split(SEPARATOR)
+            if len(relayStates) != 4:
+                valid[i] = False
+                continue
+            for bit, state in enumerate(relayStates):
+                if state == 'True':
+                    column[i] |= (1 << bit)
+
+    elif kind == INTEGER:
+        column, valid = parseNumbers(values, np.int64)
+
+    else:
+        column, valid = parseNumbers(values, np.float64)
+
+    return column, valid
+
+
+def replaceBooleans(values):
+    """
+    Replaces True and False in a column with 1 and 0.
+
+    :param values: (numpy array) Text of each value
+
+    :return: (numpy array) Text of each value, as a number
+    """
+    return np.where(values == 'True', '1', np.where(values == 'False', '0', values))
+
+
+def parseNumbers(values, dtype):
+    """
+    Parses a column of numbers, all at once where possible.
+
+    :param values: (numpy array) Text of each value
+    :param dtype: (numpy.dtype) Type of the parsed column
+
+    :return: (2-tuple) Parsed column, and which rows parsed correctly
+    """
+    try:
+        numbers = values.astype(np.float64)
+        valid = np.isfinite(numbers) | (dtype == np.float64)
+    except ValueError:
+        numbers = np.zeros(len(values), dtype=np.float64)
+        valid = np.ones(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                numbers[i] = float(value)
+            except ValueError:
+                valid[i] = False
+
+    if dtype != np.float64:
+        numbers = np.where(np.isfinite(numbers), numbers, 0)
+
+    return numbers.astype(dtype), valid
+
+
+def readCache(cachePath, fileStat):
+    """
+    Reads the columns cached for a CSV file, if the file has not changed
+    since they were cached.
+
+    :param cachePath: (string) Path of the cache
+    :param fileStat: (os.stat_result) Current status of the CSV file
+
+    :return: (dict) Cached columns, or None if the cache is out of date
+    """
+    try:
+        with np.load(cachePath) as cache:
+            if (cache[CACHE_MTIME] != fileStat.st_mtime) or (cache[CACHE_SIZE] != fileStat.st_size):
+                return None
+            return dict((key, cache[key]) for key in cache[CACHE_COLUMNS])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def writeCache(cachePath, fileStat, columns):
+    """
+    Caches the columns parsed from a CSV file. Failing to write the cache
+    (for example, in a read-only directory) is not an error.
+
+    :param cachePath: (string) Path of the cache
+    :param fileStat: (os.stat_result) Status of the CSV file when it was parsed
+    :param columns: (dict) Parsed columns
+
+    :return: (None)
+    """
+    try:
+        with open(cachePath, 'wb') as cacheFile:
+            np.savez(cacheFile,
+                     **dict(columns, **{CACHE_MTIME : np.float64(fileStat.st_mtime),
+                                        CACHE_SIZE : np.int64(fileStat.st_size),
+                                        CACHE_COLUMNS : np.array(list(columns))}))
+    except OSError:
+        pass
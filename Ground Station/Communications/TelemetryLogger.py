@@ -0,0 +1,104 @@
+"""
+TelemetryLogger.py
+
+Class that logs the data packets received from the balloon payload to
+a CSV file (the balloon_data_*.csv files).
+"""
+
+from BufferedLog import *
+
+COLUMNS = [
+    ("Interior Temperature 1", "interior_temperature_1"),
+    ("Interior Temperature 2", "interior_temperature_2"),
+    ("Interior Temperature 3", "interior_temperature_3"),
+    ("Exterior Temperature", "exterior_temperature"),
+
+    ("Pressure", "pressure"),
+    ("Humidity", "humidity"),
+
+    ("GPS Time 1", "gps_time_1"),
+    ("Latitude 1", "latitude_1"),
+    ("Longitude 1", "longitude_1"),
+    ("Altitude 1", "altitude_1"),
+    ("Number of GPS Satellites 1", "num_satellites_1"),
+
+    ("GPS Time 2", "gps_time_2"),
+    ("Latitude 2", "latitude_2"),
+    ("Longitude 2", "longitude_2"),
+    ("Altitude 2", "altitude_2"),
+
+    ("Acceleration (x)", "acceleration[0]"),
+    ("Acceleration (y)", "acceleration[1]"),
+    ("Acceleration (z)", "acceleration[2]"),
+
+    ("Rotation Rate (x)", "rates[0]"),
+    ("Rotation Rate (y)", "rates[1]"),
+    ("Rotation Rate (z)", "rates[2]"),
+
+    ("Magnetic Field (x)", "magnetic_reading[0]"),
+    ("Magnetic Field (y)", "magnetic_reading[1]"),
+    ("Magnetic Field (z)", "magnetic_reading[2]"),
+
+    ("Pitch", "attitude[0]"),
+    ("Roll", "attitude[1]"),
+    ("Yaw", "attitude[2]"),
+
+    ("Time Since Reset", "reset_time"),
+    ("Data Logging Status", "data_logging"),
+    ("Data Filename", "filename"),
+    ("Data Age", "data_age"),
+    ("Relay States", "relay_states")
+]
+
+SEPARATOR = ', '
+
+HEADER = SEPARATOR.join(title for title, key in COLUMNS) + '\n'
+
+# Formats a row from DataPacket.getConvertedValues in a single call.
+# An empty format spec gives the same text as str() for every value.
+ROW_FORMAT = SEPARATOR.join('{' + key + '}' for title, key in COLUMNS) + '\n'
+
+def formatRow(packet):
+    """
+    Formats a data packet as a row of the CSV file.
+
+    :param packet: (DataPacket) Packet to format
+
+    :return: (string) Row of the CSV file, with its line ending
+    """
+    return ROW_FORMAT.format_map(packet.getConvertedValues())
+
+
+class TelemetryLogger(BufferedLogWriter):
+
+    def __init__(self, filename, flushRows=FLUSH_ENTRIES, flushInterval=FLUSH_INTERVAL, fsync=False):
+        """
+        Creates a new TelemetryLogger object, and opens the CSV file. The
+        header is written if the file is empty. Rows are buffered, and
+        flushed to the file once flushRows rows are waiting, or at most
+        flushInterval seconds after the first of them was logged, even if
+        no more packets arrive (see BufferedLogWriter).
+
+        :param filename: (string) Name of the file to save the data to
+        :param flushRows: (int) Rows to buffer before flushing
+        :param flushInterval: (float) Longest time to keep rows buffered, in seconds
+        :param fsync: (boolean) Whether to also fsync the file on each flush
+
+        :return: (TelemetryLogger) New telemetry logger
+        """
+        BufferedLogWriter.__init__(self, filename, 'a', flushRows, flushInterval, fsync)
+
+        if self._fileHandle.tell() == 0:
+            self._fileHandle.write(HEADER)
+            self.flush()
+
+
+    def logPacket(self, packet):
+        """
+        Adds a data packet to the CSV file.
+
+        :param packet: (DataPacket) Packet to save to the file
+
+        :return: (None)
+        """
+        self.writeEntry(formatRow(packet))
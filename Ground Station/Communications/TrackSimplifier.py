@@ -0,0 +1,125 @@
+"""
+TrackSimplifier.py
+
+Class that simplifies a position track as it is recorded, for the level
+of detail (LOD) KML files. Each new position is compared only with the
+last position kept, so adding a position takes constant time however
+long the flight has been.
+"""
+
+import math
+from array import array
+
+from Conversions import METERS_PER_DEGREE_LATITUDE, METERS_PER_DEGREE_LONGITUDE
+
+# Default thresholds for keeping a position
+MIN_DISTANCE = 25.0
+MAX_DISTANCE = 1000.0
+MAX_ANGLE = 10.0
+
+
+class TrackSimplifier(object):
+
+    __slots__ = ('minDistance', 'maxDistance', 'minCosine',
+                 'latitudes', 'longitudes', 'altitudes',
+                 '_direction', '_latestPoint')
+
+    def __init__(self, minDistance=MIN_DISTANCE, maxDistance=MAX_DISTANCE, maxAngle=MAX_ANGLE):
+        """
+        Creates a new TrackSimplifier object. A position is kept once it
+        is at least minDistance meters from the last position kept, and
+        either the track has turned by more than maxAngle degrees since
+        then or it is maxDistance meters away. Positions closer than
+        minDistance (such as GPS noise while stationary) are never kept.
+
+        :param minDistance: (float) Shortest distance between kept positions, in meters
+        :param maxDistance: (float) Longest distance between kept positions, in meters
+        :param maxAngle: (float) Largest turn before a position is kept, in degrees
+
+        :return: (TrackSimplifier) New, empty track simplifier
+        """
+        self.minDistance = minDistance
+        self.maxDistance = maxDistance
+        self.minCosine = math.cos(math.radians(maxAngle))
+
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.altitudes = array('d')
+
+        # Direction of the last kept segment (unit vector, east/north/up)
+        self._direction = None
+        self._latestPoint = None
+
+
+    def addPoint(self, latitude, longitude, altitude):
+        """
+        Adds a position to the track, keeping it if the simplified track
+        would otherwise stray from the real one.
+
+        :param latitude: (float) Latitude (degrees)
+        :param longitude: (float) Longitude (degrees)
+        :param altitude: (float) Altitude (MSL, in meters)
+
+        :return: (boolean) Whether the position was kept
+        """
+        self._latestPoint = (latitude, longitude, altitude)
+
+        if len(self.latitudes) == 0:
+            self._keep(latitude, longitude, altitude, None)
+            return True
+
+        # Offset from the last kept position, on a plane tangent to it
+        lastLatitude = self.latitudes[-1]
+        east = (longitude - self.longitudes[-1]) * METERS_PER_DEGREE_LONGITUDE * math.cos(math.radians(lastLatitude))
+        north = (latitude - lastLatitude) * METERS_PER_DEGREE_LATITUDE
+        up = altitude - self.altitudes[-1]
+        distance = math.sqrt(east * east + north * north + up * up)
+
+        if distance < self.minDistance:
+            return False
+
+        direction = (east / distance, north / distance, up / distance)
+        if (distance < self.maxDistance) and not self._direction is None:
+            cosine = sum(a * b for a, b in zip(direction, self._direction))
+            if cosine > self.minCosine:
+                return False
+
+        self._keep(latitude, longitude, altitude, direction)
+        return True
+
+
+    def getCoordinates(self):
+        """
+        Gets the simplified track. The latest position is always included
+        as the end of the track, even if it was not kept, so the track
+        reaches the current position.
+
+        :return: (3-tuple) Arrays of latitudes, longitudes and altitudes
+        """
+        latitudes = array('d', self.latitudes)
+        longitudes = array('d', self.longitudes)
+        altitudes = array('d', self.altitudes)
+
+        if not self._latestPoint is None and (self._latestPoint != (latitudes[-1], longitudes[-1], altitudes[-1])):
+            latitudes.append(self._latestPoint[0])
+            longitudes.append(self._latestPoint[1])
+            altitudes.append(self._latestPoint[2])
+
+        return latitudes, longitudes, altitudes
+
+
+    def _keep(self, latitude, longitude, altitude, direction):
+        """
+        Keeps a position as part of the simplified track.
+
+        :param latitude: (float) Latitude (degrees)
+        :param longitude: (float) Longitude (degrees)
+        :param altitude: (float) Altitude (MSL, in meters)
+        :param direction: (tuple) Direction of the segment ending at the position
+
+        :return: (None)
+        """
+        self.latitudes.append(latitude)
+        self.longitudes.append(longitude)
+        self.altitudes.append(altitude)
+        self._direction = direction
@@ -0,0 +1,268 @@
+"""
+TrackStore.py
+
+Class that holds the position tracks recorded by the ground station in
+memory, and saves them to their KML files in the background. The
+full-resolution archive of each track only has its new positions
+appended to it with each save (see KMLTrackWriter). Besides the archive,
+a simplified level of detail (LOD) copy can be saved to its own KML
+file, which stays small enough for Google Earth to reload quickly
+throughout a long flight.
+"""
+
+import os
+import threading
+import traceback
+from array import array
+
+from KML import *
+from TrackSimplifier import *
+
+# Seconds between saves of the tracks to their KML files
+FLUSH_INTERVAL = 5.0
+
+KML_TEMPLATE_PATH = 'KML Template.txt'
+LOD_SUFFIX = '_lod'
+
+
+def getLODPath(kmlPath):
+    """
+    Gets the path of the LOD KML file kept alongside a track's KML file.
+
+    :param kmlPath: (string) Path of the track's KML file
+
+    :return: (string) Path of the LOD KML file
+    """
+    root, extension = os.path.splitext(kmlPath)
+    return root + LOD_SUFFIX + extension
+
+
+def getTemplateKML(kmlPath, altitudeMode):
+    """
+    Gets the KML text of an empty track, from the KML template.
+
+    :param kmlPath: (string) Path of the track's KML file
+    :param altitudeMode: (string) Mode of displaying altitude
+
+    :return: (string) KML text with no coordinates
+    """
+    with open(KML_TEMPLATE_PATH, 'r') as kmlTemplateFile:
+        kml = kmlTemplateFile.read()
+
+    kml = addName(kml, os.path.basename(kmlPath))
+    return addAltitudeMode(kml, altitudeMode)
+
+
+def saveKML(kmlPath, kml):
+    """
+    Saves a KML file, writing it to a temporary file first and renaming
+    it over the old one, so a reader never sees a half-written file.
+
+    :param kmlPath: (string) Path of the KML file
+    :param kml: (string) KML text
+
+    :return: (None)
+    """
+    temporaryPath = kmlPath + '.tmp'
+    with open(temporaryPath, 'w') as kmlFile:
+        kmlFile.write(kml)
+    os.replace(temporaryPath, kmlPath)
+
+
+class Track(object):
+
+    __slots__ = ('kmlPath', 'writer', 'latitudes', 'longitudes', 'altitudes', 'savedLength',
+                 'lodPath', 'lodKml', 'simplifier')
+
+    def __init__(self, kmlPath, writer, lodPath=None, lodKml=None, simplifier=None):
+        """
+        Creates a new Track object.
+
+        :param kmlPath: (string) Path of the track's KML file
+        :param writer: (KMLTrackWriter) Writer of the track's KML file
+        :param lodPath: (string) Path of the track's LOD KML file (None: no LOD track)
+        :param lodKml: (string) KML text of the LOD track with no coordinates
+        :param simplifier: (TrackSimplifier) Simplifier of the LOD track
+
+        :return: (Track) New, empty track
+        """
+        self.kmlPath = kmlPath
+        self.writer = writer
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.altitudes = array('d')
+        self.savedLength = 0
+
+        self.lodPath = lodPath
+        self.lodKml = lodKml
+        self.simplifier = simplifier
+
+
+class TrackStore(object):
+
+    def __init__(self, flushInterval=FLUSH_INTERVAL):
+        """
+        Creates a new TrackStore object. Positions are added to the tracks
+        in memory, and a background thread saves any track which has
+        changed every flushInterval seconds, so that the threads receiving
+        positions never wait on the disk.
+
+        :param flushInterval: (float) Seconds between saves to disk
+
+        :return: (TrackStore) New track store
+        """
+        self.flushInterval = flushInterval
+
+        self._tracks = {}
+        self._lock = threading.Lock()
+        self._flushLock = threading.Lock()
+        self._stop = threading.Event()
+        self._flushThread = None
+
+
+    def addTrack(self, trackName, kmlPath, altitudeMode=ABSOLUTE, simplifier=None):
+        """
+        Adds a new, empty track, saved to the given KML file. If a
+        simplifier is given, a simplified copy of the track is also saved
+        to the LOD KML file next to it (see getLODPath). Both files are
+        started afresh from the KML template.
+
+        :param trackName: (string) Name used to refer to the track
+        :param kmlPath: (string) Path of the track's KML file
+        :param altitudeMode: (string) Mode of displaying altitude
+        :param simplifier: (TrackSimplifier) Simplifier of the LOD track (None: no LOD track)
+
+        :return: (None)
+        """
+        saveKML(kmlPath, getTemplateKML(kmlPath, altitudeMode))
+        writer = KMLTrackWriter(kmlPath)
+
+        lodPath = None
+        lodKml = None
+        if not simplifier is None:
+            lodPath = getLODPath(kmlPath)
+            lodKml = getTemplateKML(lodPath, altitudeMode)
+            saveKML(lodPath, lodKml)
+
+        with self._lock:
+            self._tracks[trackName] = Track(kmlPath, writer, lodPath, lodKml, simplifier)
+
+
+    def addCoordinate(self, trackName, latitude, longitude, altitude):
+        """
+        Adds a position to a track. The position is only held in memory
+        until the next save. The LOD track, if any, is simplified here, one
+        position at a time.
+
+        :param trackName: (string) Name of the track
+        :param latitude: (float) Current latitude
+        :param longitude: (float) Current longitude
+        :param altitude: (float) Current altitude (MSL, in meters)
+
+        :return: (None)
+        """
+        with self._lock:
+            track = self._tracks[trackName]
+            track.latitudes.append(latitude)
+            track.longitudes.append(longitude)
+            track.altitudes.append(altitude)
+
+            if not track.simplifier is None:
+                track.simplifier.addPoint(latitude, longitude, altitude)
+
+
+    def getCoordinates(self, trackName):
+        """
+        Gets a copy of all of the positions in a track.
+
+        :param trackName: (string) Name of the track
+
+        :return: (3-tuple) Arrays of latitudes, longitudes and altitudes
+        """
+        with self._lock:
+            track = self._tracks[trackName]
+            return array('d', track.latitudes), array('d', track.longitudes), array('d', track.altitudes)
+
+
+    def flush(self):
+        """
+        Saves every track which has changed since its last save: the new
+        positions are appended to the track's KML file, and its LOD track
+        (if any) is saved whole (see saveKML). A track which cannot be
+        saved is reported, and tried again at the next save.
+
+        :return: (None)
+        """
+        with self._flushLock:
+            with self._lock:
+                changedTracks = [track for track in self._tracks.values()
+                                 if len(track.latitudes) != track.savedLength]
+
+            for track in changedTracks:
+                with self._lock:
+                    numPoints = len(track.latitudes)
+                    latitudes = track.latitudes[track.savedLength:numPoints]
+                    longitudes = track.longitudes[track.savedLength:numPoints]
+                    altitudes = track.altitudes[track.savedLength:numPoints]
+
+                    lodCoordinates = None
+                    if not track.simplifier is None:
+                        lodCoordinates = track.simplifier.getCoordinates()
+
+                try:
+                    track.writer.addCoordinates(latitudes, longitudes, altitudes)
+                except OSError as error:
+                    print("Failed to save track " + track.kmlPath + ": " + str(error))
+                    continue
+
+                track.savedLength = numPoints
+
+                if not lodCoordinates is None:
+                    try:
+                        saveKML(track.lodPath, addCoordinates(track.lodKml, *lodCoordinates))
+                    except OSError as error:
+                        print("Failed to save track " + track.lodPath + ": " + str(error))
+
+
+    def start(self):
+        """
+        Starts the background thread which saves the tracks.
+
+        :return: (None)
+        """
+        if self._flushThread is None:
+            self._flushThread = threading.Thread(target=self._flushLoop)
+            self._flushThread.daemon = True
+            self._flushThread.start()
+
+
+    def close(self):
+        """
+        Stops the background thread, saves the tracks one last time, and
+        closes their KML files.
+
+        :return: (None)
+        """
+        self._stop.set()
+        if not self._flushThread is None:
+            self._flushThread.join()
+            self._flushThread = None
+
+        self.flush()
+        with self._lock:
+            for track in self._tracks.values():
+                track.writer.close()
+
+
+    def _flushLoop(self):
+        """
+        Saves the tracks every flushInterval seconds until closed. An
+        error in one save is printed, and does not stop later ones.
+
+        :return: (None)
+        """
+        while not self._stop.wait(self.flushInterval):
+            try:
+                self.flush()
+            except Exception:
+                traceback.print_exc()
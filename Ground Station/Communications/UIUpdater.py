@@ -0,0 +1,104 @@
+"""
+UIUpdater.py
+
+Class that applies updates to the user interface at a capped rate. Each
+panel of the interface (a payload GPS, the vehicle GPS, the payload's
+sensors) is updated with a snapshot of the values of its properties.
+Only the latest snapshot of each panel is kept, and every panel with a
+new snapshot is updated in one batched callback on the user interface's
+thread, at most maxRate times a second. A burst of telemetry (such as a
+replayed flight) therefore costs the user interface no more than a
+steady stream does.
+
+The snapshots may be posted from any thread. The values should already
+be formatted, so that the callback only has to set the properties.
+"""
+
+import threading
+import time
+
+# Most updates applied to the user interface each second
+MAX_RATE = 10.0
+
+
+class UIUpdater(object):
+
+    def __init__(self, target, scheduleOnce, maxRate=MAX_RATE):
+        """
+        Creates a new UIUpdater object.
+
+        :param target: (object) Object whose properties are updated (such as a Kivy widget)
+        :param scheduleOnce: (function) Schedules a callback on the user interface's
+                                        thread after a delay in seconds, from any
+                                        thread (such as kivy.clock.Clock.schedule_once)
+        :param maxRate: (float) Most updates applied each second
+
+        :return: (UIUpdater) New user interface updater
+        """
+        self.target = target
+        self.scheduleOnce = scheduleOnce
+        self.interval = 1.0 / maxRate
+
+        self.posted = 0
+        self.applied = 0
+
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._lastApplyTime = 0.0
+
+
+    def post(self, panel, values):
+        """
+        Posts the latest values of a panel's properties, replacing any
+        snapshot of the panel which has not been applied yet.
+
+        :param panel: (string) Name of the panel
+        :param values: (dict) Value of each of the panel's properties, by property name
+
+        :return: (None)
+        """
+        with self._lock:
+            self._snapshots[panel] = values
+            self.posted += 1
+            if self._scheduled:
+                return
+            self._scheduled = True
+            delay = max(0.0, self._lastApplyTime + self.interval - time.monotonic())
+
+        self.scheduleOnce(self._apply, delay)
+
+
+    def getStats(self):
+        """
+        Gets the number of snapshots posted and applied.
+
+        :return: (dict) Snapshots posted, applied, and replaced before being applied
+        """
+        with self._lock:
+            return {
+                "posted" : self.posted,
+                "applied" : self.applied,
+                "replaced" : self.posted - self.applied - len(self._snapshots)
+            }
+
+
+    def _apply(self, dt=0):
+        """
+        Sets the properties of every panel with a new snapshot (on the
+        user interface's thread).
+
+        :param dt: (float) Time since the callback was scheduled
+
+        :return: (None)
+        """
+        with self._lock:
+            snapshots = self._snapshots
+            self._snapshots = {}
+            self._scheduled = False
+            self._lastApplyTime = time.monotonic()
+            self.applied += len(snapshots)
+
+        for values in snapshots.values():
+            for name, value in values.items():
+                setattr(self.target, name, value)
@@ -0,0 +1,64 @@
+"""
+checksumTest.py
+
+Checks the vectorized checksums in Checksum.py against the original
+word-by-word algorithm. Run directly, or with pytest.
+"""
+
+import random
+import numpy as np
+
+from Checksum import *
+
+# Random buffers checked against the original algorithm
+NUM_BUFFERS = 500
+
+
+def makeBuffers():
+    """
+    Makes random buffers of odd and even lengths, including empty ones.
+
+    :return: (list) Random byte strings
+    """
+    random.seed(1)
+    return [bytes(random.getrandbits(8) for i in range(random.randint(0, 200)))
+            for n in range(NUM_BUFFERS)]
+
+
+def test_checksum_matches_legacy():
+    for data in makeBuffers():
+        assert checksum16(data) == legacyChecksum16(data)
+
+
+def test_checksum_wraps_around():
+    # The sum overflows 16 bits many times over
+    data = b'\xFF' * 1001
+    assert checksum16(data) == legacyChecksum16(data)
+
+
+def test_checksum_of_slice():
+    # A slice of a larger buffer is read in place
+    data = bytes(range(256)) * 4
+    view = memoryview(data)[3:517]
+    assert checksum16(view) == legacyChecksum16(data[3:517])
+
+
+def test_row_checksums_match_legacy():
+    random.seed(2)
+    for numBytes in [0, 1, 2, 7, 64, 65]:
+        rows = np.array([[random.getrandbits(8) for i in range(numBytes)] for n in range(20)],
+                        dtype=np.uint8).reshape(20, numBytes)
+        expected = [legacyChecksum16(row.tobytes()) for row in rows]
+        assert checksum16Rows(rows).tolist() == expected
+
+
+def main():
+    test_checksum_matches_legacy()
+    test_checksum_wraps_around()
+    test_checksum_of_slice()
+    test_row_checksums_match_legacy()
+    print("All checksum tests passed")
+
+
+if __name__ == '__main__':
+    main()
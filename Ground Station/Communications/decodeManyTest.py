@@ -0,0 +1,88 @@
+"""
+decodeManyTest.py
+
+Checks that DataPacket.decodeMany decodes a batch of frames the same as
+DataPacket.decode does one at a time, and flags the frames which are
+corrupt. Run directly, or with pytest.
+"""
+
+import numpy as np
+
+from DataPacket import *
+
+
+def makeFrame(index):
+    """
+    Makes the KISS frame of a data packet, with values that differ from
+    frame to frame. The latitude includes an escaped byte.
+
+    :param index: (int) Number of the frame
+
+    :return: (bytes) KISS frame
+    """
+    packet = DataPacket()
+    packet.values[BATTERY_VOLTAGE] = 11.38 + index
+    packet.values[EXTERIOR_TEMPERATURE] = -123.5 + index
+    packet.values[LATITUDE_1] = 0x12C0C0 + index
+    packet.values[ALTITUDE_1] = 3048000 + index
+    packet.values[RELAY_STATES] = index % 16
+    return packet.getKISS()
+
+
+def test_matches_single_decode():
+    frames = [makeFrame(i) for i in range(10)]
+    decoded = DataPacket.decodeMany(frames)
+
+    assert decoded[CHECKSUM_VALID].all()
+    for row, frame in zip(decoded, frames):
+        packet = DataPacket()
+        assert packet.decode(frame)
+        for name, value in zip(FIELD_NAMES, packet.values):
+            assert np.isclose(row[name], value)
+
+
+def test_bad_checksum_flagged():
+    frames = [makeFrame(i) for i in range(3)]
+
+    # Change a value without updating the checksum
+    corrupt = bytearray(frames[1])
+    corrupt[4] ^= 0x01
+    frames[1] = bytes(corrupt)
+
+    decoded = DataPacket.decodeMany(frames)
+    assert decoded[CHECKSUM_VALID].tolist() == [True, False, True]
+
+
+def test_malformed_frames_flagged():
+    frame = makeFrame(0)
+    frames = [
+        frame,
+        frame[:-5] + FEND,              # Truncated
+        frame[:-1],                     # No closing FEND
+        frame[:-1] + b'\x00' + FEND,    # Too long
+        FEND + FEND,                    # Empty
+        frame
+    ]
+
+    decoded = DataPacket.decodeMany(frames)
+    assert decoded[CHECKSUM_VALID].tolist() == [True, False, False, False, False, True]
+    for name in FIELD_NAMES:
+        assert decoded[name][1] == 0
+
+
+def test_no_frames():
+    decoded = DataPacket.decodeMany([])
+    assert len(decoded) == 0
+    assert CHECKSUM_VALID in decoded.dtype.names
+
+
+def main():
+    test_matches_single_decode()
+    test_bad_checksum_flagged()
+    test_malformed_frames_flagged()
+    test_no_frames()
+    print("All batch decoding tests passed")
+
+
+if __name__ == '__main__':
+    main()
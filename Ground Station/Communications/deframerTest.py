@@ -0,0 +1,106 @@
+"""
+deframerTest.py
+
+Checks that KissDeframer finds the same frames however the received
+bytes are split into chunks, and that it drops oversize frames without
+losing the frames around them. Run directly, or with pytest.
+"""
+
+import random
+
+from KissDeframer import *
+
+# Largest frame kept by the deframers under test
+MAX_LENGTH = 64
+
+
+def makeFrame(length):
+    """
+    Makes a KISS frame with a body of the given length, which holds no FEND.
+
+    :param length: (int) Bytes between the FENDs
+
+    :return: (bytes) Frame, including its FENDs
+    """
+    return FEND + bytes(random.choice([0x00, 0x41, FESC[0], TFEND[0]]) for i in range(length)) + FEND
+
+
+def feedChunks(deframer, data, chunkLengths):
+    """
+    Feeds bytes to a deframer in chunks of the given lengths, and then
+    the rest of them in one chunk.
+
+    :param deframer: (KissDeframer) Deframer to feed
+    :param data: (bytes) Received bytes
+    :param chunkLengths: (list) Length of each chunk
+
+    :return: (list) Frames found, as bytes
+    """
+    frames = []
+    start = 0
+    for length in chunkLengths:
+        frames += [bytes(frame) for frame in deframer.feed(data[start:start + length])]
+        start += length
+    frames += [bytes(frame) for frame in deframer.feed(data[start:])]
+    return frames
+
+
+def test_frames_split_at_every_point():
+    random.seed(1)
+    frames = [makeFrame(length) for length in [1, 5, 40, 2]]
+    data = b'garbage' + b''.join(frames)
+
+    for split in range(len(data) + 1):
+        assert feedChunks(KissDeframer(MAX_LENGTH), data, [split]) == frames
+
+
+def test_frames_in_random_chunks():
+    random.seed(2)
+    frames = [makeFrame(random.randint(1, MAX_LENGTH)) for n in range(200)]
+    data = b''.join(frames)
+
+    for n in range(50):
+        chunkLengths = [random.randint(0, 20) for i in range(len(data) // 5)]
+        assert feedChunks(KissDeframer(MAX_LENGTH), data, chunkLengths) == frames
+
+
+def test_oversize_frame_within_chunk():
+    random.seed(3)
+    before = makeFrame(10)
+    after = makeFrame(10)
+    data = before + makeFrame(MAX_LENGTH + 1) + after
+
+    deframer = KissDeframer(MAX_LENGTH)
+    assert feedChunks(deframer, data, []) == [before, after]
+    assert deframer.droppedBytes == MAX_LENGTH + 1
+
+
+def test_oversize_frame_across_chunks():
+    random.seed(4)
+    before = makeFrame(10)
+    after = makeFrame(10)
+    data = before + makeFrame(3 * MAX_LENGTH) + after
+
+    # Chunks smaller than the maximum length, so no one chunk holds the frame
+    deframer = KissDeframer(MAX_LENGTH)
+    assert feedChunks(deframer, data, [7] * (len(data) // 7)) == [before, after]
+    assert deframer.droppedBytes >= 3 * MAX_LENGTH
+
+
+def test_frame_at_maximum_length_kept():
+    random.seed(5)
+    frame = makeFrame(MAX_LENGTH)
+    assert feedChunks(KissDeframer(MAX_LENGTH), frame, [MAX_LENGTH // 2]) == [frame]
+
+
+def main():
+    test_frames_split_at_every_point()
+    test_frames_in_random_chunks()
+    test_oversize_frame_within_chunk()
+    test_oversize_frame_across_chunks()
+    test_frame_at_maximum_length_kept()
+    print("All deframer tests passed")
+
+
+if __name__ == '__main__':
+    main()
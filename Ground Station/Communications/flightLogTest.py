@@ -0,0 +1,147 @@
+"""
+flightLogTest.py
+
+Checks that packets written by FlightLogWriter read back unchanged
+through FlightLogReader and FlightLogSet. Run directly, or with pytest.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from FlightLog import *
+
+PACKETS_PER_FILE = 40
+
+
+def makePacket(index):
+    """
+    Makes a data packet with values that differ from packet to packet.
+
+    :param index: (int) Number of the packet
+
+    :return: (DataPacket) Data packet
+    """
+    packet = DataPacket()
+    packet.values[BATTERY_VOLTAGE] = 11.38 + index
+    packet.values[EXTERIOR_TEMPERATURE] = -123.5 + index
+    packet.values[LATITUDE_1] = 461234567 + index
+    packet.values[ALTITUDE_1] = 3048000 + 7 * index
+    packet.values[RELAY_STATES] = index % 16
+    return packet
+
+
+def writeFlight(directory):
+    """
+    Writes a flight of three files, one packet a second. The files are
+    written last first, so they are only in order by their names.
+
+    :param directory: (string) Directory to write the flight logs to
+
+    :return: (list) Paths of the flight logs, in the order they were recorded
+    """
+    paths = [os.path.join(directory, 'balloon_data_2017_0601_0' + str(i) + FLIGHT_LOG_EXTENSION)
+             for i in range(3)]
+
+    for fileIndex in reversed(range(3)):
+        writer = FlightLogWriter(paths[fileIndex])
+        for i in range(PACKETS_PER_FILE):
+            index = fileIndex * PACKETS_PER_FILE + i
+            writer.logPacket(makePacket(index), 1000.0 + index)
+        writer.close()
+
+    return paths
+
+
+def test_reader_round_trip():
+    directory = tempfile.mkdtemp()
+    try:
+        path = writeFlight(directory)[0]
+        reader = FlightLogReader(path)
+
+        assert len(reader) == PACKETS_PER_FILE
+        assert reader.getColumnNames() == (RECEIVE_TIME,) + tuple(FIELD_NAMES)
+        assert reader.getTimeSpan() == (1000.0, 1000.0 + PACKETS_PER_FILE - 1)
+
+        for index in range(PACKETS_PER_FILE):
+            packet = DataPacket()
+            packet.decode(makePacket(index).getKISS())
+            for name, value in zip(FIELD_NAMES, packet.values):
+                assert reader[name][index] == value
+        del reader
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_partial_record_ignored():
+    directory = tempfile.mkdtemp()
+    try:
+        path = writeFlight(directory)[0]
+
+        # A log still being written may end part way through a record
+        with open(path, 'ab') as fileHandle:
+            fileHandle.write(b'\x00' * 10)
+
+        reader = FlightLogReader(path)
+        assert len(reader) == PACKETS_PER_FILE
+        del reader
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_mismatched_header_rejected():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'other' + FLIGHT_LOG_EXTENSION)
+        with open(path, 'wb') as fileHandle:
+            fileHandle.write(HEADER_CODEC.pack(MAGIC, 3, 1))
+
+        for openLog in [FlightLogReader, FlightLogWriter]:
+            try:
+                openLog(path)
+                assert False, "mismatched header accepted"
+            except ValueError:
+                pass
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_flight_set_time_range():
+    directory = tempfile.mkdtemp()
+    try:
+        paths = writeFlight(directory)
+        assert findFlightLogs(directory) == paths
+
+        flightLogSet = FlightLogSet(paths)
+        numPackets = 3 * PACKETS_PER_FILE
+        assert len(flightLogSet) == numPackets
+
+        # Whole flight, in order
+        assert np.array_equal(flightLogSet[RECEIVE_TIME], 1000.0 + np.arange(numPackets))
+
+        # A range spanning the end of one file and the start of the next
+        startTime = 1000.0 + PACKETS_PER_FILE - 5
+        endTime = 1000.0 + PACKETS_PER_FILE + 4
+        records = flightLogSet.timeRange(startTime, endTime)
+        assert np.array_equal(records[RECEIVE_TIME], np.arange(startTime, endTime + 1))
+        assert np.array_equal(flightLogSet.column(FIELD_NAMES[RELAY_STATES], startTime, endTime),
+                              np.arange(PACKETS_PER_FILE - 5, PACKETS_PER_FILE + 5) % 16)
+
+        # A range outside of the flight
+        assert len(flightLogSet.timeRange(0.0, 10.0)) == 0
+        del flightLogSet
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    test_reader_round_trip()
+    test_partial_record_ignored()
+    test_mismatched_header_rejected()
+    test_flight_set_time_range()
+    print("All flight log tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,25 +13,48 @@ from kivy.uix.gridlayout import GridLayout
 import datetime
 import pynmea2
 import serial
-import threading
-import time
 
 # Custom imports
 import FileUtilities
 from BalloonCommands import *
 from CommandPacket import *
+from CommandScheduler import *
+from CommandServer import *
 from DataPacket import *
+from FlightLog import *
+from KissDeframer import *
 from KML import *
+from Pipeline import *
+from StationIO import *
+from TelemetryLogger import *
+from TrackStore import *
+from UIUpdater import *
 
-from functools import partial
+BALLOON_POSITION_1 = "balloon_position_1"
+BALLOON_POSITION_2 = "balloon_position_2"
+VEHICLE_POSITION = "vehicle_position"
+
+# Panels of the user interface, each updated with its own snapshots
+GPS1_PANEL = "GPS1"
+GPS2_PANEL = "GPS2"
+GPS3_PANEL = "GPS3"
+SENSOR_PANEL = "sensors"
 
 
 class GroundStation(GridLayout):
 
     _GPS_port = None
     _radio_port = None
-    _radio_port_lock = threading.Lock()
-    _communication_stop = threading.Event()
+
+    # Event loop handling the serial ports (see StationIO.py)
+    _station_io = None
+
+    # Sends the commands to the payload until they are acknowledged (see CommandScheduler.py)
+    _command_scheduler = None
+
+    # Stages processing the received telemetry (see Pipeline.py)
+    _pipeline = None
+    _decode_stage = None
 
     # Variables for saving the data recorded with this application
     _balloon_position_1_filepath = ""
@@ -39,6 +62,16 @@ class GroundStation(GridLayout):
     _vehicle_position_filepath = ""
     _data_filepath = ""
 
+    # Loggers for the received data packets (CSV and binary)
+    _telemetry_logger = None
+    _flight_log = None
+
+    # Position tracks, held in memory and saved to the KML files periodically
+    _track_store = None
+
+    # Applies the latest values of each panel at a capped rate (see UIUpdater.py)
+    _ui_updater = None
+
     kv_GPS1_latitude = StringProperty()
     kv_GPS1_longitude = StringProperty()
     kv_GPS1_altitude = StringProperty()
@@ -83,16 +116,50 @@ class GroundStation(GridLayout):
 
         # Create the file paths for the various data logging files
         self._data_filepath = FileUtilities.build_data_filepath()
-        self._balloon_position_1_filepath = FileUtilities.getKMLpath("balloon_position_1", ABSOLUTE, self._data_filepath[-16:-4])
-        self._balloon_position_2_filepath = FileUtilities.getKMLpath("balloon_position_2", ABSOLUTE, self._data_filepath[-16:-4])
-        self._vehicle_position_filepath = FileUtilities.getKMLpath("vehicle_position", ABSOLUTE, self._data_filepath[-16:-4])
+        self._balloon_position_1_filepath = FileUtilities.getKMLpath(BALLOON_POSITION_1, ABSOLUTE, self._data_filepath[-16:-4])
+        self._balloon_position_2_filepath = FileUtilities.getKMLpath(BALLOON_POSITION_2, ABSOLUTE, self._data_filepath[-16:-4])
+        self._vehicle_position_filepath = FileUtilities.getKMLpath(VEHICLE_POSITION, ABSOLUTE, self._data_filepath[-16:-4])
+
+        self._telemetry_logger = TelemetryLogger(self._data_filepath)
+        self._flight_log = FlightLogWriter(getFlightLogPath(self._data_filepath))
+
+        self._track_store = TrackStore()
+        self._track_store.addTrack(BALLOON_POSITION_1, self._balloon_position_1_filepath, ABSOLUTE, TrackSimplifier())
+        self._track_store.addTrack(BALLOON_POSITION_2, self._balloon_position_2_filepath, ABSOLUTE, TrackSimplifier())
+        self._track_store.addTrack(VEHICLE_POSITION, self._vehicle_position_filepath, ABSOLUTE)
+        self._track_store.start()
+
+        self._ui_updater = UIUpdater(self, Clock.schedule_once)
+
+        self._station_io = StationIO()
+        self._station_io.start()
+        self._command_scheduler = CommandScheduler(self._station_io)
+        self._station_io.addServer(CommandServer(self.handle_command))
+
+        # Reception (the station I/O loop) never waits on the later stages.
+        # Logging and tracking never drop a decoded packet: when they fall
+        # behind they hold back decoding for as long as it takes, and the
+        # decode queue then drops its oldest frames (shown in the pipeline
+        # statistics). The user interface only needs the latest packet.
+        self._pipeline = Pipeline()
+        self._decode_stage = self._pipeline.addStage("decode", self.decode_radio_frame, 256, DROP_OLDEST)
+        log_stage = self._pipeline.addStage("log", self.log_data_packet, 1024, BLOCK, None)
+        track_stage = self._pipeline.addStage("track", self.track_data_packet, 1024, BLOCK, None)
+        ui_stage = self._pipeline.addStage("ui", self.show_data_packet, 1, DROP_OLDEST)
+
+        self._decode_stage.connect(log_stage)
+        self._decode_stage.connect(track_stage)
+        self._decode_stage.connect(ui_stage)
+        self._pipeline.start()
 
 
     def connect_to_radio(self):
         """
         Connects to the radio used to communicate with the payload while
-        in flight. This function also starts the thread to receive and process
-        balloon telemetry.
+        in flight. The frames received by the radio are passed to the
+        telemetry pipeline, starting with decode_radio_frame, and to
+        handle_ack_frame, which runs on the station I/O loop so that no
+        ACK is lost if the pipeline falls behind.
 
         :return: (None)
         """
@@ -100,150 +167,197 @@ class GroundStation(GridLayout):
             com_port = self.ids.radio_COM_port.text
             self._radio_port = serial.Serial(com_port, 1200, timeout=0.1)
 
-            telemetry_thread = threading.Thread(target=self.telemetry_receiving_thread)
-            telemetry_thread.start()
+            self._station_io.addConsumer(RADIO, self.handle_ack_frame)
+            self._station_io.addConsumer(RADIO, self._decode_stage.put)
+            self._station_io.addPort(RADIO, self._radio_port, KissDeframer())
 
 
-    def telemetry_receiving_thread(self):
+    def decode_radio_frame(self, kissString):
         """
-        This thread is responsible for receiving and processing all of the 
-        telemetry that comes down from the balloon payload.
+        Decodes and validates a KISS frame received from the balloon
+        payload (decode stage of the telemetry pipeline). Data packets open
+        a listening window for the command scheduler; ACKs are left to
+        handle_ack_frame.
 
-        :return: (None)
+        :param kissString: (bytes) Complete KISS frame, including its FENDs
+
+        :return: (DataPacket) Decoded packet, or None if the frame is not a valid data packet
         """
-        while True:
-            if self._communication_stop.is_set():
-                break
-
-            # Check is any new data is available at the serial port for the radio
-            kissString = bytes()
-            self._radio_port_lock.acquire()
-            radioBytes = self._radio_port.read(1000)
-            self._radio_port_lock.release()
-            while radioBytes:
-
-                kissString += radioBytes
-                self._radio_port_lock.acquire()
-                radioBytes = self._radio_port.read(1000)
-                self._radio_port_lock.release()
-                time.sleep(0.01)
-
-            if len(kissString) > 0:
-                print("Length of received packet: " + str(len(kissString)))
-                print(kissString.hex())
-
-            if len(kissString) < 3:
-                continue
-
-            if kissString:
-                if isDataPacket(kissString):
-                    dataPacket = DataPacket()
-                    packetDecoded = dataPacket.decode(kissString)
-                    if packetDecoded:
-                        print(dataPacket)
-
-                        Clock.schedule_once(partial(self.update_balloon_telemetry, dataPacket))
-                        FileUtilities.saveDataPacket(dataPacket, self._data_filepath)
-
-                        # Save the position data for the sensor computer to the KML file
-                        latitude = dataPacket.getLatitude1()
-                        longitude = dataPacket.getLongitude1()
-                        altitude = dataPacket.getAltitude1() / 3.28084
-                        updateKMLFile(self._balloon_position_1_filepath, latitude, longitude, altitude)
-
-                        # Save the position data for the communication computer to the KML file 
-                        latitude = dataPacket.getLatitude2()
-                        longitude = dataPacket.getLongitude2()
-                        altitude = dataPacket.getAltitude2() / 3.28084
-                        updateKMLFile(self._balloon_position_2_filepath, latitude, longitude, altitude)
-                
-
-            #     elif isAckPacket(kissString):
-            #         commandPacket = CommandPacket()
-            #         properDecoding = commandPacket.decode(kissString)
-
-            #         if properDecoding:
-            #             print("Command Received!")
-            #         else:
-            #             print("Improper response to command")
-            #     else:
-            #         pass
+        print("Length of received packet: " + str(len(kissString)))
+        print(kissString.hex())
 
+        if len(kissString) < 3:
+            return None
 
-    def connect_to_GPS(self):
+        if isDataPacket(kissString):
+            dataPacket = DataPacket()
+            packetDecoded = dataPacket.decode(kissString)
+            if packetDecoded:
+                self._command_scheduler.onDataPacket()
+                print(dataPacket)
+                return dataPacket
+
+        return None
+
+
+    def handle_ack_frame(self, kissString):
         """
-        Connects to the vehicle tracking GPS and starts the vehicle tracking thread.
+        Passes an ACK received from the balloon payload on to the command
+        scheduler. Runs on the station I/O loop, ahead of the telemetry
+        pipeline, and ignores every other kind of frame.
+
+        :param kissString: (bytes) Complete KISS frame, including its FENDs
 
         :return: (None)
         """
-        if self._GPS_port is None:
-            com_port = self.ids.GPS_COM_port.text
-            self._GPS_port = serial.Serial(com_port, 4800, timeout=0.1)
+        if (len(kissString) < 3) or not isAckPacket(kissString):
+            return
+
+        ackPacket = CommandPacket()
+        properDecoding = ackPacket.decode(kissString)
 
-            tracking_thread = threading.Thread(target=self.vehicle_tracking_thread)
-            tracking_thread.start()
+        if properDecoding:
+            print("Command Received!")
+            self._command_scheduler.onAckPacket(ackPacket)
+        else:
+            print("Improper response to command")
 
 
-    def vehicle_tracking_thread(self):
+    def log_data_packet(self, dataPacket):
         """
-        Runs the vehicle tracking communication with the local GPS.
+        Saves a data packet to the CSV file and the binary flight log
+        (log stage of the telemetry pipeline).
+
+        :param dataPacket: (DataPacket) Decoded packet
 
         :return: (None)
         """
+        self._telemetry_logger.logPacket(dataPacket)
+        self._flight_log.logPacket(dataPacket)
 
-        while True:
-            if self._communication_stop.is_set():
-                break
 
-            # Read the current sring from the GPS to get the car's location
-            gpsSentence = ''
-            gpsBytes = self._GPS_port.read(1000)
-            while gpsBytes:
+    def track_data_packet(self, dataPacket):
+        """
+        Adds the positions in a data packet to the balloon tracks (track
+        stage of the telemetry pipeline).
+
+        :param dataPacket: (DataPacket) Decoded packet
+
+        :return: (None)
+        """
+
+        # Save the position data for the sensor computer to the KML file
+        latitude = dataPacket.getLatitude1()
+        longitude = dataPacket.getLongitude1()
+        altitude = dataPacket.getAltitude1() / 3.28084
+        self._track_store.addCoordinate(BALLOON_POSITION_1, latitude, longitude, altitude)
 
-                gpsSentence += gpsBytes.decode("utf-8")
-                gpsBytes = self._GPS_port.read(1000)
-                time.sleep(0.01)
+        # Save the position data for the communication computer to the KML file 
+        latitude = dataPacket.getLatitude2()
+        longitude = dataPacket.getLongitude2()
+        altitude = dataPacket.getAltitude2() / 3.28084
+        self._track_store.addCoordinate(BALLOON_POSITION_2, latitude, longitude, altitude)
 
-            if gpsSentence[0:6] == "$GPGGA":
-                sentences = gpsSentence.split('\r\n')
-                msg = pynmea2.parse(sentences[0])
 
-                latitude = msg.latitude
-                longitude = msg.longitude
-                altitude = msg.altitude
-                timestamp = datetime.now()
-                Clock.schedule_once(partial(self.update_tracking_vehicle_GPS, latitude, longitude, altitude, timestamp))
-                updateKMLFile(self._vehicle_position_filepath, msg.latitude, msg.longitude, msg.altitude)
+    def show_data_packet(self, dataPacket):
+        """
+        Shows a data packet on the user interface (UI stage of the
+        telemetry pipeline). The values are formatted here, and the user
+        interface is updated with the latest of them at a capped rate.
 
+        :param dataPacket: (DataPacket) Decoded packet
 
-    def update_balloon_telemetry(self, packet, dt=0):
+        :return: (None)
         """
-        Updates the displays on the user interface with the latest 
-        telemetry data from the balloon payload.
+        self._ui_updater.post(GPS1_PANEL, {
+            "kv_GPS1_latitude" : '{:.6f}'.format(dataPacket.getLatitude1()),
+            "kv_GPS1_longitude" : '{:.6f}'.format(dataPacket.getLongitude1()),
+            "kv_GPS1_altitude" : '{:.1f}'.format(dataPacket.getAltitude1()),
+            "kv_GPS1_time" : dataPacket.getGpsTime1().strftime("%H:%M:%S")
+        })
+
+        self._ui_updater.post(GPS2_PANEL, {
+            "kv_GPS2_latitude" : '{:.6f}'.format(dataPacket.getLatitude2()),
+            "kv_GPS2_longitude" : '{:.6f}'.format(dataPacket.getLongitude2()),
+            "kv_GPS2_altitude" : '{:.1f}'.format(dataPacket.getAltitude2()),
+            "kv_GPS2_time" : dataPacket.getGpsTime2().strftime("%H:%M:%S")
+        })
+
+        self._ui_updater.post(SENSOR_PANEL, {
+            "kv_interior_temp_1" : '{:.1f}'.format(dataPacket.getInteriorTemperature1()),
+            "kv_interior_temp_2" : '{:.1f}'.format(dataPacket.getInteriorTemperature2()),
+            "kv_interior_temp_3" : '{:.1f}'.format(dataPacket.getInteriorTemperature3()),
+            "kv_exterior_temp" : '{:.1f}'.format(dataPacket.getExteriorTemperature()),
+            "kv_pressure" : '{:.2f}'.format(dataPacket.getPressure()),
+            "kv_humidity" : '{:.1f}'.format(dataPacket.getHumidity())
+        })
 
-        :param packet: (DataPacket) Packet of received data
+
+    def connect_to_GPS(self):
+        """
+        Connects to the vehicle tracking GPS. The sentences received from
+        the GPS are handled by handle_GPS_sentence, on the station I/O loop.
 
         :return: (None)
         """
-        self.kv_GPS2_latitude = '{:.6f}'.format(packet.getLatitude2())
-        self.kv_GPS2_longitude = '{:.6f}'.format(packet.getLongitude2())
-        self.kv_GPS2_altitude = '{:.1f}'.format(packet.getAltitude2())
+        if self._GPS_port is None:
+            com_port = self.ids.GPS_COM_port.text
+            self._GPS_port = serial.Serial(com_port, 4800, timeout=0.1)
+
+            self._station_io.addConsumer(GPS, self.handle_GPS_sentence)
+            self._station_io.addPort(GPS, self._GPS_port, NMEASplitter())
 
 
-    def update_tracking_vehicle_GPS(self, latitude, longitude, altitude, timestamp, dt=0):
+    def handle_GPS_sentence(self, gpsSentence):
         """
-        Updates the vehicle tracking information on the user interface.
+        Processes an NMEA sentence received from the vehicle tracking GPS,
+        using the fixes to track the car's location. Sentences without a
+        fix are ignored.
 
-        :param latitude: (float) Current latitude
-        :param longitude: (float) Current longitude
-        :param altitude: (float) Current altitude
+        :param gpsSentence: (string) Complete NMEA sentence
 
         :return: (None)
         """
-        self.kv_GPS3_latitude = '{:.6f}'.format(latitude)
-        self.kv_GPS3_longitude = '{:.6f}'.format(longitude)
-        self.kv_GPS3_altitude = '{:.1f}'.format(altitude * 3.28084)
-        self.kv_GPS3_time = timestamp.strftime("%H:%M:%S")
+        if gpsSentence[0:6] == "$GPGGA":
+            msg = pynmea2.parse(gpsSentence)
+
+            # The GPS sends sentences without a position until it has a fix
+            if (not msg.gps_qual) or (msg.altitude is None):
+                return
+
+            self._ui_updater.post(GPS3_PANEL, {
+                "kv_GPS3_latitude" : '{:.6f}'.format(msg.latitude),
+                "kv_GPS3_longitude" : '{:.6f}'.format(msg.longitude),
+                "kv_GPS3_altitude" : '{:.1f}'.format(msg.altitude * 3.28084),
+                "kv_GPS3_time" : datetime.now().strftime("%H:%M:%S")
+            })
+            self._track_store.addCoordinate(VEHICLE_POSITION, msg.latitude, msg.longitude, msg.altitude)
+
+
+    def handle_command(self, command):
+        """
+        Sends a command submitted to the command server (for example, by
+        BalloonCommands.getCommands) to the balloon payload, retransmitting
+        it until it is acknowledged.
+
+        :param command: (string) Valid command, as typed by the user
+
+        :return: (concurrent.futures.Future) Resolves to whether the command was acknowledged
+        """
+        commandString, commandValue = getCommandArguments(command)
+        return self._command_scheduler.submit(commandString, commandValue)
+
+
+    def send_command(self, commandPacket):
+        """
+        Sends a command to the balloon payload through the radio once,
+        without waiting for an ACK. This may be called from any thread.
+
+        :param commandPacket: (CommandPacket) Command to send
+
+        :return: (concurrent.futures.Future) Completes once the command is written
+        """
+        return self._station_io.send(RADIO, commandPacket.getKISS())
 
 
     def on_stop(self):
@@ -252,7 +366,10 @@ class GroundStation(GridLayout):
 
         :return: (None)
         """
-        self._communication_stop.set()
+        self._station_io.stop()
+        self._pipeline.stop()
+        print(self._pipeline.formatStats())
+        print("UI snapshots: {posted} posted, {applied} applied, {replaced} replaced".format(**self._ui_updater.getStats()))
 
         if not self._GPS_port is None:
             self._GPS_port.close()
@@ -260,6 +377,10 @@ class GroundStation(GridLayout):
         if not self._radio_port is None:
             self._radio_port.close()
 
+        self._telemetry_logger.close()
+        self._flight_log.close()
+        self._track_store.close()
+
 
 
 class GroundStationApp(App):
@@ -304,9 +425,7 @@ def isAckPacket(kissString):
 
     :return: (boolean)
     """
-
-    packetType = struct.unpack('B', kissString[2])[0]
-    return kissString and (packetType == ACK)
+    return kissString and (kissString[2] == ACK)
 
 
 
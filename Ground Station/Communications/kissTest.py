@@ -0,0 +1,120 @@
+"""
+kissTest.py
+
+Checks the KISS escaping in Packet.py against the original byte-by-byte
+algorithm. Run directly, or with pytest.
+"""
+
+import random
+
+from Packet import *
+
+# Random buffers checked against the original algorithm
+NUM_BUFFERS = 2000
+
+
+def legacyEscapeValues(data):
+    """
+    Escapes the FEND and FESC values one byte at a time, as the original
+    ground station code did.
+
+    :param data: (bytes) Original byte string
+
+    :return: (bytes) Byte string with escaped values
+    """
+    newBytes = bytes()
+    for b in data:
+        if b == ord(FEND):
+            newBytes += (FESC + TFEND)
+        elif b == ord(FESC):
+            newBytes += (FESC + TFESC)
+        else:
+            newBytes += bytes([b])
+
+    return newBytes
+
+
+def legacyDescapeValues(data):
+    """
+    De-escapes the FEND and FESC values one byte at a time, as the
+    original ground station code did.
+
+    :param data: (bytes) Byte string with escaped values
+
+    :return: (bytes) Byte string with de-escaped values
+    """
+    numBytes = len(data)
+    newBytes = bytes()
+    i = 0
+    while (i < numBytes):
+
+        b = data[i]
+        if (b == ord(FESC)) and (i != numBytes - 1):
+            if data[i+1] == ord(TFEND):
+                newBytes += FEND
+                i += 1
+
+            elif data[i+1] == ord(TFESC):
+                newBytes += FESC
+                i += 1
+
+            else:
+                newBytes += bytes([b])
+        else:
+            newBytes += bytes([b])
+
+        i += 1
+
+    return newBytes
+
+
+def makeBuffers():
+    """
+    Makes random buffers, mostly of the bytes which take part in escaping,
+    so that every combination of them turns up.
+
+    :return: (list) Random byte strings
+    """
+    random.seed(1)
+    alphabet = [FEND[0], FESC[0], TFEND[0], TFESC[0], 0x00, 0x41]
+    return [bytes(random.choice(alphabet) for i in range(random.randint(0, 16)))
+            for n in range(NUM_BUFFERS)]
+
+
+def test_escape_matches_legacy():
+    for data in makeBuffers():
+        assert escapeValues(data) == legacyEscapeValues(data)
+
+
+def test_descape_matches_legacy():
+    # Includes lone FESCs, trailing FESCs and FESCs before other bytes
+    for data in makeBuffers():
+        assert descapeValues(data) == legacyDescapeValues(data)
+
+
+def test_round_trip():
+    for data in makeBuffers():
+        escaped = escapeValues(data)
+        assert not FEND in escaped
+        assert descapeValues(escaped) == data
+
+
+def test_descaper_matches_whole_buffer():
+    # Every way of splitting a buffer in two, including inside an escape sequence
+    for data in makeBuffers()[:200]:
+        for split in range(len(data) + 1):
+            descaper = KissDescaper()
+            result = descaper.feed(data[:split]) + descaper.feed(data[split:]) + descaper.flush()
+            assert result == descapeValues(data)
+
+
+def main():
+    test_escape_matches_legacy()
+    test_descape_matches_legacy()
+    test_round_trip()
+    test_descaper_matches_whole_buffer()
+    print("All KISS escaping tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,6 @@ balloon payload and a GPS unit mounted inside the tracking vehicle.
 
 import os
 import sys
-import time
 import serial
 import datetime
 import pynmea2
@@ -15,7 +14,16 @@ import pynmea2
 from BalloonCommands import *
 from DataPacket import *
 from CommandPacket import *
+from CommandScheduler import *
+from CommandServer import *
+from KissDeframer import *
 from KML import *
+from StationIO import *
+from TelemetryLogger import *
+from TrackStore import *
+
+BALLOON_POSITION = "balloon_position"
+CAR_POSITION = "car_position"
 
 GPS_COM_PORT = "COM10"
 RADIO_COM_PORT = "COM9"
@@ -24,7 +32,9 @@ DATA_DIRECTORY = "../Data"
 
 def main():
     """
-    Runs the main program to receive data and GPS packets.
+    Runs the main program to receive data and GPS packets, and to send
+    the commands submitted by BalloonCommands.getCommands. Everything is
+    handled on the station I/O loop as it arrives.
 
     :return: (None)
     """
@@ -48,88 +58,101 @@ def main():
         dataFilename += str(fileIndex).zfill(2) + '.csv'
         dataPath = os.path.join(DATA_DIRECTORY, dataFilename)
 
-    # Set up the KML file for tracking the payload
-    kmlPath = getKMLpath("balloon_position", ABSOLUTE, dataFilename[13:25])
+    telemetryLogger = TelemetryLogger(dataPath)
 
-    # Set up the KML file for tracking the car
-    carKMLpath = getKMLpath("car_position", CLAMPED_TO_GROUND, dataFilename[13:25])
+    # Set up the KML files for tracking the payload and the car. The
+    # tracks are held in memory, and saved to the files in the background
+    trackStore = TrackStore()
+    trackStore.addTrack(BALLOON_POSITION, getKMLpath(BALLOON_POSITION, ABSOLUTE, dataFilename[13:25]), ABSOLUTE)
+    trackStore.addTrack(CAR_POSITION, getKMLpath(CAR_POSITION, CLAMPED_TO_GROUND, dataFilename[13:25]), CLAMPED_TO_GROUND)
+    trackStore.start()
 
-    # Get the most recent modification time of the command file
-    commandModificationTime = os.path.getmtime(COMMAND_LOG_PATH)
+    stationIO = StationIO()
+    commandScheduler = CommandScheduler(stationIO)
 
-    while True:
+    def handleCommand(command):
+        """
+        Sends a command submitted to the command server to the payload,
+        retransmitting it until it is acknowledged.
 
-        # Check if we want to send a command to the balloon module
-        if os.path.getmtime(COMMAND_LOG_PATH) > commandModificationTime:
-            commandModificationTime = os.path.getmtime(COMMAND_LOG_PATH)
+        :param command: (string) Valid command, as typed by the user
 
-            fileHandle = open(COMMAND_LOG_PATH, 'r')
-            allCommands = fileHandle.readlines()
-            newCommand = allCommands[-1][0:-1]
+        :return: (concurrent.futures.Future) Resolves to whether the command was acknowledged
+        """
+        commandString, commandValue = getCommandArguments(command)
+        return commandScheduler.submit(commandString, commandValue)
 
-            if newCommand != ' ':
-                tokens = newCommand.split(' ')
-                commandString = tokens[0]
+    def handleGPSSentence(gpsSentence):
+        """
+        Tracks the car's location with each fix from the GPS.
 
-                if len(tokens) == 2:
-                    commandValue = int(tokens[1])
-                else:
-                    commandValue = 0
-                commandPacket = CommandPacket(commandString, commandValue)
-                radio.write(commandPacket.getKISS())
-                time.sleep(1)
+        :param gpsSentence: (string) Complete NMEA sentence
 
-        # Read the current sring from the GPS to get the car's location
-        gpsSentence = ''
-        gpsBytes = gps.read(1000)
-        while gpsBytes:
+        :return: (None)
+        """
+        if gpsSentence[0:6] == "$GPGGA":
+            msg = pynmea2.parse(gpsSentence)
 
-            gpsSentence += gpsBytes
-            gpsBytes = gps.read(1000)
-            time.sleep(0.01)
+            # The GPS sends sentences without a position until it has a fix
+            if (not msg.gps_qual) or (msg.altitude is None):
+                return
 
-        if gpsSentence[0:6] == "$GPGGA":
-            sentences = gpsSentence.split('\r\n')
-            msg = pynmea2.parse(sentences[0])
-            updateKMLFile(carKMLpath, msg.latitude, msg.longitude, msg.altitude)
+            trackStore.addCoordinate(CAR_POSITION, msg.latitude, msg.longitude, msg.altitude)
 
-        # Check is any new data is available at the serial port for the radio
-        kissString = b''
-        radioBytes = radio.read(1000)
-        while radioBytes:
+    def handleRadioFrame(kissString):
+        """
+        Handles a complete frame received by the radio.
 
-            kissString += radioBytes
-            radioBytes = radio.read(1000)
-            time.sleep(0.01)
+        :param kissString: (bytes) Complete KISS frame, including its FENDs
 
+        :return: (None)
+        """
         if len(kissString) < 3:
-            continue
-
-        if kissString:
-            if isDataPacket(kissString):
-                dataPacket = DataPacket()
-                dataPacket.decode(kissString)
-                print(dataPacket)
-
-                saveDataPacket(dataPacket, dataPath)
-                latitude = dataPacket.getLatitude()
-                longitude = dataPacket.getLongitude()
-                altitude = dataPacket.getAltitude() / 3.28084
-                updateKMLFile(kmlPath, latitude, longitude, altitude)
-
-            
-            elif isAckPacket(kissString):
-                commandPacket = CommandPacket()
-                properDecoding = commandPacket.decode(kissString)
-
-                if properDecoding:
-                    print("Command Received!")
-                else:
-                    print("Improper response to command")
-            else:
-                pass
+            return
+
+        if isDataPacket(kissString):
+            dataPacket = DataPacket()
+            if not dataPacket.decode(kissString):
+                return
 
-        time.sleep(0.5)
+            commandScheduler.onDataPacket()
+            print(dataPacket)
+
+            telemetryLogger.logPacket(dataPacket)
+            latitude = dataPacket.getLatitude1()
+            longitude = dataPacket.getLongitude1()
+            altitude = dataPacket.getAltitude1() / 3.28084
+            trackStore.addCoordinate(BALLOON_POSITION, latitude, longitude, altitude)
+
+        elif isAckPacket(kissString):
+            ackPacket = CommandPacket()
+            properDecoding = ackPacket.decode(kissString)
+
+            if properDecoding:
+                print("Command Received!")
+                commandScheduler.onAckPacket(ackPacket)
+            else:
+                print("Improper response to command")
+        else:
+            pass
+
+    stationIO.addConsumer(GPS, handleGPSSentence)
+    stationIO.addPort(GPS, gps, NMEASplitter())
+    stationIO.addConsumer(RADIO, handleRadioFrame)
+    stationIO.addPort(RADIO, radio, KissDeframer())
+    stationIO.start()
+    stationIO.addServer(CommandServer(handleCommand))
+
+    try:
+        stationIO.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stationIO.stop()
+        telemetryLogger.close()
+        trackStore.close()
+        gps.close()
+        radio.close()
 
 
 def getKMLpath(name, altitudeMode, indexString):
@@ -163,9 +186,7 @@ def isDataPacket(kissString):
 
     :return: (boolean)
     """
-    
-    packetType = struct.unpack('B', kissString[2])[0]
-    return kissString and (packetType == DATA)
+    return kissString and (kissString[2] == DATA)
 
 
 def isAckPacket(kissString):
@@ -176,104 +197,7 @@ def isAckPacket(kissString):
 
     :return: (boolean)
     """
-
-    packetType = struct.unpack('B', kissString[2])[0]
-    return kissString and (packetType == ACK)
-
-
-def saveDataPacket(packet, filename):
-    """
-    Saves a data packet to a CSV file. The filename is given.
-
-    :param packet: (DataPacket) Packet to save to the file
-    :param filename: (string) Name of the file to save the data to
-
-    :return: (None)
-    """
-
-    fileHandle = open(filename, 'a')
-    fileSize = os.path.getsize(filename)
-    fileEmpty = (fileSize == 0)
-
-    if fileEmpty:
-
-        fileHandle.write("Interior Temperature 1, ")
-        fileHandle.write("Interior Temperature 2, ")
-        fileHandle.write("Interior Temperature 3, ")
-        fileHandle.write("Exterior Temperature, ")
-
-        fileHandle.write("Pressure, ")
-        fileHandle.write("Humidity, ")
-
-        fileHandle.write("GPS Time, ")
-        fileHandle.write("Altitude, ")
-
-        fileHandle.write("Latitude, ")
-        fileHandle.write("Longitude, ")
-
-        fileHandle.write("Number of GPS Satellites, ")
-
-        fileHandle.write("Acceleration (x), ")
-        fileHandle.write("Acceleration (y), ")
-        fileHandle.write("Acceleration (z), ")
-
-        fileHandle.write("Rotation Rate (x), ")
-        fileHandle.write("Rotation Rate (y), ")
-        fileHandle.write("Rotation Rate (z), ")
-
-        fileHandle.write("Magnetic Field (x), ")
-        fileHandle.write("Magnetic Field (y), ")
-        fileHandle.write("Magnetic Field (z), ")
-
-        fileHandle.write("Pitch, ")
-        fileHandle.write("Roll, ")
-        fileHandle.write("Yaw, ")
-
-        fileHandle.write("Time Since Reset, ")
-        fileHandle.write("Data Logging Status, ")
-        fileHandle.write("Data Filename, ")
-        fileHandle.write("Data Age, ")
-        fileHandle.write("Relay States")
-        fileHandle.write('\n')
-
-
-    fileHandle.write(str(packet.getInteriorTemperature1()) + ', ')
-    fileHandle.write(str(packet.getInteriorTemperature2()) + ', ')
-    fileHandle.write(str(packet.getInteriorTemperature3()) + ', ')
-    fileHandle.write(str(packet.getExteriorTemperature()) + ', ')
-
-    fileHandle.write(str(packet.getPressure()) + ', ')
-    fileHandle.write(str(packet.getHumidity()) + ', ')
-
-    fileHandle.write(str(packet.getGpsTime()) + ', ')
-    fileHandle.write(str(packet.getAltitude()) + ', ')
-
-    fileHandle.write(str(packet.getLatitude()) + ', ')
-    fileHandle.write(str(packet.getLongitude()) + ', ')
-    fileHandle.write(str(packet.getNumSatellites()) + ', ')
-
-    ax, ay, az = packet.getAcceleration()
-    gx, gy, gz = packet.getRates()
-    mx, my, mz = packet.getMagneticReading()
-
-    fileHandle.write(str(ax) +', ' + str(ay) + ', ' + str(az) + ', ')
-    fileHandle.write(str(gx) +', ' + str(gy) + ', ' + str(gz) + ', ')
-    fileHandle.write(str(mx) +', ' + str(my) + ', ' + str(mz) + ', ')
-
-    pitch, roll, yaw = packet.getAttitude()
-    fileHandle.write(str(pitch) + ', ')
-    fileHandle.write(str(roll) + ', ')
-    fileHandle.write(str(yaw) + ', ')
-
-    fileHandle.write(str(packet.getResetTime()) + ', ')
-    fileHandle.write(str(packet.getDataLoggingStatus()) + ', ')
-    fileHandle.write(str(packet.getFilename()) + ', ')
-    fileHandle.write(str(packet.getDataAge()) + ', ')
-    fileHandle.write(str(packet.getRelayStates()))
-    fileHandle.write('\n')
-
-    fileHandle.close()
-
+    return kissString and (kissString[2] == ACK)
 
 
 if __name__ == '__main__':
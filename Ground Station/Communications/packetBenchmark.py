@@ -0,0 +1,81 @@
+"""
+packetBenchmark.py
+
+Times the encoding and decoding of data packet values, comparing the
+compiled struct codec against packing and unpacking one field at a time.
+"""
+
+import timeit
+
+from DataPacket import *
+
+NUM_ITERATIONS = 20000
+
+
+def legacyGetBytes(packet):
+    """
+    Encodes the packet's values one field at a time.
+
+    :param packet: (Packet) Packet to encode
+
+    :return: (bytes) Byte string of the packet's values
+    """
+    dataBytes = b''
+    for i, value in enumerate(packet.values):
+        dataBytes += struct.pack(packet.types[i], value)
+
+    return dataBytes
+
+
+def legacyDecode(packet, dataBytes):
+    """
+    Decodes the packet's values one field at a time.
+
+    :param packet: (Packet) Packet describing the value types
+    :param dataBytes: (bytes) Byte string of the packet's values
+
+    :return: (list) Decoded values
+    """
+    byteIndex = 0
+    values = []
+    for t in packet.types:
+        valueBytes = dataBytes[byteIndex:byteIndex + WIDTHS[t]]
+        values.append(struct.unpack(t, valueBytes)[0])
+        byteIndex += WIDTHS[t]
+
+    return values
+
+
+def main():
+
+    packet = DataPacket()
+    packet.values[BATTERY_VOLTAGE] = 11.38
+    packet.values[INTERIOR_TEMPERATURE_1] = 12.345
+    packet.values[EXTERIOR_TEMPERATURE] = -123.5
+    packet.values[BAROMETRIC_PRESSURE] = 101325.0
+    packet.values[LATITUDE_1] = 461234567
+    packet.values[LONGITUDE_1] = -1181234567
+    packet.values[ALTITUDE_1] = 3048000
+    packet.values[RELAY_STATES] = 0b0101
+
+    dataBytes = packet.getBytes()
+    assert(dataBytes == legacyGetBytes(packet))
+    assert(packet.getCodec().unpack(dataBytes) == tuple(legacyDecode(packet, dataBytes)))
+
+    def legacyRoundTrip():
+        legacyDecode(packet, legacyGetBytes(packet))
+
+    def compiledRoundTrip():
+        list(packet.getCodec().unpack(packet.getBytes()))
+
+    legacyTime = timeit.timeit(legacyRoundTrip, number=NUM_ITERATIONS)
+    compiledTime = timeit.timeit(compiledRoundTrip, number=NUM_ITERATIONS)
+
+    print("Round trips:         " + str(NUM_ITERATIONS))
+    print("Per-field (us/trip): " + "{0:.2f}".format(1e6 * legacyTime / NUM_ITERATIONS))
+    print("Compiled (us/trip):  " + "{0:.2f}".format(1e6 * compiledTime / NUM_ITERATIONS))
+    print("Speedup:             " + "{0:.1f}".format(legacyTime / compiledTime) + "x")
+
+
+if __name__ == '__main__':
+    main()
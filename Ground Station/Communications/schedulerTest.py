@@ -0,0 +1,233 @@
+"""
+schedulerTest.py
+
+Checks the CommandScheduler's timing against a simulated clock, without
+a radio or a running event loop. Run directly, or with pytest.
+"""
+
+from BalloonCommands import *
+from CommandScheduler import *
+
+# Most timers fired by one advance, so that a busy loop fails instead of hanging
+MAX_WAKE_UPS = 10000
+
+
+class FakeTimer(object):
+
+    def __init__(self, when, callback):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeLoop(object):
+
+    def __init__(self):
+        """
+        Event loop whose clock only moves when the test advances it.
+        Callbacks from other threads run immediately.
+        """
+        self.now = 1000.0
+        self.timers = []
+        self.wakeUps = 0
+
+    def time(self):
+        return self.now
+
+    def call_at(self, when, callback):
+        timer = FakeTimer(when, callback)
+        self.timers.append(timer)
+        return timer
+
+    def call_soon_threadsafe(self, callback, *args):
+        callback(*args)
+
+    def advance(self, seconds):
+        """
+        Moves the clock forward, firing each timer when its time comes.
+
+        :param seconds: (float) Time to move forward by
+
+        :return: (None)
+        """
+        end = self.now + seconds
+        while True:
+            self.timers = [timer for timer in self.timers if not timer.cancelled]
+            if not self.timers:
+                break
+
+            timer = min(self.timers, key=lambda timer: timer.when)
+            if timer.when > end:
+                break
+
+            self.timers.remove(timer)
+            self.now = max(self.now, timer.when)
+            self.wakeUps += 1
+            assert self.wakeUps < MAX_WAKE_UPS, "scheduler is busy looping"
+            timer.callback()
+
+        self.now = end
+
+
+class FakeStationIO(object):
+
+    def __init__(self):
+        self.loop = FakeLoop()
+        self.sent = []
+
+    def send(self, name, data):
+        self.sent.append((self.loop.now, data))
+
+
+def makeScheduler(**kwargs):
+    stationIO = FakeStationIO()
+    return stationIO, CommandScheduler(stationIO, **kwargs)
+
+
+def test_nothing_sent_outside_window():
+    stationIO, scheduler = makeScheduler()
+
+    # Data packets every 10 s, each opening a 2 s window
+    scheduler.onDataPacket()
+    stationIO.loop.advance(3.0)
+    scheduler.submit(RADIO_TEST)
+    stationIO.loop.advance(6.9)
+    assert stationIO.sent == []
+
+    windowStarts = [stationIO.loop.now]
+    scheduler.onDataPacket()
+    assert len(stationIO.sent) == 1
+
+    for i in range(20):
+        stationIO.loop.advance(10.0)
+        windowStarts.append(stationIO.loop.now)
+        scheduler.onDataPacket()
+
+    # Every retransmission went out in a window
+    assert len(stationIO.sent) == MAX_ATTEMPTS
+    for sendTime, data in stationIO.sent:
+        assert any(start <= sendTime < start + LISTENING_WINDOW for start in windowStarts)
+
+
+def test_backoff_schedule():
+    stationIO, scheduler = makeScheduler()
+
+    # No data packets, so every transmission goes out when it is due
+    future = scheduler.submit(CUTDOWN)
+    stationIO.loop.advance(1000.0)
+
+    sendTimes = [sendTime - 1000.0 for sendTime, data in stationIO.sent]
+    assert sendTimes == [0.0, 5.0, 15.0, 35.0, 75.0, 135.0]
+    assert future.result(0) is False
+    assert scheduler.getNumPending() == 0
+
+
+def test_wake_ups_bounded_while_not_listening():
+    stationIO, scheduler = makeScheduler()
+
+    # The window has closed, and one command is waiting for the next
+    scheduler.onDataPacket()
+    stationIO.loop.advance(LISTENING_WINDOW + 0.1)
+    scheduler.submit(RADIO_TEST)
+    stationIO.loop.wakeUps = 0
+    stationIO.loop.advance(SILENCE_TIMEOUT - LISTENING_WINDOW - 1.0)
+    assert stationIO.loop.wakeUps <= 1
+    assert stationIO.sent == []
+
+
+def test_wake_ups_bounded_with_full_window():
+    stationIO, scheduler = makeScheduler()
+
+    # More commands than fit in one window
+    scheduler.onDataPacket()
+    stationIO.loop.advance(LISTENING_WINDOW + 0.1)
+    for relay in range(20):
+        scheduler.submit(SWITCH_RELAYS, relay)
+
+    stationIO.loop.wakeUps = 0
+    scheduler.onDataPacket()
+    stationIO.loop.advance(9.0)
+    assert len(stationIO.sent) == 1
+    assert len(stationIO.sent[0][1]) <= LISTENING_WINDOW * BYTES_PER_SECOND
+    assert stationIO.loop.wakeUps <= 1
+
+
+def test_resolved_before_client_timeout():
+    stationIO, scheduler = makeScheduler()
+
+    # Data packets every 29 s, just inside the silence timeout, so each
+    # transmission waits for the next window
+    resolveTimes = []
+    scheduler.onDataPacket()
+    stationIO.loop.advance(LISTENING_WINDOW + 0.1)
+    submitTime = stationIO.loop.now
+    future = scheduler.submit(CUTDOWN)
+    future.add_done_callback(lambda future: resolveTimes.append(stationIO.loop.now))
+
+    for i in range(100):
+        stationIO.loop.advance(29.0 - LISTENING_WINDOW - 0.1)
+        scheduler.onDataPacket()
+        stationIO.loop.advance(LISTENING_WINDOW + 0.1)
+
+    assert future.result(0) is False
+    assert len(stationIO.sent) == MAX_ATTEMPTS
+    assert resolveTimes[0] - submitTime <= getMaxCommandTime()
+    assert getMaxCommandTime() < COMMAND_TIMEOUT
+
+
+def test_ack_resolves_command():
+    stationIO, scheduler = makeScheduler()
+
+    # Without sequence numbers, the ACK echoes padding
+    future = scheduler.submit(SWITCH_RELAYS, 3)
+    ackPacket = CommandPacket(SWITCH_RELAYS, 3)
+    ackPacket.values[0] = ACK
+    scheduler.onAckPacket(ackPacket)
+    stationIO.loop.advance(1000.0)
+
+    assert future.result(0) is True
+    assert len(stationIO.sent) == 1
+    assert stationIO.sent[0][1] == CommandPacket(SWITCH_RELAYS, 3).getKISS()
+
+
+def test_ack_matches_sequence_number():
+    stationIO, scheduler = makeScheduler(sequenceNumbers=True)
+
+    # The second of two identical commands is acknowledged
+    firstFuture = scheduler.submit(SWITCH_RELAYS, 3)
+    secondFuture = scheduler.submit(SWITCH_RELAYS, 3)
+    ackPacket = CommandPacket(SWITCH_RELAYS, 3, 2)
+    ackPacket.values[0] = ACK
+    scheduler.onAckPacket(ackPacket)
+
+    assert secondFuture.result(0) is True
+    assert not firstFuture.done()
+    sentFrames = [data for sendTime, data in stationIO.sent]
+    assert sentFrames == [CommandPacket(SWITCH_RELAYS, 3, 1).getKISS(), CommandPacket(SWITCH_RELAYS, 3, 2).getKISS()]
+
+
+def test_invalid_command_fails_future():
+    stationIO, scheduler = makeScheduler()
+
+    future = scheduler.submit(CHANGE_TRANSMISSION_RATE, -1)
+    assert isinstance(future.exception(0), struct.error)
+    assert scheduler.getNumPending() == 0
+
+
+def main():
+    test_nothing_sent_outside_window()
+    test_backoff_schedule()
+    test_wake_ups_bounded_while_not_listening()
+    test_wake_ups_bounded_with_full_window()
+    test_resolved_before_client_timeout()
+    test_ack_resolves_command()
+    test_ack_matches_sequence_number()
+    test_invalid_command_fails_future()
+    print("All scheduler tests passed")
+
+
+if __name__ == '__main__':
+    main()
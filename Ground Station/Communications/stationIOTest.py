@@ -0,0 +1,195 @@
+"""
+stationIOTest.py
+
+Checks that StationIO passes the frames received by a port to its
+consumers, and sends bytes out of it, through both transports. The
+ReaderTransport is run on a pseudo terminal (POSIX only), and the
+ExecutorTransport on a fake port, so no serial hardware is needed. Run
+directly, or with pytest.
+"""
+
+import os
+import queue
+import struct
+import threading
+import time
+
+if os.name == 'posix':
+    import fcntl
+    import termios
+    import tty
+
+from KissDeframer import *
+from StationIO import *
+
+# Longest wait for the loop to pass on the bytes, in seconds
+WAIT_TIMEOUT = 5.0
+
+
+class PtyPort(object):
+
+    def __init__(self, fd):
+        """
+        Serial port stand-in for the terminal end of a pseudo terminal.
+        """
+        self.fd = fd
+        self.timeout = None
+
+    def fileno(self):
+        return self.fd
+
+    @property
+    def in_waiting(self):
+        return struct.unpack('I', fcntl.ioctl(self.fd, termios.FIONREAD, b'\x00' * 4))[0]
+
+    def read(self, size):
+        try:
+            return os.read(self.fd, size)
+        except BlockingIOError:
+            return b''
+
+
+class FakePort(object):
+
+    def __init__(self):
+        """
+        Serial port stand-in whose received bytes are put on a queue by
+        the test. A read waits up to the port's timeout for a chunk.
+        """
+        self.timeout = None
+        self.received = queue.Queue()
+        self.written = bytearray()
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def read(self, size):
+        try:
+            return self.received.get(timeout=self.timeout)
+        except queue.Empty:
+            return b''
+
+    def write(self, data):
+        self.written += data
+        return len(data)
+
+
+def makeFrames():
+    """
+    Makes KISS frames of several lengths, including escaped bytes.
+
+    :return: (list) Frames, including their FENDs
+    """
+    return [FEND + b'\x00' + escapeValues(bytes(range(length))) + FEND for length in [1, 10, 200, 255]]
+
+
+def waitFor(condition):
+    """
+    Waits until a condition holds, or WAIT_TIMEOUT passes.
+
+    :param condition: (function) Returns whether to stop waiting
+
+    :return: (boolean) Whether the condition holds
+    """
+    endTime = time.monotonic() + WAIT_TIMEOUT
+    while not condition():
+        if time.monotonic() > endTime:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_reader_transport_receives_frames():
+    if os.name != 'posix':
+        return
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    stationIO = StationIO()
+    try:
+        received = []
+        stationIO.start()
+        stationIO.addConsumer(RADIO, lambda frame: received.append(bytes(frame)))
+        port = PtyPort(slave)
+        stationIO.addPort(RADIO, port, KissDeframer(), ReaderTransport(port))
+
+        # The frames arrive in uneven pieces, as they do from the radio
+        frames = makeFrames()
+        data = b'noise' + b''.join(frames)
+        for start in range(0, len(data), 37):
+            os.write(master, data[start:start + 37])
+            time.sleep(0.001)
+
+        assert waitFor(lambda: len(received) == len(frames))
+        assert received == frames
+    finally:
+        stationIO.stop()
+        os.close(master)
+        os.close(slave)
+
+
+def test_reader_transport_sends_without_blocking():
+    if os.name != 'posix':
+        return
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    stationIO = StationIO()
+    try:
+        stationIO.start()
+        port = PtyPort(slave)
+        stationIO.addPort(RADIO, port, KissDeframer(), ReaderTransport(port))
+
+        # Far more than the terminal buffers, so the write waits for the reader
+        data = bytes(range(256)) * 800
+        sent = stationIO.send(RADIO, data)
+
+        # The loop keeps running while the write waits
+        ran = threading.Event()
+        stationIO.loop.call_soon_threadsafe(ran.set)
+        assert ran.wait(WAIT_TIMEOUT)
+        assert not sent.done()
+
+        received = bytearray()
+        while len(received) < len(data):
+            received += os.read(master, 65536)
+
+        sent.result(WAIT_TIMEOUT)
+        assert bytes(received) == data
+    finally:
+        stationIO.stop()
+        os.close(master)
+        os.close(slave)
+
+
+def test_executor_transport():
+    port = FakePort()
+    stationIO = StationIO()
+    try:
+        received = []
+        stationIO.start()
+        stationIO.addConsumer(GPS, received.append)
+        stationIO.addPort(GPS, port, NMEASplitter(), ExecutorTransport(port))
+
+        for chunk in [b'$GPGGA,1', b'23\r\n$GPRMC', b',456\r\n']:
+            port.received.put(chunk)
+
+        assert waitFor(lambda: len(received) == 2)
+        assert received == ['$GPGGA,123', '$GPRMC,456']
+
+        stationIO.send(GPS, b'$PMTK\r\n').result(WAIT_TIMEOUT)
+        assert bytes(port.written) == b'$PMTK\r\n'
+    finally:
+        stationIO.stop()
+
+
+def main():
+    test_reader_transport_receives_frames()
+    test_reader_transport_sends_without_blocking()
+    test_executor_transport()
+    print("All station I/O tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+telemetryLoaderTest.py
+
+Checks that loadTelemetryCSV parses the balloon_data_*.csv layouts into
+the right columns, skips broken rows, and only reuses its cache while
+the file is unchanged. Run directly, or with pytest.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from TelemetryLoader import *
+
+HEADER_2017 = ("Interior Temperature 1, Interior Temperature 2, Exterior Temperature, Pressure, "
+               "Humidity, GPS Time, Altitude, Ascent Rate, Latitude, Longitude, GPS Validity, "
+               "GPS Sentences, Failed GPS Sentences, Number of GPS Satellites, Acceleration (x), "
+               "Acceleration (y), Acceleration (z), Rotation Rate (x), Rotation Rate (y), "
+               "Rotation Rate (z), Magnetic Field (x), Magnetic Field (y), Magnetic Field (z), "
+               "Pitch, Roll, Yaw, Time Since Reset, Data Logging Status, Data Filename, Data Age, "
+               "Relay States\n")
+
+ROWS_2017 = [
+    # An ordinary row
+    "78.2375, 74.075, 81.5, 11.5758816345, 25.7689476013, 2017-08-21 09:00:27, 6784.120952, "
+    "5712.16056576, 44.337838333, -113.352318333, True, 30, 16, 5, 0.115838997066, "
+    "-0.077713996172, 0.999118983746, 0.965699970722, -0.821750044823, -0.14155998826, "
+    "0.521640002728, 0.0256200004369, -0.208039999008, -6.59366989136, -4.44765520096, "
+    "101.508209229, 154.95, True, DATA000.CSV, 5.581, (False, False, False, False)\n",
+
+    # No GPS fix, so the time was logged as a timedelta
+    "77.9, 74.1, 81.4, 11.57, 25.8, -1 day, 17:00:00, 0.0, 0.0, 0.0, 0.0, False, 31, 17, 0, "
+    "0.1, 0.0, 1.0, 0.9, -0.8, -0.1, 0.5, 0.02, -0.2, -6.6, -4.4, 101.5, 155.95, False, "
+    "DATA001.CSV, 6.5, (True, False, True, False)\n",
+
+    # A value which cannot be parsed
+    "77.9, 74.1, 81.4, 11.57, 25.8, 2017-08-21 09:00:29, oops, 0.0, 0.0, 0.0, False, 31, 17, 0, "
+    "0.1, 0.0, 1.0, 0.9, -0.8, -0.1, 0.5, 0.02, -0.2, -6.6, -4.4, 101.5, 155.95, False, "
+    "DATA001.CSV, 6.5, (True, False, True, False)\n",
+
+    # The last line, cut short by closing the program
+    "77.8, 74.0, 81.3, 11.56, 25.9, 2017-08-21 09:00:31, 6790.0"
+]
+
+
+def writeCSV(directory, text):
+    """
+    Writes a CSV file.
+
+    :param directory: (string) Directory to write the file to
+    :param text: (string) Contents of the file
+
+    :return: (string) Path of the file
+    """
+    path = os.path.join(directory, 'balloon_data_2017_0821_00.csv')
+    with open(path, 'w') as fileHandle:
+        fileHandle.write(text)
+    return path
+
+
+def test_parses_2017_layout():
+    directory = tempfile.mkdtemp()
+    try:
+        columns = loadTelemetryCSV(writeCSV(directory, HEADER_2017 + ''.join(ROWS_2017)), useCache=False)
+
+        assert list(columns)[:3] == ["interior_temperature_1", "interior_temperature_2", "exterior_temperature"]
+        assert len(columns["altitude"]) == 2
+        assert np.allclose(columns["altitude"], [6784.120952, 0.0])
+        assert columns["gps_time"][0] == np.datetime64('2017-08-21T09:00:27')
+        assert np.isnat(columns["gps_time"][1])
+        assert columns["gps_validity"].tolist() == [True, False]
+        assert columns["gps_sentences"].dtype == np.int64
+        assert columns["data_logging_status"].tolist() == [1, 0]
+        assert columns["data_filename"].tolist() == [0, 1]
+        assert columns["relay_states"].tolist() == [0b0000, 0b0101]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_cache_follows_file():
+    directory = tempfile.mkdtemp()
+    try:
+        path = writeCSV(directory, HEADER_2017 + ROWS_2017[0])
+        assert len(loadTelemetryCSV(path)["altitude"]) == 1
+        assert os.path.exists(getCachePath(path))
+        assert len(loadTelemetryCSV(path)["altitude"]) == 1
+
+        # Rows added since the cache was written are loaded
+        with open(path, 'a') as fileHandle:
+            fileHandle.write(ROWS_2017[1])
+        assert len(loadTelemetryCSV(path)["altitude"]) == 2
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_header_only():
+    directory = tempfile.mkdtemp()
+    try:
+        columns = loadTelemetryCSV(writeCSV(directory, HEADER_2017), useCache=False)
+        assert len(columns) == len(HEADER_2017.split(SEPARATOR))
+        assert all(len(column) == 0 for column in columns.values())
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    test_parses_2017_layout()
+    test_cache_follows_file()
+    test_header_only()
+    print("All telemetry loader tests passed")
+
+
+if __name__ == '__main__':
+    main()
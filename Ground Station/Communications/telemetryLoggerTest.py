@@ -0,0 +1,123 @@
+"""
+telemetryLoggerTest.py
+
+Checks that TelemetryLogger writes CSV files byte for byte the same as
+the original saveDataPacket, and flushes buffered rows on its own
+during a gap in packets. Run directly, or with pytest.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from DataPacket import *
+from TelemetryLogger import *
+
+LEGACY_HEADER = ("Interior Temperature 1, Interior Temperature 2, Interior Temperature 3, "
+                 "Exterior Temperature, Pressure, Humidity, GPS Time 1, Latitude 1, Longitude 1, "
+                 "Altitude 1, Number of GPS Satellites 1, GPS Time 2, Latitude 2, Longitude 2, "
+                 "Altitude 2, Acceleration (x), Acceleration (y), Acceleration (z), "
+                 "Rotation Rate (x), Rotation Rate (y), Rotation Rate (z), Magnetic Field (x), "
+                 "Magnetic Field (y), Magnetic Field (z), Pitch, Roll, Yaw, Time Since Reset, "
+                 "Data Logging Status, Data Filename, Data Age, Relay States\n")
+
+
+def legacySaveDataPacket(packet, filename):
+    """
+    Saves a data packet to a CSV file one value at a time, as the
+    original ground station code did.
+
+    :param packet: (DataPacket) Packet to save to the file
+    :param filename: (string) Name of the file to save the data to
+
+    :return: (None)
+    """
+    fileHandle = open(filename, 'a')
+    if os.path.getsize(filename) == 0:
+        fileHandle.write(LEGACY_HEADER)
+
+    values = [packet.getInteriorTemperature1(), packet.getInteriorTemperature2(),
+              packet.getInteriorTemperature3(), packet.getExteriorTemperature(),
+              packet.getPressure(), packet.getHumidity(),
+              packet.getGpsTime1(), packet.getLatitude1(), packet.getLongitude1(),
+              packet.getAltitude1(), packet.getNumSatellites1(),
+              packet.getGpsTime2(), packet.getLatitude2(), packet.getLongitude2(),
+              packet.getAltitude2()]
+    values += list(packet.getAcceleration()) + list(packet.getRates())
+    values += list(packet.getMagneticReading()) + list(packet.getAttitude())
+    values += [packet.getResetTime(), packet.getDataLoggingStatus(), packet.getFilename(),
+               packet.getDataAge(), packet.getRelayStates()]
+
+    fileHandle.write(', '.join(str(value) for value in values))
+    fileHandle.write('\n')
+    fileHandle.close()
+
+
+def makePacket(index):
+    """
+    Makes a data packet with values that differ from packet to packet.
+
+    :param index: (int) Number of the packet
+
+    :return: (DataPacket) Data packet
+    """
+    packet = DataPacket()
+    packet.values[INTERIOR_TEMPERATURE_1] = 12.345 + index
+    packet.values[EXTERIOR_TEMPERATURE] = -123.5 + index
+    packet.values[LATITUDE_1] = 461234567 + index
+    packet.values[LONGITUDE_1] = -1181234567 - index
+    packet.values[ALTITUDE_1] = 3048000 + 7 * index
+    packet.values[RELAY_STATES] = index % 16
+    return packet
+
+
+def readBytes(path):
+    with open(path, 'rb') as fileHandle:
+        return fileHandle.read()
+
+
+def test_matches_legacy_csv():
+    directory = tempfile.mkdtemp()
+    try:
+        legacyPath = os.path.join(directory, 'legacy.csv')
+        loggerPath = os.path.join(directory, 'logger.csv')
+
+        # Rows are logged over two sessions, so the header is only written once
+        for session in range(2):
+            telemetryLogger = TelemetryLogger(loggerPath, flushRows=7)
+            for index in range(25):
+                packet = makePacket(25 * session + index)
+                legacySaveDataPacket(packet, legacyPath)
+                telemetryLogger.logPacket(packet)
+            telemetryLogger.close()
+
+        assert readBytes(loggerPath) == readBytes(legacyPath)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_rows_flushed_during_gap():
+    directory = tempfile.mkdtemp()
+    try:
+        loggerPath = os.path.join(directory, 'logger.csv')
+        telemetryLogger = TelemetryLogger(loggerPath, flushInterval=0.1)
+        headerSize = os.path.getsize(loggerPath)
+
+        # No more packets arrive to trigger a flush
+        telemetryLogger.logPacket(makePacket(0))
+        time.sleep(0.5)
+        assert os.path.getsize(loggerPath) == headerSize + len(formatRow(makePacket(0)))
+        telemetryLogger.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    test_matches_legacy_csv()
+    test_rows_flushed_during_gap()
+    print("All telemetry logger tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+trackStoreTest.py
+
+Checks that TrackStore saves the same KML files as adding each position
+to the template with addCoordinate, and keeps saving after a disk
+error. Run directly, or with pytest (from this directory, which holds
+the KML template).
+"""
+
+import os
+import shutil
+import tempfile
+
+from TrackStore import *
+
+POSITIONS = [(47.031635 + i / 1000.0, -117.2965017 - i / 1000.0, 1000.0 + 10 * i) for i in range(30)]
+
+
+def makeExpectedKML(kmlPath, positions):
+    """
+    Adds positions to an empty track one at a time, the way
+    updateKMLFile does.
+
+    :param kmlPath: (string) Path of the track's KML file
+    :param positions: (list) Latitude, longitude and altitude of each position
+
+    :return: (string) KML text of the track
+    """
+    kml = getTemplateKML(kmlPath, ABSOLUTE)
+    for latitude, longitude, altitude in positions:
+        kml = addCoordinate(kml, latitude, longitude, altitude)
+    return kml
+
+
+def readFile(path):
+    with open(path, 'r') as kmlFile:
+        return kmlFile.read()
+
+
+def test_flushes_append_positions():
+    directory = tempfile.mkdtemp()
+    try:
+        kmlPath = os.path.join(directory, 'track.kml')
+        trackStore = TrackStore()
+        trackStore.addTrack("track", kmlPath, ABSOLUTE, TrackSimplifier())
+
+        # Positions saved over several flushes, and some only on close
+        for i, position in enumerate(POSITIONS):
+            trackStore.addCoordinate("track", *position)
+            if i % 7 == 0:
+                trackStore.flush()
+        trackStore.close()
+
+        assert readFile(kmlPath) == makeExpectedKML(kmlPath, POSITIONS)
+
+        lodKml = readFile(getLODPath(kmlPath))
+        assert lodKml.count('\n') < readFile(kmlPath).count('\n')
+        assert formatCoordinate(*POSITIONS[-1]) in lodKml
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_track_saved_after_disk_error():
+    directory = tempfile.mkdtemp()
+    try:
+        kmlPath = os.path.join(directory, 'track.kml')
+        trackStore = TrackStore()
+        trackStore.addTrack("track", kmlPath)
+
+        def failToAdd(latitudes, longitudes, altitudes):
+            raise OSError("Disk full")
+
+        # The positions are kept, and saved once the disk recovers
+        writer = trackStore._tracks["track"].writer
+        addCoordinates = writer.addCoordinates
+        writer.addCoordinates = failToAdd
+        trackStore.addCoordinate("track", *POSITIONS[0])
+        trackStore.flush()
+
+        writer.addCoordinates = addCoordinates
+        trackStore.addCoordinate("track", *POSITIONS[1])
+        trackStore.close()
+
+        assert readFile(kmlPath) == makeExpectedKML(kmlPath, POSITIONS[:2])
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_get_coordinates():
+    directory = tempfile.mkdtemp()
+    try:
+        trackStore = TrackStore()
+        trackStore.addTrack("track", os.path.join(directory, 'track.kml'))
+        for position in POSITIONS:
+            trackStore.addCoordinate("track", *position)
+
+        latitudes, longitudes, altitudes = trackStore.getCoordinates("track")
+        assert list(zip(latitudes, longitudes, altitudes)) == POSITIONS
+        trackStore.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    test_flushes_append_positions()
+    test_track_saved_after_disk_error()
+    test_get_coordinates()
+    print("All track store tests passed")
+
+
+if __name__ == '__main__':
+    main()
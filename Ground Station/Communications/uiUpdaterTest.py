@@ -0,0 +1,100 @@
+"""
+uiUpdaterTest.py
+
+Checks that UIUpdater coalesces the snapshots posted between updates,
+applies only the latest of each panel, and keeps to its rate. The user
+interface's clock is replaced by a list of scheduled callbacks, so no
+Kivy is needed. Run directly, or with pytest.
+"""
+
+import threading
+
+from UIUpdater import *
+
+
+class Target(object):
+    pass
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        """
+        Stand-in for kivy.clock.Clock, which holds the scheduled callbacks
+        until the test runs them.
+        """
+        self.scheduled = []
+        self.lock = threading.Lock()
+
+    def schedule_once(self, callback, delay):
+        with self.lock:
+            self.scheduled.append((callback, delay))
+
+    def runScheduled(self):
+        with self.lock:
+            scheduled = self.scheduled
+            self.scheduled = []
+        for callback, delay in scheduled:
+            callback(delay)
+
+
+def test_posts_coalesced():
+    target = Target()
+    clock = FakeClock()
+    uiUpdater = UIUpdater(target, clock.schedule_once)
+
+    for i in range(1000):
+        uiUpdater.post("GPS1", {"latitude" : i, "longitude" : -i})
+        uiUpdater.post("sensors", {"pressure" : 2 * i})
+
+    # One callback applies the latest snapshot of each panel
+    assert len(clock.scheduled) == 1
+    clock.runScheduled()
+    assert (target.latitude, target.longitude, target.pressure) == (999, -999, 1998)
+    assert uiUpdater.getStats() == {"posted" : 2000, "applied" : 2, "replaced" : 1998}
+
+
+def test_rate_capped():
+    clock = FakeClock()
+    uiUpdater = UIUpdater(Target(), clock.schedule_once, maxRate=10.0)
+
+    # The first update goes out at once, the next one an interval later
+    uiUpdater.post("GPS1", {"latitude" : 1})
+    assert clock.scheduled[0][1] == 0.0
+    clock.runScheduled()
+
+    uiUpdater.post("GPS1", {"latitude" : 2})
+    assert 0.05 < clock.scheduled[0][1] <= 0.1
+
+
+def test_posts_from_many_threads():
+    target = Target()
+    clock = FakeClock()
+    uiUpdater = UIUpdater(target, clock.schedule_once)
+
+    def postMany(panel):
+        for i in range(2000):
+            uiUpdater.post(panel, {panel : i})
+
+    threads = [threading.Thread(target=postMany, args=("panel" + str(n),)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    clock.runScheduled()
+    stats = uiUpdater.getStats()
+    assert stats["posted"] == 8000
+    assert stats["applied"] + stats["replaced"] == 8000
+    assert all(getattr(target, "panel" + str(n)) == 1999 for n in range(4))
+
+
+def main():
+    test_posts_coalesced()
+    test_rate_capped()
+    test_posts_from_many_threads()
+    print("All user interface updater tests passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,102 @@
 
 
 import os
-import StringIO
 import numpy as np
 
 NUM_READINGS = 28
 DATA_FOLDER = "C:\\Users\\Andrew\\Documents\\Balloon\\2017_0803\\payload_data"
+COMBINED_FILENAME = 'test.csv'
 
+# Lines of a file to convert at a time
+CHUNK_LINES = 10000
 
-def main():
+
+def main(dataFolder=DATA_FOLDER, combinedFilename=COMBINED_FILENAME, chunkLines=CHUNK_LINES):
     """
+    Combines the payload CSV files of a flight into one file, with the
+    times (the even columns) of each file continuing from the last row
+    of the file before it. The combined file starts with a row of zeros.
+    The last line of each file is dropped, along with anything after it,
+    since it may have been cut short when the payload lost power.
+
+    The files are read and written a chunk of lines at a time, so memory
+    use does not depend on the length of the flight.
 
+    :param dataFolder: (string) Folder holding the payload CSV files
+    :param combinedFilename: (string) Path of the combined file
+    :param chunkLines: (int) Lines of a file to convert at a time
 
+    :return: (None)
     """
-    
-    allFiles = os.listdir(DATA_FOLDER)
 
-    data = np.zeros((1, 2*NUM_READINGS))
-    for f in allFiles:
-        f = f.lower()
-        if f.endswith('.csv'):
+    allFiles = sorted(os.listdir(dataFolder))
+    filePaths = [os.path.join(dataFolder, f) for f in allFiles if f.lower().endswith('.csv')]
+
+    # The header of the combined file is that of the last file
+    header = ''
+    if filePaths:
+        with open(filePaths[-1], 'r') as fileHandle:
+            header = fileHandle.readline().rstrip('\r\n')
+
+    lastRow = np.zeros(2*NUM_READINGS)
+
+    with open(combinedFilename, 'w') as combinedFile:
+        np.savetxt(combinedFile, lastRow[np.newaxis, :], delimiter=',', header=header)
 
-            print f
+        for filePath in filePaths:
 
-            filePath = os.path.join(DATA_FOLDER, f)
+            print(filePath)
 
-            fileHandle = open(filePath, 'r')
-            dataText = fileHandle.read()
-            fileHandle.close()
+            offsets = lastRow.copy()
+            fileData = None
 
-            header = dataText[0:dataText.find('\n')-1]
-            cleanText = dataText[0:dataText.rfind('\n')-1]
-            cleanText = dataText[0:cleanText.rfind('\n')]
-            cleanDataFile = StringIO.StringIO(cleanText)
+            for fileData in readChunks(filePath, chunkLines):
+                numCols = fileData.shape[1]
+                fileData[:, 0:numCols:2] += offsets[0:numCols:2]
+                np.savetxt(combinedFile, fileData, delimiter=',')
 
-            fileData = np.loadtxt(cleanDataFile, delimiter=',', skiprows=1)
-            numCols = fileData.shape[1]
+            if fileData is not None:
+                lastRow = fileData[-1]
 
-            for i in xrange(0, numCols, 2):
-                fileData[:, i] += data[-1, i]
 
-            data = np.append(data, fileData, axis=0)
+def readChunks(filePath, chunkLines):
+    """
+    Reads the rows of a payload CSV file, a chunk at a time. The header
+    is skipped, and the last complete line and anything after it are
+    left out.
+
+    :param filePath: (string) Path of the payload CSV file
+    :param chunkLines: (int) Lines to convert at a time
+
+    :return: (generator) Chunks of rows, as NumPy arrays
+    """
+
+    with open(filePath, 'r') as fileHandle:
+        fileHandle.readline()
 
-    np.savetxt('test.csv', data, delimiter=',', header=header)
+        lines = []
+        heldLine = None
+        for line in fileHandle:
 
+            # A line without an ending can only be the last one
+            if not line.endswith('\n'):
+                break
 
+            if heldLine is not None:
+                lines.append(heldLine)
+            heldLine = line
 
+            if len(lines) >= chunkLines:
+                chunk = np.loadtxt(lines, delimiter=',', ndmin=2)
+                lines = []
+                if chunk.size > 0:
+                    yield chunk
 
+        if lines:
+            chunk = np.loadtxt(lines, delimiter=',', ndmin=2)
+            if chunk.size > 0:
+                yield chunk
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()